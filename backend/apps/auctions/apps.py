@@ -1,7 +1,24 @@
 """Auctions app configuration."""
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
+
+
+def _ensure_search_index(using, **kwargs):
+    from django.db import connections
+    from .search import ensure_sqlite_index
+
+    connection = connections[using]
+    # Only repair an index created by migration 0013, e.g. after a table rebuild
+    if connection.vendor == 'sqlite' and 'auctions_auction_fts' in connection.introspection.table_names():
+        ensure_sqlite_index(connection)
 
 
 class AuctionsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.auctions'
+
+    def ready(self):
+        from .cache import connect_signals
+
+        post_migrate.connect(_ensure_search_index, sender=self)
+        connect_signals()
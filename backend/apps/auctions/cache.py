@@ -0,0 +1,136 @@
+"""Response cache for anonymous reads of auctions and categories.
+
+Rendered JSON responses are stored in the default cache under a key built
+from the request (path, query string, host) and the current *version* of
+each scope the response depends on: ``categories``, ``auctions`` (any
+auction) or ``auction:<id>``. Invalidating a scope only replaces its
+version, a timestamp, so stale entries are never read again and expire on
+their own after ``RESPONSE_CACHE_SECONDS``. Versions only reach every
+worker when the default cache is shared (``CACHE_BACKEND=redis``); with
+the per-process development cache a worker keeps serving what it cached.
+
+Responses carry an ``ETag`` (content hash) and ``If-None-Match`` requests
+get ``304 Not Modified``. There is no ``Last-Modified``: several versions
+can start within one second, which its one-second resolution cannot tell
+apart.
+Versions are bumped from ``Category``/``Auction`` saves and deletes and from
+the ``auctions_changed``/``categories_changed`` signals sent by bid
+placement, closing and category reordering.
+"""
+import hashlib
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
+
+# Process-wide counters: hit, miss, not_modified, bypass, invalidation
+metrics = Counter()
+
+
+def _version_key(scope):
+    return f'respcache:v:{scope}'
+
+
+def _versions(scopes):
+    keys = [_version_key(scope) for scope in scopes]
+    versions = cache.get_many(keys)
+    now = time.time()
+    for key in keys:
+        if key not in versions:
+            # add() so concurrent first requests agree on one version
+            cache.add(key, now, timeout=None)
+            versions[key] = cache.get(key, now)
+    return [versions[key] for key in keys]
+
+
+def invalidate(*scopes):
+    """Start new versions of ``scopes`` so cached responses for them are bypassed."""
+    now = time.time()
+    cache.set_many({_version_key(scope): now for scope in scopes}, timeout=None)
+    metrics['invalidation'] += len(scopes)
+
+
+def invalidate_auctions(auction_ids):
+    invalidate('auctions', *[f'auction:{auction_id}' for auction_id in auction_ids])
+
+
+def cached_response(view, request, scopes, render):
+    """Serve ``render()`` for an anonymous GET from the cache when possible.
+
+    ``render`` returns the DRF response the view would send; only ``200``
+    JSON responses are stored. A miss returns that response itself, a hit a
+    plain ``HttpResponse`` with the stored JSON. Other requests are passed
+    through untouched.
+    """
+    if (
+        request.method != 'GET'
+        or request.user.is_authenticated
+        or request.accepted_renderer.format != 'json'
+        or not getattr(settings, 'RESPONSE_CACHE_SECONDS', 60)
+    ):
+        metrics['bypass'] += 1
+        return render()
+
+    versions = _versions(scopes)
+    fingerprint = '|'.join([
+        request.get_host(),
+        request.path,
+        '&'.join(sorted(request.GET.urlencode().split('&'))),
+        *map(repr, versions),
+    ])
+    key = f'respcache:r:{hashlib.md5(fingerprint.encode()).hexdigest()}'
+    entry = cache.get(key)
+    if entry is None:
+        response = render()
+        if response.status_code != 200:
+            return response
+        content = request.accepted_renderer.render(
+            response.data, request.accepted_media_type, view.get_renderer_context(),
+        )
+        entry = {
+            'content': content,
+            'content_type': f'{request.accepted_media_type}; charset=utf-8',
+            'etag': f'"{hashlib.md5(content).hexdigest()}"',
+        }
+        cache.set(key, entry, timeout=settings.RESPONSE_CACHE_SECONDS)
+        metrics['miss'] += 1
+        response['X-Cache'] = 'MISS'
+    else:
+        metrics['hit'] += 1
+        response = HttpResponse(entry['content'], content_type=entry['content_type'])
+        response['X-Cache'] = 'HIT'
+
+    response['ETag'] = entry['etag']
+    conditional = get_conditional_response(request, etag=entry['etag'], response=response)
+    if conditional is not response:
+        metrics['not_modified'] += 1
+        conditional['X-Cache'] = response['X-Cache']
+    return conditional
+
+
+def _category_changed(**kwargs):
+    # Auctions embed their category
+    invalidate('categories')
+
+
+def _auction_saved(instance, **kwargs):
+    invalidate_auctions([instance.pk])
+
+
+def _auctions_changed(auction_ids, **kwargs):
+    invalidate_auctions(auction_ids)
+
+
+def connect_signals():
+    from django.db.models.signals import post_delete, post_save
+    from .models import Auction, Category
+    from .signals import auctions_changed, categories_changed
+
+    for signal in (post_save, post_delete):
+        signal.connect(_category_changed, sender=Category, dispatch_uid='respcache_category')
+        signal.connect(_auction_saved, sender=Auction, dispatch_uid='respcache_auction')
+    categories_changed.connect(_category_changed, dispatch_uid='respcache_categories')
+    auctions_changed.connect(_auctions_changed, dispatch_uid='respcache_auctions')
@@ -0,0 +1,34 @@
+"""Server clock for client countdowns.
+
+Clients render countdowns locally from ``end_time``; to correct for a skewed
+device clock they estimate ``offset = server_now - local_now`` from the
+``X-Server-Now`` header on API responses, the ``time`` endpoint (which
+echoes the client's ``t`` so round-trip time can be halved out) and the
+``clock`` frames sent to auction rooms every ``AUCTION_CLOCK_TICK_SECONDS``.
+All timestamps are Unix epoch milliseconds.
+"""
+import time
+
+SERVER_NOW_HEADER = 'X-Server-Now'
+
+
+def server_now_ms():
+    """Current server time in Unix epoch milliseconds."""
+    return int(time.time() * 1000)
+
+
+def clock_frame():
+    return {'type': 'clock', 'data': {'server_now': server_now_ms()}}
+
+
+class ServerTimeMiddleware:
+    """Stamp API responses with ``X-Server-Now``, including cached and 304 ones."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if request.path.startswith('/api/'):
+            response[SERVER_NOW_HEADER] = str(server_now_ms())
+        return response
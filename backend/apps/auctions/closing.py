@@ -0,0 +1,249 @@
+"""Auction closing.
+
+``settle_due_auctions`` moves active auctions past their ``end_time`` to
+``sold`` (with ``winner`` and ``final_price``) or ``ended`` when there are
+no bids or the reserve was not met. ``CloseScheduler`` keeps a heap of the
+auctions ending within the next horizon, read through the ``end_time``
+index, so the close worker sleeps until the next close instead of polling.
+
+Auctions held by the bidding hot book may have bids and an anti-snipe
+``end_time`` that only exist in memory. The closer releases those held in
+its own process first and skips those another process still holds. Those
+are retried at their in-memory ``end_time``. An ``end_time`` changed in
+another process is read back from the database: an auction that turns out
+not to be due is requeued at its stored ``end_time``.
+"""
+import heapq
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import OuterRef, Subquery
+from django.utils import timezone
+from .models import Auction
+from .signals import auctions_changed
+
+logger = logging.getLogger('backend')
+
+# Scheduler running in this process, if any; see notify_end_time_changed()
+_running_scheduler = None
+
+
+def _batch_size():
+    return getattr(settings, 'AUCTION_CLOSE_BATCH_SIZE', 500)
+
+
+def _broadcast_closed(auctions):
+    from apps.bidding.events import send_event
+
+    for auction in auctions:
+        send_event(auction.id, {
+            "type": "auction_ended",
+            "data": {
+                "status": auction.status,
+                "winner": auction.winner_username,
+                "final_price": float(auction.final_price) if auction.final_price is not None else None,
+                "end_time": auction.end_time.isoformat(),
+            },
+        })
+
+
+def _settle_batch(now, ids, since, batch_size, held):
+    from apps.bidding.hotbook import held_end_times
+    from apps.bidding.models import Bid
+
+    latest_bids = Bid.objects.filter(auction=OuterRef('pk')).order_by('-created_at', '-id')
+    with transaction.atomic():
+        due = Auction.objects.select_for_update(skip_locked=True).filter(
+            status='active', end_time__lte=now,
+        ).exclude(pk__in=held)
+        if ids is not None:
+            due = due.filter(pk__in=ids)
+        if since is not None:
+            due = due.filter(end_time__gt=since)
+        auctions = list(
+            due.order_by('end_time')
+            .annotate(
+                leader_id=Subquery(latest_bids.values('bidder_id')[:1]),
+                winner_username=Subquery(latest_bids.values('bidder__username')[:1]),
+            )[:batch_size]
+        )
+        loaded = len(auctions)
+        # Still held by a hot book in another process: unflushed bids or a later end_time
+        held_now = held_end_times([auction.pk for auction in auctions])
+        if held_now:
+            held.update(held_now)
+            auctions = [auction for auction in auctions if auction.pk not in held_now]
+        if not auctions:
+            return [], loaded
+
+        sold, ended = [], []
+        for auction in auctions:
+            reserve_met = auction.reserve_price is None or auction.current_highest_bid >= auction.reserve_price
+            if auction.leader_id and auction.bid_count and reserve_met:
+                auction.status = 'sold'
+                auction.winner_id = auction.leader_id
+                auction.final_price = auction.current_highest_bid
+                auction.updated_at = now
+                sold.append(auction)
+            else:
+                auction.status = 'ended'
+                auction.winner_username = None
+                ended.append(auction)
+
+        if sold:
+            Auction.objects.bulk_update(sold, ['status', 'winner', 'final_price', 'updated_at'])
+        if ended:
+            Auction.objects.filter(pk__in=[auction.pk for auction in ended]).update(
+                status='ended', updated_at=now,
+            )
+    return auctions, loaded
+
+
+def settle_due_auctions(now=None, ids=None, since=None, batch_size=None):
+    """Close every active auction whose ``end_time`` has passed.
+
+    Auctions are settled in batches of ``batch_size``, each in its own
+    transaction; rows locked by another closer and auctions held by a hot
+    book in another process are skipped. Pass ``ids`` to
+    restrict the check to specific auctions, or ``since`` to bound the
+    ``end_time`` range scanned. Returns the closed auctions.
+    """
+    from apps.bidding.hotbook import hot_book
+
+    now = now or timezone.now()
+    batch_size = batch_size or _batch_size()
+    if hot_book.enabled:
+        hot_book.release_ended(now)
+    closed = []
+    held = set()
+    while True:
+        batch, loaded = _settle_batch(now, ids, since, batch_size, held)
+        closed.extend(batch)
+        if batch:
+            auctions_changed.send(sender=Auction, auction_ids=[auction.pk for auction in batch])
+        _broadcast_closed(batch)
+        if loaded < batch_size:
+            break
+    if closed:
+        logger.info('Closed %d auctions', len(closed))
+    return closed
+
+
+def notify_end_time_changed(auction_id, end_time):
+    """Tell a close scheduler running in this process about a new end_time.
+
+    A scheduler in another process finds the new end_time in the database
+    when the old one comes due.
+    """
+    if _running_scheduler is not None:
+        _running_scheduler.reschedule(auction_id, end_time)
+
+
+class CloseScheduler:
+    """Min-heap of imminent auction closes.
+
+    Every ``refill_interval`` seconds the auctions ending within the next
+    ``horizon`` seconds are loaded with a bounded ``end_time`` index range
+    scan. Anti-snipe extensions either arrive through ``reschedule`` or are
+    picked up when a due auction turns out not to be due yet and its new
+    ``end_time`` is re-read.
+    """
+
+    def __init__(self, horizon=None, refill_interval=None, batch_size=None):
+        self.horizon = horizon or getattr(settings, 'AUCTION_CLOSE_HORIZON_SECONDS', 60)
+        self.refill_interval = refill_interval or getattr(settings, 'AUCTION_CLOSE_REFILL_SECONDS', 5)
+        self.batch_size = batch_size or _batch_size()
+        self._heap = []
+        self._scheduled = {}
+        self._lock = threading.Lock()
+        self._next_refill = None
+
+    def __len__(self):
+        return len(self._scheduled)
+
+    def reschedule(self, auction_id, end_time):
+        """Schedule (or move) the close of ``auction_id`` to ``end_time``."""
+        with self._lock:
+            if self._scheduled.get(auction_id) == end_time:
+                return
+            self._scheduled[auction_id] = end_time
+            heapq.heappush(self._heap, (end_time, auction_id))
+
+    def refill(self, now=None):
+        """Load active auctions ending in the next ``horizon`` seconds."""
+        now = now or timezone.now()
+        rows = Auction.objects.filter(
+            status='active',
+            end_time__gt=now - timezone.timedelta(seconds=2 * self.refill_interval),
+            end_time__lte=now + timezone.timedelta(seconds=self.horizon),
+        ).order_by('end_time')
+        for auction_id, end_time in rows.values_list('id', 'end_time').iterator():
+            self.reschedule(auction_id, end_time)
+        self._next_refill = now + timezone.timedelta(seconds=self.refill_interval)
+
+    def pop_due(self, now=None):
+        """Remove and return the ids of auctions whose scheduled close has passed."""
+        now = now or timezone.now()
+        due = []
+        with self._lock:
+            while self._heap and self._heap[0][0] <= now:
+                end_time, auction_id = heapq.heappop(self._heap)
+                # Skip entries superseded by a later reschedule()
+                if self._scheduled.get(auction_id) == end_time:
+                    del self._scheduled[auction_id]
+                    due.append(auction_id)
+        return due
+
+    def seconds_until_next(self, now=None):
+        """Seconds until the next scheduled close or the next refill."""
+        now = now or timezone.now()
+        wait = self.refill_interval
+        if self._next_refill is not None:
+            wait = min(wait, (self._next_refill - now).total_seconds())
+        with self._lock:
+            if self._heap:
+                wait = min(wait, (self._heap[0][0] - now).total_seconds())
+        return max(wait, 0)
+
+    def tick(self, now=None):
+        """Settle due auctions and re-queue extended ones. Returns closed auctions."""
+        now = now or timezone.now()
+        if self._next_refill is None or now >= self._next_refill:
+            self.refill(now)
+        due = self.pop_due(now)
+        if not due:
+            return []
+        closed = settle_due_auctions(now, ids=due, batch_size=self.batch_size)
+        closed_ids = {auction.pk for auction in closed}
+        pending = [auction_id for auction_id in due if auction_id not in closed_ids]
+        if pending:
+            # Extended by anti-snipe, held by a hot book or locked by another
+            # closer; the last two are retried shortly rather than in a busy loop
+            from apps.bidding.hotbook import held_end_times
+
+            held = held_end_times(pending)
+            retry = now + timezone.timedelta(seconds=1)
+            for auction_id, end_time in Auction.objects.filter(
+                pk__in=pending, status='active',
+            ).values_list('id', 'end_time'):
+                self.reschedule(auction_id, max(end_time, held.get(auction_id, end_time), retry))
+        return closed
+
+    def run_forever(self, max_sleep=1.0):
+        """Catch up on overdue auctions, then run the close loop in this thread."""
+        global _running_scheduler
+        _running_scheduler = self
+        settle_due_auctions(batch_size=self.batch_size)
+        try:
+            while True:
+                close_old_connections()
+                try:
+                    self.tick()
+                except Exception:
+                    logger.exception('Auction close tick failed')
+                time.sleep(min(self.seconds_until_next(), max_sleep))
+        finally:
+            _running_scheduler = None
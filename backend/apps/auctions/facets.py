@@ -0,0 +1,172 @@
+"""Facet counts for the auction browse page.
+
+Counting auctions per category, location, price band and status on every
+request costs a ``GROUP BY`` each. Instead ``refresh_facet_counts`` stores one
+``AuctionFacetCount`` row per (status, category, location, price band)
+combination, a small cube refreshed by the ``refresh_auction_facets`` beat
+task, and keeps a copy in the cache. Without beat (development, tests) the
+first request to find the cube older than ``AUCTION_FACET_REFRESH_SECONDS``
+recounts it, while the others keep answering from the old copy. ``facet_counts`` answers any
+combination of those four filters from the cube without touching the
+auctions table.
+
+Counts for a dimension ignore the filter on that same dimension, so picking
+a category still shows how many auctions the other categories have.
+"""
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Case, Count, IntegerField, Value, When
+from django.db.models.functions import Coalesce, Greatest
+from django.utils import timezone
+
+CACHE_KEY = 'auctions:facet_counts'
+REFRESH_LOCK_KEY = 'auctions:facet_counts:refreshing'
+DIMENSIONS = ('status', 'category', 'location', 'price_band')
+LOCATION_LIMIT = 50
+# Lower bounds of the price bands in EUR; the last band is open-ended
+PRICE_BANDS = [0, 50, 100, 500, 1000, 5000, 20000]
+
+
+def with_current_price(queryset):
+    """Annotate ``current_price``: the highest bid, or the starting price before any bids."""
+    return queryset.annotate(current_price=Greatest('current_highest_bid', 'starting_price'))
+
+
+def price_band_expression():
+    """Map ``current_price`` to its index in ``PRICE_BANDS``."""
+    return Case(
+        *[
+            When(current_price__lt=upper, then=Value(index))
+            for index, upper in enumerate(PRICE_BANDS[1:])
+        ],
+        default=Value(len(PRICE_BANDS) - 1),
+        output_field=IntegerField(),
+    )
+
+
+def filter_price_band(queryset, band):
+    """Restrict ``queryset`` to auctions whose current price falls in ``band``."""
+    queryset = with_current_price(queryset).filter(current_price__gte=PRICE_BANDS[band])
+    if band + 1 < len(PRICE_BANDS):
+        queryset = queryset.filter(current_price__lt=PRICE_BANDS[band + 1])
+    return queryset
+
+
+def refresh_facet_counts():
+    """Recount the facet cube from the auctions table and cache it."""
+    from .models import Auction, AuctionFacetCount
+
+    now = timezone.now()
+    groups = (
+        with_current_price(Auction.objects.order_by())
+        .annotate(price_band=price_band_expression(), facet_location=Coalesce('location', Value('')))
+        .values('status', 'category_id', 'facet_location', 'price_band')
+        .annotate(count=Count('id'))
+    )
+    rows = [
+        AuctionFacetCount(
+            status=group['status'],
+            category_id=group['category_id'],
+            location=group['facet_location'],
+            price_band=group['price_band'],
+            count=group['count'],
+            refreshed_at=now,
+        )
+        for group in groups
+    ]
+    with transaction.atomic():
+        AuctionFacetCount.objects.all().delete()
+        AuctionFacetCount.objects.bulk_create(rows, batch_size=1000)
+    cache.set(CACHE_KEY, _load_cube(), timeout=None)
+    return len(rows)
+
+
+def _load_cube():
+    from .models import AuctionFacetCount
+
+    rows = list(
+        AuctionFacetCount.objects.values(
+            'status', 'category_id', 'category__name', 'category__slug',
+            'location', 'price_band', 'count', 'refreshed_at',
+        )
+    )
+    return {
+        'rows': rows,
+        'refreshed_at': max((row['refreshed_at'] for row in rows), default=None),
+    }
+
+
+def _cube():
+    cube = cache.get(CACHE_KEY)
+    if cube is None:
+        cube = _load_cube()
+        if cube['refreshed_at'] is None:
+            # Never counted yet, e.g. right after install: count now rather than show zeros
+            refresh_facet_counts()
+            return cache.get(CACHE_KEY)
+        cache.set(CACHE_KEY, cube, timeout=None)
+    if _is_stale(cube) and cache.add(REFRESH_LOCK_KEY, True, timeout=60):
+        try:
+            refresh_facet_counts()
+        finally:
+            cache.delete(REFRESH_LOCK_KEY)
+        cube = cache.get(CACHE_KEY, cube)
+    return cube
+
+
+def _is_stale(cube):
+    if cube['refreshed_at'] is None:
+        return False
+    age = timezone.now() - cube['refreshed_at']
+    return age.total_seconds() > getattr(settings, 'AUCTION_FACET_REFRESH_SECONDS', 60)
+
+
+def facet_counts(filters=None):
+    """Return facet counts for auctions matching ``filters``.
+
+    ``filters`` maps any of ``status``, ``category`` (id), ``location`` and
+    ``price_band`` (index into ``PRICE_BANDS``) to a single value.
+    """
+    filters = {key: value for key, value in (filters or {}).items() if key in DIMENSIONS}
+    cube = _cube()
+    counts = {dimension: defaultdict(int) for dimension in DIMENSIONS}
+    categories = {}
+    for row in cube['rows']:
+        values = {
+            'status': row['status'],
+            'category': row['category_id'],
+            'location': row['location'],
+            'price_band': row['price_band'],
+        }
+        categories[row['category_id']] = (row['category__name'], row['category__slug'])
+        for dimension in DIMENSIONS:
+            if all(values[key] == value for key, value in filters.items() if key != dimension):
+                counts[dimension][values[dimension]] += row['count']
+
+    def ranked(dimension):
+        return sorted(counts[dimension].items(), key=lambda item: (-item[1], str(item[0])))
+
+    return {
+        'category': [
+            {'id': category_id, 'name': categories[category_id][0], 'slug': categories[category_id][1], 'count': count}
+            for category_id, count in ranked('category')
+        ],
+        'location': [
+            {'value': location, 'count': count}
+            for location, count in ranked('location') if location
+        ][:LOCATION_LIMIT],
+        'price': [
+            {
+                'band': band,
+                'min': lower,
+                'max': PRICE_BANDS[band + 1] if band + 1 < len(PRICE_BANDS) else None,
+                'count': counts['price_band'].get(band, 0),
+            }
+            for band, lower in enumerate(PRICE_BANDS)
+        ],
+        'status': [{'value': value, 'count': count} for value, count in ranked('status')],
+        'refreshed_at': cube['refreshed_at'],
+    }
@@ -0,0 +1,73 @@
+import time
+
+import factory
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.renderers import JSONRenderer
+from apps.auctions.models import Auction
+from apps.auctions.serializers import AuctionCardSerializer, AuctionSerializer
+from apps.bidding.models import Bid
+from apps.media.models import AuctionImage
+from benchmarks.db import rolled_back
+from benchmarks.factories import AuctionFactory, AuctionImageFactory, BidFactory, CategoryFactory, UserFactory
+
+
+class Command(BaseCommand):
+    help = 'Compare payload size and serialization time of full auctions and cards'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--auctions', type=int, default=100)
+        parser.add_argument('--repeat', type=int, default=20)
+
+    def handle(self, *args, **options):
+        with rolled_back():
+            ids = self._seed(options['auctions'])
+            self._bench(Auction.objects.filter(pk__in=ids).order_by('-created_at', '-id'), options['repeat'])
+
+    def _seed(self, count):
+        seller = UserFactory(bio='Pārdevējs ' * 20)
+        bidder = UserFactory()
+        category = CategoryFactory()
+        auctions = Auction.objects.bulk_create(AuctionFactory.build_batch(
+            count,
+            description='Lietots, labā stāvoklī. ' * 30,
+            category=category,
+            seller=seller,
+            winner=bidder,
+            location='Rīga',
+        ))
+        AuctionImage.objects.bulk_create([
+            AuctionImageFactory.build(auction=auction, is_primary=not index)
+            for auction in auctions
+            for index in range(3)
+        ])
+        Bid.objects.bulk_create(BidFactory.build_batch(count, auction=factory.Iterator(auctions), bidder=bidder))
+        return [auction.pk for auction in auctions]
+
+    def _time(self, build, repeat):
+        best = None
+        for _ in range(repeat):
+            started = time.perf_counter()
+            content = build()
+            elapsed = time.perf_counter() - started
+            best = elapsed if best is None else min(best, elapsed)
+        return best * 1000, content
+
+    def _bench(self, auctions, repeat):
+        renderer = JSONRenderer()
+        profiles = [
+            ('full', auctions.with_list_data, AuctionSerializer),
+            ('card', auctions.as_cards, AuctionCardSerializer),
+        ]
+        for name, queryset, serializer in profiles:
+            rows = list(queryset())
+            with CaptureQueriesContext(connection) as queries:
+                total_ms, content = self._time(
+                    lambda: renderer.render(serializer(list(queryset()), many=True).data), 1,
+                )
+            serialize_ms, _ = self._time(lambda: renderer.render(serializer(rows, many=True).data), repeat)
+            self.stdout.write(
+                f'{name}: {len(rows)} auctions, {len(content):>9,} bytes, {len(queries)} queries, '
+                f'serialize+render {serialize_ms:7.1f} ms, with queries {total_ms:7.1f} ms'
+            )
@@ -0,0 +1,82 @@
+import random
+import time
+
+import factory
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.db.models import Q
+from apps.auctions.models import Auction
+from apps.auctions.search import search_auctions
+from benchmarks.db import rolled_back
+from benchmarks.factories import AuctionFactory, CategoryFactory, UserFactory
+
+WORDS = [
+    'automašīna', 'velosipēds', 'pulkstenis', 'dzīvoklis', 'māja', 'dārzs', 'laiva', 'motocikls',
+    'dators', 'telefons', 'televizors', 'dīvāns', 'galds', 'krēsls', 'gleznas', 'grāmatas',
+    'rezerves', 'daļas', 'riepas', 'lietots', 'jauns', 'labā', 'stāvoklī', 'oriģināls',
+    'watch', 'bicycle', 'vintage', 'leather', 'wooden', 'electric', 'classic', 'collection',
+]
+QUERIES = ['automasina', 'pulkstenis vintage', 'riep', 'dators jauns', 'leather']
+# Filler vocabulary so the searched words are as rare as they are in real listings
+FILLER = [f'{a}{b}{c}' for a in 'bdgklmnprstv' for b in ('a', 'e', 'i', 'o', 'u', 'ā', 'ē') for c in ('ks', 'ns', 'ts', 'rs', 'ls', 'ms')]
+
+
+class Command(BaseCommand):
+    help = 'Benchmark full-text auction search against ILIKE on a large seeded table'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--auctions', type=int, default=1_000_000)
+        parser.add_argument('--batch-size', type=int, default=10_000)
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        with rolled_back():
+            self._seed(options['auctions'], options['batch_size'])
+            self._bench(options['repeat'])
+
+    def _seed(self, count, batch_size):
+        rng = random.Random(42)
+        seller = UserFactory()
+        category = CategoryFactory()
+        started = time.perf_counter()
+        for offset in range(0, count, batch_size):
+            # Fixed values for the other fields keep Faker out of a million-row seed
+            Auction.objects.bulk_create(AuctionFactory.build_batch(
+                min(batch_size, count - offset),
+                title=factory.LazyFunction(
+                    lambda: ' '.join(rng.choices(FILLER, k=3) + rng.choices(WORDS, k=rng.random() < 0.05)).capitalize()
+                ),
+                description=factory.LazyFunction(
+                    lambda: ' '.join(rng.choices(FILLER, k=38) + rng.choices(WORDS, k=rng.random() < 0.1))
+                ),
+                category=category,
+                seller=seller,
+                location='Rīga',
+                starting_price=10,
+                current_highest_bid=0,
+                bid_count=0,
+            ))
+            self.stdout.write(f'seeded {min(offset + batch_size, count):,}/{count:,}')
+        self.stdout.write(f'seeded {count:,} auctions in {time.perf_counter() - started:.1f}s ({connection.vendor})')
+
+    def _time(self, queryset, repeat):
+        best = None
+        for _ in range(repeat):
+            started = time.perf_counter()
+            results = list(queryset[:20])
+            elapsed = time.perf_counter() - started
+            best = elapsed if best is None else min(best, elapsed)
+        return best * 1000, len(results)
+
+    def _bench(self, repeat):
+        auctions = Auction.objects.only('id', 'title')
+        for query in QUERIES:
+            ilike = auctions
+            for term in query.split():
+                ilike = ilike.filter(Q(title__icontains=term) | Q(description__icontains=term))
+            ilike_ms, ilike_rows = self._time(ilike.order_by('-created_at'), repeat)
+            fts_ms, fts_rows = self._time(search_auctions(auctions, query), repeat)
+            self.stdout.write(
+                f'{query!r:<22} ILIKE {ilike_ms:9.1f} ms ({ilike_rows:>2} rows)   '
+                f'full-text {fts_ms:9.1f} ms ({fts_rows:>2} rows)'
+            )
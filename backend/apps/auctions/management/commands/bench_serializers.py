@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand, CommandError
+from benchmarks.db import rolled_back
+from benchmarks.serializers import BASELINE_PATH, CASES, load_baseline, measure, regressions, save_baseline, seed
+
+
+class Command(BaseCommand):
+    help = 'Benchmark the main serializers at several sizes against stored baselines'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default='10,100,1000', help='Comma-separated row counts')
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--threshold', type=float, default=1.0, help='Allowed slowdown, 1.0 = twice as slow')
+        parser.add_argument('--baseline', default=str(BASELINE_PATH))
+        parser.add_argument('--save', action='store_true', help='Store the results as the new baseline')
+
+    def handle(self, *args, **options):
+        sizes = sorted(int(size) for size in options['sizes'].split(','))
+        results = {}
+        with rolled_back():
+            user = seed(sizes[-1])
+            for name in CASES:
+                results[name] = {}
+                for rows in sizes:
+                    result = results[name][str(rows)] = measure(name, user, rows, options['repeat'])
+                    self.stdout.write(
+                        f"{name:<24} {rows:>5} rows  {result['queries']:>5} queries  {result['ms']:9.2f} ms  "
+                        f"{rows / max(result['ms'], 0.01) * 1000:>9,.0f} rows/s"
+                    )
+
+        if options['save']:
+            save_baseline(results, options['baseline'])
+            self.stdout.write(f"baseline saved to {options['baseline']}")
+            return
+        found = regressions(results, load_baseline(options['baseline']), options['threshold'])
+        if found:
+            raise CommandError('Serializer regressions:\n' + '\n'.join(found))
+        self.stdout.write('no regressions against baseline')
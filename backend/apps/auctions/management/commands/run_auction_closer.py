@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand
+from apps.auctions.closing import CloseScheduler, settle_due_auctions
+
+
+class Command(BaseCommand):
+    help = 'Close auctions as their end_time passes, sleeping until the next close'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true',
+                            help='Settle every overdue auction and exit')
+        parser.add_argument('--horizon', type=int, default=None,
+                            help='Seconds ahead to load upcoming closes')
+        parser.add_argument('--refill-interval', type=int, default=None,
+                            help='Seconds between reloads of upcoming closes')
+        parser.add_argument('--batch-size', type=int, default=None)
+
+    def handle(self, *args, **options):
+        if options['once']:
+            closed = settle_due_auctions(batch_size=options['batch_size'])
+            self.stdout.write(self.style.SUCCESS(f'Closed {len(closed)} auctions'))
+            return
+
+        scheduler = CloseScheduler(
+            horizon=options['horizon'],
+            refill_interval=options['refill_interval'],
+            batch_size=options['batch_size'],
+        )
+        self.stdout.write(
+            f'Closing auctions (horizon {scheduler.horizon}s, refill every {scheduler.refill_interval}s)'
+        )
+        try:
+            scheduler.run_forever()
+        except KeyboardInterrupt:
+            pass
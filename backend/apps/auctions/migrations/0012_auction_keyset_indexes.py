@@ -0,0 +1,39 @@
+# Generated by Django 4.2.7 on 2026-10-18 05:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("auctions", "0011_alter_category_options"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="auction",
+            index=models.Index(
+                fields=["-created_at", "-id"], name="auctions_au_created_d6cebc_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="auction",
+            index=models.Index(
+                fields=["status", "end_time", "id"],
+                name="auctions_au_status_ed76e1_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="auction",
+            index=models.Index(
+                fields=["seller", "-created_at", "-id"],
+                name="auctions_au_seller__db9934_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="auction",
+            index=models.Index(
+                fields=["winner", "-created_at", "-id"],
+                name="auctions_au_winner__60e1fd_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,101 @@
+from django.db import migrations
+
+POSTGRES_INSTALL = [
+    "CREATE EXTENSION IF NOT EXISTS unaccent",
+    "CREATE TEXT SEARCH CONFIGURATION auction_lv (COPY = pg_catalog.simple)",
+    "ALTER TEXT SEARCH CONFIGURATION auction_lv ALTER MAPPING FOR hword, hword_part, word WITH unaccent, simple",
+    "CREATE TEXT SEARCH CONFIGURATION auction_en (COPY = pg_catalog.english)",
+    "ALTER TEXT SEARCH CONFIGURATION auction_en ALTER MAPPING FOR hword, hword_part, word WITH unaccent, english_stem",
+    "ALTER TABLE auctions_auction ADD COLUMN search_vector tsvector",
+    """
+    CREATE FUNCTION auctions_auction_search_vector() RETURNS trigger AS $$
+    BEGIN
+        NEW.search_vector :=
+            setweight(to_tsvector('auction_lv', coalesce(NEW.title, '')), 'A') ||
+            setweight(to_tsvector('auction_en', coalesce(NEW.title, '')), 'A') ||
+            setweight(to_tsvector('auction_lv', coalesce(NEW.description, '')), 'B') ||
+            setweight(to_tsvector('auction_en', coalesce(NEW.description, '')), 'B');
+        RETURN NEW;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE TRIGGER auctions_auction_search_vector_update
+    BEFORE INSERT OR UPDATE OF title, description ON auctions_auction
+    FOR EACH ROW EXECUTE FUNCTION auctions_auction_search_vector()
+    """,
+    # Fires the trigger for existing rows
+    "UPDATE auctions_auction SET title = title",
+    "CREATE INDEX auctions_auction_search_idx ON auctions_auction USING GIN (search_vector)",
+]
+
+POSTGRES_UNINSTALL = [
+    "DROP INDEX IF EXISTS auctions_auction_search_idx",
+    "DROP TRIGGER IF EXISTS auctions_auction_search_vector_update ON auctions_auction",
+    "DROP FUNCTION IF EXISTS auctions_auction_search_vector()",
+    "ALTER TABLE auctions_auction DROP COLUMN IF EXISTS search_vector",
+    "DROP TEXT SEARCH CONFIGURATION IF EXISTS auction_en",
+    "DROP TEXT SEARCH CONFIGURATION IF EXISTS auction_lv",
+]
+
+# Kept in step with apps.auctions.search, which recreates dropped triggers after migrate
+SQLITE_INSTALL = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS auctions_auction_fts USING fts5(
+        title, description,
+        content='auctions_auction', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS auctions_auction_fts_insert AFTER INSERT ON auctions_auction BEGIN
+        INSERT INTO auctions_auction_fts(rowid, title, description)
+        VALUES (new.id, new.title, new.description);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS auctions_auction_fts_delete AFTER DELETE ON auctions_auction BEGIN
+        INSERT INTO auctions_auction_fts(auctions_auction_fts, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS auctions_auction_fts_update AFTER UPDATE OF title, description ON auctions_auction BEGIN
+        INSERT INTO auctions_auction_fts(auctions_auction_fts, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+        INSERT INTO auctions_auction_fts(rowid, title, description)
+        VALUES (new.id, new.title, new.description);
+    END
+    """,
+    "INSERT INTO auctions_auction_fts(auctions_auction_fts) VALUES ('rebuild')",
+]
+
+SQLITE_UNINSTALL = [
+    "DROP TRIGGER IF EXISTS auctions_auction_fts_insert",
+    "DROP TRIGGER IF EXISTS auctions_auction_fts_delete",
+    "DROP TRIGGER IF EXISTS auctions_auction_fts_update",
+    "DROP TABLE IF EXISTS auctions_auction_fts",
+]
+
+
+def _execute(schema_editor, statements):
+    for statement in statements.get(schema_editor.connection.vendor, []):
+        schema_editor.execute(statement)
+
+
+def install(apps, schema_editor):
+    _execute(schema_editor, {'postgresql': POSTGRES_INSTALL, 'sqlite': SQLITE_INSTALL})
+
+
+def uninstall(apps, schema_editor):
+    _execute(schema_editor, {'postgresql': POSTGRES_UNINSTALL, 'sqlite': SQLITE_UNINSTALL})
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("auctions", "0012_auction_keyset_indexes"),
+    ]
+
+    operations = [
+        migrations.RunPython(install, uninstall),
+    ]
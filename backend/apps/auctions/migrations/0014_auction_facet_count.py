@@ -0,0 +1,56 @@
+# Generated by Django 4.2.7 on 2026-10-18 05:24
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("auctions", "0013_auction_search_index"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="AuctionFacetCount",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("draft", "Draft"),
+                            ("active", "Active"),
+                            ("paused", "Paused"),
+                            ("ended", "Ended"),
+                            ("sold", "Sold"),
+                            ("cancelled", "Cancelled"),
+                        ],
+                        max_length=20,
+                    ),
+                ),
+                ("location", models.CharField(blank=True, max_length=100)),
+                ("price_band", models.PositiveSmallIntegerField()),
+                ("count", models.PositiveIntegerField()),
+                ("refreshed_at", models.DateTimeField()),
+                (
+                    "category",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="facet_counts",
+                        to="auctions.category",
+                    ),
+                ),
+            ],
+            options={
+                "db_table": "auctions_facet_count",
+            },
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 4.2.7 on 2026-10-18 05:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("auctions", "0014_auction_facet_count"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="auction",
+            name="trending_score",
+            field=models.FloatField(
+                blank=True,
+                help_text="Decaying view score, see apps.auctions.viewcounts",
+                null=True,
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="auction",
+            index=models.Index(
+                fields=["status", "-trending_score", "-id"],
+                name="auctions_au_status_8ab28d_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 4.2.7 on 2026-10-18 06:36
+
+import apps.auctions.models
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("auctions", "0015_auction_trending_score"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="AuctionSearchIndex",
+            fields=[
+                (
+                    "auction",
+                    models.OneToOneField(
+                        db_column="rowid",
+                        db_constraint=False,
+                        on_delete=django.db.models.deletion.DO_NOTHING,
+                        primary_key=True,
+                        related_name="search_index",
+                        serialize=False,
+                        to="auctions.auction",
+                    ),
+                ),
+                ("title", models.TextField()),
+                ("description", models.TextField()),
+                (
+                    "document",
+                    apps.auctions.models.FullTextField(
+                        db_column="auctions_auction_fts"
+                    ),
+                ),
+            ],
+            options={
+                "db_table": "auctions_auction_fts",
+                "managed": False,
+            },
+        ),
+    ]
@@ -6,6 +6,24 @@ from django.utils import timezone
 User = get_user_model()
 
 
+class CategoryQuerySet(models.QuerySet):
+    """QuerySet helpers for categories."""
+
+    def reorder(self, orders):
+        """Apply a ``{category_id: display_order}`` mapping in one ``CASE`` UPDATE.
+
+        A single statement, so the new order is applied all or nothing. Ids
+        outside the queryset are ignored. Returns the number of rows updated.
+        """
+        if not orders:
+            return 0
+        return self.filter(pk__in=list(orders)).update(display_order=models.Case(
+            *[models.When(pk=pk, then=models.Value(order)) for pk, order in orders.items()],
+            default=models.F('display_order'),
+            output_field=models.IntegerField(),
+        ))
+
+
 class Category(models.Model):
     """Auction category."""
     
@@ -19,6 +37,8 @@ class Category(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    objects = CategoryQuerySet.as_manager()
+    
     class Meta:
         db_table = 'auctions_category'
         verbose_name_plural = 'Categories'
@@ -28,6 +48,47 @@ class Category(models.Model):
         return self.name
 
 
+class AuctionQuerySet(models.QuerySet):
+    """QuerySet helpers for auction listings."""
+
+    def with_list_data(self):
+        """Load everything AuctionSerializer needs in a constant number of queries.
+
+        Related users and category are joined, images are prefetched and the
+        latest bidder is annotated as ``last_bidder_username`` /
+        ``last_bidder_avatar`` instead of being looked up per row.
+        """
+        from apps.bidding.models import Bid
+
+        latest_bids = Bid.objects.filter(auction=models.OuterRef('pk')).order_by('-created_at')
+        return self.select_related('seller', 'winner', 'category').prefetch_related('images').annotate(
+            last_bidder_username=models.Subquery(latest_bids.values('bidder__username')[:1]),
+            last_bidder_avatar=models.Subquery(latest_bids.values('bidder__avatar')[:1]),
+        )
+
+    def as_cards(self):
+        """Rows for ``AuctionCardSerializer``: only the columns auction tiles need, as dicts.
+
+        The first image (primary first) and the latest bidder are annotated,
+        so a page costs one query with no joins to users.
+        """
+        from apps.bidding.models import Bid
+        from apps.media.models import AuctionImage
+
+        images = AuctionImage.objects.filter(auction=models.OuterRef('pk')).order_by('-is_primary', 'display_order', '-created_at')
+        latest_bids = Bid.objects.filter(auction=models.OuterRef('pk')).order_by('-created_at')
+        return self.annotate(
+            card_image=models.Subquery(images.values('image')[:1]),
+            last_bidder_username=models.Subquery(latest_bids.values('bidder__username')[:1]),
+        ).values(
+            'id', 'title', 'status', 'location', 'category_id', 'category__name', 'category__slug',
+            'starting_price', 'current_highest_bid', 'minimum_increment', 'bid_count',
+            'start_time', 'end_time', 'card_image', 'last_bidder_username',
+            # Ordering keys, needed by cursor pagination
+            'created_at', 'trending_score',
+        )
+
+
 class Auction(models.Model):
     """Auction listing."""
     
@@ -71,11 +132,14 @@ class Auction(models.Model):
     # Metadata
     view_count = models.IntegerField(default=0)
     bid_count = models.IntegerField(default=0)
+    trending_score = models.FloatField(null=True, blank=True, help_text='Decaying view score, see apps.auctions.viewcounts')
     
     # Timestamps
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    objects = AuctionQuerySet.as_manager()
+    
     class Meta:
         db_table = 'auctions_auction'
         ordering = ['-created_at']
@@ -83,6 +147,12 @@ class Auction(models.Model):
             models.Index(fields=['status', '-created_at']),
             models.Index(fields=['seller', 'status']),
             models.Index(fields=['end_time']),
+            # Keyset pagination: list, live, my_auctions, my_won_auctions
+            models.Index(fields=['-created_at', '-id']),
+            models.Index(fields=['status', 'end_time', 'id']),
+            models.Index(fields=['seller', '-created_at', '-id']),
+            models.Index(fields=['winner', '-created_at', '-id']),
+            models.Index(fields=['status', '-trending_score', '-id']),
         ]
     
     def __str__(self):
@@ -112,3 +182,58 @@ class Watchlist(models.Model):
     
     def __str__(self):
         return f"{self.user.username} watching {self.auction.title}"
+
+
+class AuctionFacetCount(models.Model):
+    """Precomputed auction count for one browse facet combination.
+
+    Rebuilt wholesale by ``apps.auctions.facets.refresh_facet_counts``.
+    """
+    
+    status = models.CharField(max_length=20, choices=Auction.STATUS_CHOICES)
+    category = models.ForeignKey(Category, on_delete=models.CASCADE, related_name='facet_counts')
+    location = models.CharField(max_length=100, blank=True)
+    price_band = models.PositiveSmallIntegerField()
+    count = models.PositiveIntegerField()
+    
+    refreshed_at = models.DateTimeField()
+    
+    class Meta:
+        db_table = 'auctions_facet_count'
+    
+    def __str__(self):
+        return f"{self.status}/{self.category_id}/{self.location}/{self.price_band}: {self.count}"
+
+
+class FullTextField(models.TextField):
+    """The FTS5 hidden column named after its table, only usable with ``__match``."""
+
+
+@FullTextField.register_lookup
+class Match(models.Lookup):
+    lookup_name = 'match'
+    
+    def as_sql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return f'{lhs} MATCH {rhs}', [*lhs_params, *rhs_params]
+
+
+class AuctionSearchIndex(models.Model):
+    """Row of the SQLite FTS5 index over auction titles and descriptions.
+    
+    The table is created by migration ``0013_auction_search_index`` on
+    SQLite only and queried through ``apps.auctions.search``.
+    """
+    
+    auction = models.OneToOneField(
+        Auction, primary_key=True, db_column='rowid', db_constraint=False,
+        on_delete=models.DO_NOTHING, related_name='search_index',
+    )
+    title = models.TextField()
+    description = models.TextField()
+    document = FullTextField(db_column='auctions_auction_fts')
+    
+    class Meta:
+        managed = False
+        db_table = 'auctions_auction_fts'
@@ -0,0 +1,131 @@
+"""Full-text search over auction titles and descriptions.
+
+PostgreSQL keeps a ``search_vector`` tsvector column up to date with a
+trigger and indexes it with GIN. Two text search configurations are
+combined: ``auction_lv`` (unaccent + simple, since Postgres ships no Latvian
+stemmer) and ``auction_en`` (unaccent + English stemmer), so "Automasinas"
+matches "Automašīnas" and "watches" matches "watch". SQLite development
+databases use an external-content FTS5 table with ``remove_diacritics``.
+
+Both are created by migration ``0013_auction_search_index``. The column is
+not part of the ``Auction`` model; the FTS5 table is mapped by the unmanaged
+``AuctionSearchIndex`` so queries can join it. Both are only reached
+through ``search_auctions``.
+"""
+import re
+
+from django.db import connection
+from django.db.models import BooleanField, FloatField, TextField
+from django.db.models.expressions import RawSQL
+
+MAX_TERMS = 8
+SNIPPET_START = '<mark>'
+SNIPPET_STOP = '</mark>'
+
+SQLITE_TABLE = """
+    CREATE VIRTUAL TABLE IF NOT EXISTS auctions_auction_fts USING fts5(
+        title, description,
+        content='auctions_auction', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+"""
+
+SQLITE_TRIGGERS = {
+    'auctions_auction_fts_insert': """
+        CREATE TRIGGER auctions_auction_fts_insert AFTER INSERT ON auctions_auction BEGIN
+            INSERT INTO auctions_auction_fts(rowid, title, description)
+            VALUES (new.id, new.title, new.description);
+        END
+    """,
+    'auctions_auction_fts_delete': """
+        CREATE TRIGGER auctions_auction_fts_delete AFTER DELETE ON auctions_auction BEGIN
+            INSERT INTO auctions_auction_fts(auctions_auction_fts, rowid, title, description)
+            VALUES ('delete', old.id, old.title, old.description);
+        END
+    """,
+    'auctions_auction_fts_update': """
+        CREATE TRIGGER auctions_auction_fts_update AFTER UPDATE OF title, description ON auctions_auction BEGIN
+            INSERT INTO auctions_auction_fts(auctions_auction_fts, rowid, title, description)
+            VALUES ('delete', old.id, old.title, old.description);
+            INSERT INTO auctions_auction_fts(rowid, title, description)
+            VALUES (new.id, new.title, new.description);
+        END
+    """,
+}
+
+
+def ensure_sqlite_index(db_connection):
+    """Create the FTS5 table and triggers if missing, rebuilding the index if so.
+
+    SQLite migrations that alter ``auctions_auction`` recreate the table and
+    silently drop its triggers, so this also runs after every ``migrate``.
+    """
+    with db_connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'trigger' AND tbl_name = 'auctions_auction'"
+        )
+        existing = {row[0] for row in cursor.fetchall()}
+        missing = [name for name in SQLITE_TRIGGERS if name not in existing]
+        if not missing:
+            return False
+        cursor.execute(SQLITE_TABLE)
+        for name in missing:
+            cursor.execute(SQLITE_TRIGGERS[name])
+        cursor.execute("INSERT INTO auctions_auction_fts(auctions_auction_fts) VALUES ('rebuild')")
+    return True
+
+
+def search_terms(text):
+    """Split user input into at most ``MAX_TERMS`` lowercase word tokens."""
+    return re.findall(r'\w+', text.lower())[:MAX_TERMS]
+
+
+def _postgres(queryset, terms):
+    # Terms are \w+ only, so they are safe inside a to_tsquery expression
+    tsquery = ' & '.join(f'{term}:*' for term in terms)
+    query_sql = "(to_tsquery('auction_lv', %s) || to_tsquery('auction_en', %s))"
+    return queryset.filter(
+        RawSQL(f'"auctions_auction"."search_vector" @@ {query_sql}', (tsquery, tsquery), output_field=BooleanField()),
+    ).annotate(
+        search_rank=RawSQL(
+            f'ts_rank_cd("auctions_auction"."search_vector", {query_sql})',
+            (tsquery, tsquery), output_field=FloatField(),
+        ),
+        search_snippet=RawSQL(
+            "ts_headline('auction_lv', \"auctions_auction\".\"description\", "
+            f"{query_sql}, %s)",
+            (tsquery, tsquery, f'StartSel={SNIPPET_START}, StopSel={SNIPPET_STOP}, MaxFragments=2'),
+            output_field=TextField(),
+        ),
+    )
+
+
+def _sqlite(queryset, terms):
+    match = ' '.join(f'"{term}"*' for term in terms)
+    # Filtering through the relation joins the FTS table, which bm25() and
+    # snippet() need in the same query as the MATCH
+    return queryset.filter(search_index__document__match=match).annotate(
+        # bm25() is lower for better matches; negate so both backends sort descending
+        search_rank=RawSQL('-bm25("auctions_auction_fts", 10.0, 1.0)', (), output_field=FloatField()),
+        search_snippet=RawSQL(
+            """snippet("auctions_auction_fts", -1, %s, %s, '…', 16)""",
+            (SNIPPET_START, SNIPPET_STOP), output_field=TextField(),
+        ),
+    )
+
+
+def search_auctions(queryset, text):
+    """Filter ``queryset`` to auctions matching ``text`` by prefix, ignoring diacritics.
+
+    Results are annotated with ``search_rank`` (higher is better) and
+    ``search_snippet`` (description excerpt with matches wrapped in
+    ``<mark>``) and ordered by rank.
+    """
+    terms = search_terms(text)
+    if not terms:
+        return queryset.none()
+    if connection.vendor == 'postgresql':
+        queryset = _postgres(queryset, terms)
+    else:
+        queryset = _sqlite(queryset, terms)
+    return queryset.order_by('-search_rank', '-id')
@@ -2,7 +2,13 @@
 from rest_framework import serializers
 from .models import Auction, Category, Watchlist
 from apps.users.serializers import UserSerializer
+from django.contrib.auth import get_user_model
+from django.core.files.storage import default_storage
 from django.utils import timezone
+from django.utils.html import escape
+from .search import SNIPPET_START, SNIPPET_STOP
+
+User = get_user_model()
 
 
 CATEGORY_PLACEHOLDER_IMAGES = {
@@ -68,7 +74,6 @@ class AuctionSerializer(serializers.ModelSerializer):
     last_bidder = serializers.SerializerMethodField()
     image = serializers.SerializerMethodField()
     images = AuctionImageSerializer(many=True, read_only=True)
-    timeRemaining = serializers.SerializerMethodField()
     
     class Meta:
         model = Auction
@@ -78,7 +83,7 @@ class AuctionSerializer(serializers.ModelSerializer):
             'current_highest_bid', 'current_bid', 'minimum_increment', 
             'winner', 'final_price', 'start_time', 'end_time', 'status', 
             'anti_snipe_seconds', 'view_count', 'bid_count', 'numberOfBids',
-            'last_bidder', 'image', 'images', 'timeRemaining', 'location'
+            'last_bidder', 'image', 'images', 'location'
         ]
         read_only_fields = [
             'id', 'seller', 'winner', 'current_highest_bid', 'final_price',
@@ -92,27 +97,37 @@ class AuctionSerializer(serializers.ModelSerializer):
     
     def get_last_bidder(self, obj):
         """Get the username of the last bidder."""
-        last_bid = obj.bids.order_by('-created_at').first()
-        if last_bid and last_bid.bidder:
+        if hasattr(obj, 'last_bidder_username'):
+            # Annotated by AuctionQuerySet.with_list_data()
+            bidder = None
+            if obj.last_bidder_username:
+                bidder = User(username=obj.last_bidder_username, avatar=obj.last_bidder_avatar)
+        else:
+            last_bid = obj.bids.select_related('bidder').order_by('-created_at').first()
+            bidder = last_bid.bidder if last_bid else None
+
+        if bidder:
             avatar_url = None
-            if last_bid.bidder.avatar:
+            if bidder.avatar:
                 request = self.context.get('request')
-                avatar_url = self._build_media_url(request, last_bid.bidder.avatar)
+                avatar_url = self._build_media_url(request, bidder.avatar)
             
             return {
-                'username': last_bid.bidder.username,
+                'username': bidder.username,
                 'avatar': avatar_url
             }
         return None
     
     def get_image(self, obj):
         """Get primary image or first image."""
-        primary_image = obj.images.filter(is_primary=True).first()
+        # Iterate .all() so prefetched images are reused instead of queried
+        images = list(obj.images.all())
+        primary_image = next((image for image in images if image.is_primary), None)
         if primary_image and primary_image.image:
             request = self.context.get('request')
             return self._build_media_url(request, primary_image.image)
         
-        first_image = obj.images.first()
+        first_image = images[0] if images else None
         if first_image and first_image.image:
             request = self.context.get('request')
             return self._build_media_url(request, first_image.image)
@@ -125,24 +140,71 @@ class AuctionSerializer(serializers.ModelSerializer):
             )
         
         return "https://picsum.photos/seed/auction/800/600"
+
+
+CARD_FIELDS = [
+    'id', 'title', 'status', 'location', 'category', 'starting_price', 'current_bid',
+    'minimum_increment', 'bid_count', 'start_time', 'end_time', 'image', 'last_bidder',
+]
+
+
+class AuctionCardSerializer(serializers.BaseSerializer):
+    """Compact read-only auction tile built from ``Auction.objects.as_cards()`` rows.
+
+    Emits only ``CARD_FIELDS`` (or the subset in ``context['fields']``) as
+    plain JSON types, formatted like ``AuctionSerializer`` but without
+    instantiating a DRF field per value.
+    """
+
+    def _datetime(self, value):
+        if value is None:
+            return None
+        value = timezone.localtime(value).isoformat()
+        return value[:-6] + 'Z' if value.endswith('+00:00') else value
+
+    def _image(self, row):
+        if row['card_image']:
+            url = default_storage.url(row['card_image'])
+            request = self.context.get('request')
+            return request.build_absolute_uri(url) if request else url
+        return CATEGORY_PLACEHOLDER_IMAGES.get(row['category__name'], "https://picsum.photos/seed/auction/800/600")
+
+    def to_representation(self, row):
+        current_bid = row['current_highest_bid']
+        card = {
+            'id': row['id'],
+            'title': row['title'],
+            'status': row['status'],
+            'location': row['location'],
+            'category': {'id': row['category_id'], 'name': row['category__name'], 'slug': row['category__slug']},
+            'starting_price': str(row['starting_price']),
+            'current_bid': None if current_bid is None else str(current_bid),
+            'minimum_increment': str(row['minimum_increment']),
+            'bid_count': row['bid_count'],
+            'start_time': self._datetime(row['start_time']),
+            'end_time': self._datetime(row['end_time']),
+            'image': self._image(row),
+            'last_bidder': {'username': row['last_bidder_username']} if row['last_bidder_username'] else None,
+        }
+        fields = self.context.get('fields')
+        if fields:
+            return {field: card[field] for field in fields}
+        return card
+
+
+class AuctionSearchSerializer(AuctionSerializer):
+    """Auction serializer for search results, with rank and highlighted snippet."""
     
-    def get_timeRemaining(self, obj):
-        """Calculate time remaining in human readable format."""
-        now = timezone.now()
-        if obj.end_time <= now:
-            return "Beigusies"
-        
-        delta = obj.end_time - now
-        days = delta.days
-        hours = delta.seconds // 3600
-        minutes = (delta.seconds % 3600) // 60
-        
-        if days > 0:
-            return f"{days}d {hours}h"
-        elif hours > 0:
-            return f"{hours}h {minutes}m"
-        else:
-            return f"{minutes}m"
+    rank = serializers.FloatField(source='search_rank', read_only=True)
+    highlight = serializers.SerializerMethodField()
+    
+    class Meta(AuctionSerializer.Meta):
+        fields = AuctionSerializer.Meta.fields + ['rank', 'highlight']
+    
+    def get_highlight(self, obj):
+        """Return the snippet HTML-escaped except for the match markers."""
+        snippet = escape(obj.search_snippet or '')
+        return snippet.replace(escape(SNIPPET_START), SNIPPET_START).replace(escape(SNIPPET_STOP), SNIPPET_STOP)
 
 
 class WatchlistSerializer(serializers.ModelSerializer):
@@ -0,0 +1,12 @@
+"""Auctions app signals.
+
+Sent for changes made through queryset ``update()``/``bulk_update()``,
+which bypass ``post_save``.
+"""
+from django.dispatch import Signal
+
+# Sent with ``auction_ids`` after bids, hot book flushes and closing
+auctions_changed = Signal()
+
+# Sent after categories change in bulk, e.g. when reordered
+categories_changed = Signal()
@@ -0,0 +1,25 @@
+"""Auctions app Celery tasks."""
+from celery import shared_task
+from django.conf import settings
+from django.utils import timezone
+from .closing import settle_due_auctions
+from .facets import refresh_facet_counts
+
+
+@shared_task
+def close_due_auctions():
+    """Sweep recently ended auctions that are still marked active.
+
+    Only the last ``AUCTION_CLOSE_SWEEP_LOOKBACK_SECONDS`` of ``end_time`` are
+    scanned; ``run_auction_closer`` is the primary closer and catches up on
+    older auctions when it starts.
+    """
+    now = timezone.now()
+    since = now - timezone.timedelta(seconds=settings.AUCTION_CLOSE_SWEEP_LOOKBACK_SECONDS)
+    return len(settle_due_auctions(now, since=since))
+
+
+@shared_task
+def refresh_auction_facets():
+    """Rebuild the browse facet counts; runs every ``AUCTION_FACET_REFRESH_SECONDS``."""
+    return refresh_facet_counts()
@@ -0,0 +1,832 @@
+"""Tests for Auctions app."""
+
+import json
+import math
+import time
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
+
+from django.contrib import admin
+from django.contrib.auth import get_user_model
+from django.core.cache import cache, caches
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django.utils.http import http_date
+from rest_framework.test import APIClient
+
+from apps.auctions.closing import CloseScheduler, settle_due_auctions
+from apps.auctions.facets import refresh_facet_counts
+from apps.auctions.viewcounts import ViewCounter, auction_views, trending_score
+from apps.auctions.models import Auction, Category, Watchlist
+from apps.auctions.serializers import CARD_FIELDS
+from apps.auctions.signals import auctions_changed, categories_changed
+from apps.bidding.models import Bid
+from apps.bidding.services import submit_bid
+from apps.bidding.testing import fake_redis_caches
+from apps.media.models import AuctionImage
+from apps.users.activity import PeriodicFlusher, write_behind_flusher
+from benchmarks.serializers import CASES, load_baseline, measure, seed
+
+User = get_user_model()
+
+
+class AuctionListQueryCountTest(TestCase):
+    """List endpoints must cost the same number of queries regardless of size."""
+
+    def setUp(self):
+        """Set up test data."""
+        self.client = APIClient()
+        self.seller = User.objects.create_user(username="seller", password="testpass123")
+        self.bidder = User.objects.create_user(username="bidder", password="testpass123")
+        self.category = Category.objects.create(name="Test category", slug="test-category")
+        self.client.force_authenticate(self.seller)
+
+    def _create_auctions(self, count):
+        now = timezone.now()
+        for index in range(count):
+            auction = Auction.objects.create(
+                title=f"Auction {index}",
+                description="Test auction",
+                category=self.category,
+                seller=self.seller,
+                winner=self.bidder,
+                starting_price=10,
+                start_time=now,
+                end_time=now + timedelta(days=1),
+                status="active",
+            )
+            AuctionImage.objects.create(auction=auction, image="auction_images/a.jpg")
+            AuctionImage.objects.create(auction=auction, image="auction_images/b.jpg", is_primary=True)
+            Bid.objects.create(auction=auction, bidder=self.bidder, amount=15)
+            Watchlist.objects.create(user=self.seller, auction=auction)
+
+    def _count_queries(self, url):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(context.captured_queries), response
+
+    def _assert_constant_queries(self, url, max_queries):
+        self._create_auctions(2)
+        small, _ = self._count_queries(url)
+        self._create_auctions(10)
+        large, response = self._count_queries(url)
+        self.assertEqual(small, large)
+        self.assertLessEqual(large, max_queries)
+        return response
+
+    def test_list_query_count(self):
+        """Test the paginated auction list."""
+        response = self._assert_constant_queries("/api/auctions/auctions/", 3)
+        auction = response.data["results"][0]
+        self.assertEqual(auction["last_bidder"]["username"], "bidder")
+        self.assertTrue(auction["image"].endswith("auction_images/b.jpg"))
+
+    def test_live_query_count(self):
+        """Test the live auctions action."""
+        self._assert_constant_queries("/api/auctions/auctions/live/", 3)
+
+    def test_my_auctions_query_count(self):
+        """Test the seller's own auctions action."""
+        self._assert_constant_queries("/api/auctions/auctions/my_auctions/", 3)
+
+    def test_my_won_auctions_query_count(self):
+        """Test the won auctions action."""
+        self.client.force_authenticate(self.bidder)
+        self._assert_constant_queries("/api/auctions/auctions/my_won_auctions/", 3)
+
+    def test_watchlist_query_count(self):
+        """Test the watchlist view."""
+        response = self._assert_constant_queries("/api/auctions/watchlist/", 3)
+        self.assertEqual(response.data[0]["auction"]["last_bidder"]["username"], "bidder")
+
+    def test_card_view_query_count(self):
+        """Test that cards cost one query per page plus the count."""
+        response = self._assert_constant_queries("/api/auctions/auctions/?view=card", 2)
+        full = self.client.get("/api/auctions/auctions/").data["results"][0]
+        card = response.data["results"][0]
+        self.assertEqual(set(card), set(CARD_FIELDS))
+        for field in ("id", "title", "status", "starting_price", "current_bid", "bid_count", "end_time", "image"):
+            self.assertEqual(card[field], full[field], field)
+        self.assertEqual(card["category"]["name"], "Test category")
+        self.assertEqual(card["last_bidder"], {"username": "bidder"})
+        self._assert_constant_queries("/api/auctions/auctions/live/?view=card&pagination=cursor", 1)
+
+    def test_card_fields_subset(self):
+        """Test that ?fields= narrows the card and rejects unknown fields."""
+        self._create_auctions(1)
+        response = self.client.get("/api/auctions/auctions/", {"fields": "id,end_time"})
+        self.assertEqual(list(response.data["results"][0]), ["id", "end_time"])
+        response = self.client.get("/api/auctions/auctions/", {"fields": "id,seller"})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data, {"error": "unknown fields: seller"})
+
+    def test_serializer_without_annotations(self):
+        """Test that a plain instance still serializes last bidder and image."""
+        self._create_auctions(1)
+        response = self.client.get(f"/api/auctions/auctions/{Auction.objects.get().pk}/")
+        self.assertEqual(response.data["last_bidder"]["username"], "bidder")
+        self.assertTrue(response.data["image"].endswith("auction_images/b.jpg"))
+
+
+class KeysetPaginationTest(TestCase):
+    """Test cursor pagination of auction listings."""
+
+    def setUp(self):
+        """Set up test data."""
+        self.client = APIClient()
+        self.seller = User.objects.create(username="seller")
+        self.category, _ = Category.objects.get_or_create(
+            slug="test-category", defaults={"name": "Test category"}
+        )
+        now = timezone.now()
+        Auction.objects.bulk_create([
+            Auction(
+                title=f"Auction {index}",
+                description="Test auction",
+                category=self.category,
+                seller=self.seller,
+                starting_price=10,
+                start_time=now,
+                end_time=now + timedelta(hours=index + 1),
+                status="active",
+            )
+            for index in range(25)
+        ])
+
+    def _walk(self, url):
+        titles, pages = [], 0
+        while url:
+            with CaptureQueriesContext(connection) as context:
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertNotIn("count", response.data)
+            self.assertFalse(any("COUNT(" in query["sql"] for query in context.captured_queries))
+            titles.extend(auction["title"] for auction in response.data["results"])
+            url = response.data["next"]
+            pages += 1
+        return titles, pages
+
+    def test_cursor_walks_every_auction_once(self):
+        """Test that following next cursors returns each auction exactly once."""
+        titles, pages = self._walk("/api/auctions/auctions/?pagination=cursor&page_size=10")
+        self.assertEqual(pages, 3)
+        self.assertEqual(sorted(titles), sorted(f"Auction {index}" for index in range(25)))
+
+    def test_live_is_paginated_by_end_time(self):
+        """Test that live auctions are paged, ending soonest first."""
+        response = self.client.get("/api/auctions/auctions/live/")
+        self.assertEqual(response.data["count"], 25)
+        self.assertEqual(len(response.data["results"]), 20)
+
+        titles, _ = self._walk("/api/auctions/auctions/live/?pagination=cursor&page_size=7")
+        self.assertEqual(titles, [f"Auction {index}" for index in range(25)])
+
+
+class AuctionSearchTest(TestCase):
+    """Test the full-text search endpoint."""
+
+    def setUp(self):
+        """Set up test data."""
+        self.client = APIClient()
+        seller = User.objects.create(username="seller")
+        category, _ = Category.objects.get_or_create(
+            slug="test-category", defaults={"name": "Test category"}
+        )
+        now = timezone.now()
+
+        def create(title, description):
+            return Auction.objects.create(
+                title=title,
+                description=description,
+                category=category,
+                seller=seller,
+                starting_price=10,
+                start_time=now,
+                end_time=now + timedelta(days=1),
+                status="active",
+            )
+
+        self.car = create("Automašīnas rezerves daļas", "Lietotas daļas <b>labā</b> stāvoklī")
+        self.mention = create("Velosipēds", "Var mainīt pret automašīnas riepām")
+        self.watch = create("Rokas pulkstenis", "Mehānisks pulkstenis")
+
+    def _search(self, query, **params):
+        response = self.client.get("/api/auctions/auctions/search/", {"q": query, **params})
+        self.assertEqual(response.status_code, 200)
+        return response.data["results"]
+
+    def test_matches_without_diacritics(self):
+        """Test that unaccented and prefix queries match Latvian text."""
+        self.assertEqual([a["id"] for a in self._search("Automasinas")], [self.car.pk, self.mention.pk])
+        self.assertEqual([a["id"] for a in self._search("pulkst")], [self.watch.pk])
+        self.assertEqual(self._search("laptop"), [])
+
+    def test_title_matches_rank_first(self):
+        """Test that a title match outranks a description match."""
+        first, second = self._search("automašīnas")
+        self.assertGreater(first["rank"], second["rank"])
+        self.assertEqual(first["id"], self.car.pk)
+
+    def test_highlight_is_escaped(self):
+        """Test that snippets mark matches and escape the description HTML."""
+        result = self._search("labā daļas")[0]
+        self.assertIn("<mark>", result["highlight"])
+        self.assertIn("&lt;b&gt;", result["highlight"])
+
+    def test_index_follows_updates(self):
+        """Test that renamed and deleted auctions are reindexed."""
+        self.watch.title = "Sienas kalendārs"
+        self.watch.save()
+        self.assertEqual([a["id"] for a in self._search("kalendars")], [self.watch.pk])
+        self.assertEqual([a["id"] for a in self._search("rokas")], [])
+        self.car.delete()
+        self.assertEqual([a["id"] for a in self._search("automasinas")], [self.mention.pk])
+
+    def test_query_required(self):
+        """Test that an empty query is rejected."""
+        response = self.client.get("/api/auctions/auctions/search/", {"q": " "})
+        self.assertEqual(response.status_code, 400)
+
+
+class AuctionBrowseTest(TestCase):
+    """Test the faceted browse endpoint."""
+
+    def setUp(self):
+        """Set up test data."""
+        cache.clear()
+        self.client = APIClient()
+        seller = User.objects.create(username="seller")
+        self.cars, _ = Category.objects.get_or_create(slug="test-category", defaults={"name": "Test category"})
+        self.watches = Category.objects.create(name="Test watches", slug="test-watches")
+        now = timezone.now()
+        for category, location, price, status in [
+            (self.cars, "Rīga", 30, "active"),
+            (self.cars, "Rīga", 700, "active"),
+            (self.cars, "Liepāja", 700, "ended"),
+            (self.watches, "Rīga", 80, "active"),
+            (self.watches, None, 25000, "active"),
+        ]:
+            Auction.objects.create(
+                title="Lot",
+                description="Lot",
+                category=category,
+                seller=seller,
+                location=location,
+                starting_price=price,
+                start_time=now,
+                end_time=now + timedelta(days=1),
+                status=status,
+            )
+        refresh_facet_counts()
+
+    def _browse(self, **params):
+        response = self.client.get("/api/auctions/auctions/browse/", params)
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    @staticmethod
+    def _counts(facet, key):
+        return {entry[key]: entry["count"] for entry in facet if entry["count"]}
+
+    def test_facets_without_filters(self):
+        """Test that every dimension is counted over all auctions."""
+        data = self._browse()
+        self.assertEqual(data["count"], 5)
+        facets = data["facets"]
+        self.assertEqual(self._counts(facets["category"], "id"), {self.cars.pk: 3, self.watches.pk: 2})
+        self.assertEqual(self._counts(facets["location"], "value"), {"Rīga": 3, "Liepāja": 1})
+        self.assertEqual(self._counts(facets["price"], "band"), {0: 1, 1: 1, 3: 2, 6: 1})
+        self.assertEqual(self._counts(facets["status"], "value"), {"active": 4, "ended": 1})
+
+    def test_filters_narrow_other_facets(self):
+        """Test that a filter narrows results and other facets but not its own."""
+        data = self._browse(status="active", location="Rīga")
+        self.assertEqual(data["count"], 3)
+        facets = data["facets"]
+        self.assertEqual(self._counts(facets["category"], "id"), {self.cars.pk: 2, self.watches.pk: 1})
+        self.assertEqual(self._counts(facets["location"], "value"), {"Rīga": 3})
+        self.assertEqual(self._counts(facets["status"], "value"), {"active": 3})
+        data = self._browse(price_band=3, category=self.cars.pk)
+        self.assertEqual(data["count"], 2)
+        self.assertEqual(self._counts(data["facets"]["price"], "band"), {0: 1, 3: 2})
+
+    def test_facets_use_precomputed_counts(self):
+        """Test that facet counts add no queries and change only on refresh."""
+        with CaptureQueriesContext(connection) as browse:
+            self._browse()
+        with CaptureQueriesContext(connection) as listing:
+            self.client.get("/api/auctions/auctions/")
+        self.assertEqual(len(browse), len(listing))
+        Auction.objects.filter(status="ended").update(status="active")
+        self.assertEqual(self._counts(self._browse()["facets"]["status"], "value"), {"active": 4, "ended": 1})
+        refresh_facet_counts()
+        self.assertEqual(self._counts(self._browse()["facets"]["status"], "value"), {"active": 5})
+
+    @override_settings(AUCTION_FACET_REFRESH_SECONDS=60)
+    def test_stale_counts_are_recounted_without_beat(self):
+        """Test that counts older than the refresh interval are recounted by the next browse."""
+        Auction.objects.filter(status="ended").update(status="active")
+        self.assertEqual(self._counts(self._browse()["facets"]["status"], "value"), {"active": 4, "ended": 1})
+        later = timezone.now() + timedelta(seconds=61)
+        with mock.patch("apps.auctions.facets.timezone.now", return_value=later):
+            data = self._browse()
+        self.assertEqual(self._counts(data["facets"]["status"], "value"), {"active": 5})
+        self.assertEqual(data["facets"]["refreshed_at"], later)
+        self.assertIsNone(cache.get("auctions:facet_counts:refreshing"))
+
+    def test_invalid_price_band(self):
+        """Test that an unknown or malformed price band is rejected."""
+        for price_band in (99, -1, "²", "x"):
+            response = self.client.get("/api/auctions/auctions/browse/", {"price_band": price_band})
+            self.assertEqual(response.status_code, 400)
+
+
+class AuctionViewCountTest(TestCase):
+    """Test buffered view counting and trending."""
+
+    def setUp(self):
+        """Set up test data."""
+        self.client = APIClient()
+        self.seller = User.objects.create(username="seller")
+        self.category, _ = Category.objects.get_or_create(
+            slug="test-category", defaults={"name": "Test category"}
+        )
+        self.auctions = [self._create() for _ in range(3)]
+        self.now = 0.0
+        self.counter = ViewCounter(flush_interval=10, dedupe_seconds=60, clock=lambda: self.now)
+        auction_views.clear()
+        self.addCleanup(auction_views.clear)
+
+    def _create(self):
+        now = timezone.now()
+        return Auction.objects.create(
+            title="Lot",
+            description="Lot",
+            category=self.category,
+            seller=self.seller,
+            starting_price=10,
+            start_time=now,
+            end_time=now + timedelta(days=1),
+            status="active",
+        )
+
+    def test_retrieve_counts_each_viewer_once(self):
+        """Test that page views are buffered and repeat viewers are not counted."""
+        auction = self.auctions[0]
+        viewer = User.objects.create(username="viewer")
+        with CaptureQueriesContext(connection) as queries:
+            for _ in range(3):
+                self.client.get(f"/api/auctions/auctions/{auction.pk}/")
+            self.client.force_authenticate(viewer)
+            for _ in range(3):
+                self.client.get(f"/api/auctions/auctions/{auction.pk}/")
+        self.assertFalse(any(q["sql"].startswith('UPDATE "auctions_auction"') for q in queries))
+        self.assertEqual(auction_views.pending(auction.pk), 2)
+        auction_views.flush()
+        auction.refresh_from_db()
+        self.assertEqual(auction.view_count, 2)
+
+    def test_flush_is_one_batch(self):
+        """Test that views of many auctions are written with one UPDATE."""
+        for index, auction in enumerate(self.auctions):
+            for viewer in range(index + 1):
+                self.counter.record(auction.pk, f"u{viewer}")
+        self.assertFalse(self.counter.record(self.auctions[0].pk, "u0"))
+        self.now = 10
+        with CaptureQueriesContext(connection) as queries:
+            self.counter.record(self.auctions[0].pk, "u9")
+        self.assertEqual(len([q for q in queries if q["sql"].startswith("UPDATE")]), 1)
+        counts = dict(Auction.objects.filter(pk__in=[a.pk for a in self.auctions]).values_list("pk", "view_count"))
+        self.assertEqual(counts, {self.auctions[0].pk: 2, self.auctions[1].pk: 2, self.auctions[2].pk: 3})
+
+    def test_flush_invalidates_cached_reads(self):
+        """Test that flushed views are announced so cached responses are refreshed."""
+        receiver = mock.Mock()
+        auctions_changed.connect(receiver)
+        self.addCleanup(auctions_changed.disconnect, receiver)
+        self.counter.record(self.auctions[0].pk, "u1")
+        self.counter.record(self.auctions[1].pk, "u1")
+        self.counter.flush()
+        receiver.assert_called_once()
+        self.assertEqual(
+            sorted(receiver.call_args.kwargs["auction_ids"]), [self.auctions[0].pk, self.auctions[1].pk]
+        )
+
+    def test_anonymous_viewers_behind_one_address(self):
+        """Test that anonymous viewers sharing an IP address are told apart by browser."""
+        auction = self.auctions[0]
+        for agent in ("Firefox", "Chrome", "Firefox"):
+            self.client.get(f"/api/auctions/auctions/{auction.pk}/", HTTP_USER_AGENT=agent, REMOTE_ADDR="10.0.0.1")
+        self.assertEqual(auction_views.pending(auction.pk), 2)
+
+    def test_periodic_flusher_writes_quiet_counters(self):
+        """Test that buffered views are written once due without another view."""
+        self.assertIn(auction_views, write_behind_flusher.buffers)
+        flusher = PeriodicFlusher()
+        flusher.register(self.counter)
+        auction = self.auctions[0]
+        self.counter.record(auction.pk, "u1")
+        flusher.flush_due()
+        self.assertEqual(self.counter.pending(auction.pk), 1)
+        self.now = 10
+        flusher.flush_due()
+        auction.refresh_from_db()
+        self.assertEqual(auction.view_count, 1)
+
+    def test_viewers_are_forgotten_after_dedupe_window(self):
+        """Test that a viewer counts again once both filter generations rotated out."""
+        auction_id = self.auctions[0].pk
+        self.assertTrue(self.counter.record(auction_id, "u1"))
+        self.now = 60
+        self.assertFalse(self.counter.record(auction_id, "u1"))
+        self.now = 120
+        self.assertTrue(self.counter.record(auction_id, "u1"))
+
+    def test_trending_score_decays(self):
+        """Test that scores halve every half-life and compare across write times."""
+        old = trending_score(None, 10, hours=0, half_life=6)
+        self.assertAlmostEqual(2 ** (old - 24 / 6), 10 / 16)
+        recent = trending_score(None, 1, hours=24, half_life=6)
+        self.assertGreater(recent, old)
+        self.assertAlmostEqual(trending_score(old, 1, hours=24, half_life=6), math.log2(1 + 10 / 16) + 4)
+
+    def test_trending_endpoint(self):
+        """Test that trending lists viewed live auctions by score."""
+        first, second, unviewed = self.auctions
+        Auction.objects.filter(pk=first.pk).update(trending_score=1.5)
+        Auction.objects.filter(pk=second.pk).update(trending_score=2.5)
+        response = self.client.get("/api/auctions/auctions/trending/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([a["id"] for a in response.data["results"]], [second.pk, first.pk])
+
+
+class ResponseCacheTest(TestCase):
+    """Test cached anonymous reads and their invalidation."""
+
+    def setUp(self):
+        """Set up test data."""
+        cache.clear()
+        self.client = APIClient()
+        self.seller = User.objects.create(username="seller")
+        self.first, _ = Category.objects.get_or_create(slug="test-category", defaults={"name": "Test category"})
+        self.second = Category.objects.create(name="Second category", slug="second-category")
+        now = timezone.now()
+        self.auction = Auction.objects.create(
+            title="Lot",
+            description="Lot",
+            category=self.first,
+            seller=self.seller,
+            starting_price=10,
+            start_time=now,
+            end_time=now + timedelta(days=1),
+            status="active",
+        )
+
+    def test_second_read_is_served_from_cache(self):
+        """Test that a repeated anonymous read is a hit without queries."""
+        first = self.client.get("/api/auctions/categories/")
+        self.assertEqual(first["X-Cache"], "MISS")
+        with CaptureQueriesContext(connection) as queries:
+            second = self.client.get("/api/auctions/categories/")
+        self.assertEqual(second["X-Cache"], "HIT")
+        self.assertEqual(len(queries), 0)
+        self.assertEqual(second.json(), first.json())
+        self.assertEqual(second["ETag"], first["ETag"])
+
+        self.client.force_authenticate(self.seller)
+        self.assertNotIn("X-Cache", self.client.get("/api/auctions/categories/"))
+
+    def test_conditional_request_gets_not_modified(self):
+        """Test that a matching If-None-Match is answered with 304."""
+        etag = self.client.get("/api/auctions/auctions/").headers["ETag"]
+        response = self.client.get("/api/auctions/auctions/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b"")
+
+    def test_if_modified_since_is_not_trusted(self):
+        """Test that changes within the same second are not hidden behind If-Modified-Since."""
+        url = f"/api/auctions/auctions/{self.auction.pk}/"
+        first = self.client.get(url)
+        self.assertNotIn("Last-Modified", first)
+        self.auction.title = "Renamed"
+        self.auction.save(update_fields=["title"])
+        response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=http_date(time.time() + 60))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["title"], "Renamed")
+
+    def test_category_changes_invalidate(self):
+        """Test that category saves and reordering start a new version."""
+        ours = {self.first.pk, self.second.pk}
+        names = lambda: [
+            c["name"] for c in self.client.get("/api/auctions/categories/", {"page_size": 100}).json()["results"]
+            if c["id"] in ours
+        ]
+        self.assertEqual(names(), ["Second category", "Test category"])
+        self.second.name = "Renamed category"
+        self.second.save()
+        self.assertEqual(names(), ["Renamed category", "Test category"])
+
+        admin = User.objects.create(username="admin", is_staff=True)
+        self.client.force_authenticate(admin)
+        self.client.post(
+            "/api/auctions/categories/reorder/", {"ordered_ids": [self.first.pk, self.second.pk]}, format="json",
+        )
+        self.client.force_authenticate(None)
+        self.assertEqual(names(), ["Test category", "Renamed category"])
+
+    def test_bids_invalidate_auction_reads(self):
+        """Test that placing a bid refreshes the cached detail and list."""
+        url = f"/api/auctions/auctions/{self.auction.pk}/"
+        etag = self.client.get(url)["ETag"]
+        self.client.get("/api/auctions/auctions/")
+        bidder = User.objects.create(username="bidder")
+        submit_bid(self.auction.pk, bidder, Decimal("15.00"))
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["X-Cache"], "MISS")
+        self.assertEqual(response.json()["current_highest_bid"], "15.00")
+        listing = self.client.get("/api/auctions/auctions/")
+        self.assertEqual(listing["X-Cache"], "MISS")
+
+    @override_settings(CACHES=fake_redis_caches("redis://fake-respcache:6379/0"))
+    def test_invalidation_reaches_other_workers(self):
+        """Test that workers sharing a Redis cache see each other's entries and invalidations."""
+        cache.clear()
+        other_worker = caches.create_connection("default")
+        url = f"/api/auctions/auctions/{self.auction.pk}/"
+        self.assertEqual(self.client.get(url)["X-Cache"], "MISS")
+        with mock.patch("apps.auctions.cache.cache", other_worker):
+            self.assertEqual(self.client.get(url)["X-Cache"], "HIT")
+            submit_bid(self.auction.pk, User.objects.create(username="bidder"), Decimal("15.00"))
+        response = self.client.get(url)
+        self.assertEqual(response["X-Cache"], "MISS")
+        self.assertEqual(response.json()["current_highest_bid"], "15.00")
+
+
+class ServerClockTest(TestCase):
+    """Test the server clock exposed for client countdowns."""
+
+    def setUp(self):
+        """Set up test data."""
+        cache.clear()
+        self.client = APIClient()
+
+    def test_time_endpoint_echoes_client_time(self):
+        """Test that the time endpoint returns server time and the client's send time."""
+        response = self.client.get("/api/auctions/time/", {"t": "123"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["client_sent"], 123)
+        self.assertAlmostEqual(response.data["server_now"], time.time() * 1000, delta=5000)
+        self.assertIn("X-Server-Now", response)
+        for sent in ("²", "x", ""):
+            response = self.client.get("/api/auctions/time/", {"t": sent})
+            self.assertEqual(response.status_code, 200)
+            self.assertIsNone(response.data["client_sent"])
+
+    def test_cached_responses_carry_fresh_server_time(self):
+        """Test that cache hits are stamped with the current server time, not the cached one."""
+        self.client.get("/api/auctions/categories/")
+        with mock.patch("apps.auctions.clock.time.time", return_value=2000.0):
+            hit = self.client.get("/api/auctions/categories/")
+        self.assertEqual(hit["X-Cache"], "HIT")
+        self.assertEqual(hit["X-Server-Now"], "2000000")
+
+    def test_auctions_do_not_carry_time_remaining(self):
+        """Test that auctions are serialized without a per-request countdown."""
+        now = timezone.now()
+        auction = Auction.objects.create(
+            title="Lot",
+            description="Lot",
+            category=Category.objects.create(name="Clock category", slug="clock-category"),
+            seller=User.objects.create(username="seller"),
+            starting_price=10,
+            start_time=now,
+            end_time=now + timedelta(hours=1),
+            status="active",
+        )
+        data = self.client.get(f"/api/auctions/auctions/{auction.pk}/").json()
+        self.assertNotIn("timeRemaining", data)
+        self.assertIn("end_time", data)
+
+
+class CategoryReorderTest(TestCase):
+    """Test bulk category reordering."""
+
+    def setUp(self):
+        """Set up test data."""
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create(username="admin", is_staff=True))
+        Category.objects.bulk_create([
+            Category(name=f"Reorder {index:04}", slug=f"reorder-{index:04}") for index in range(1000)
+        ])
+        self.ids = list(Category.objects.filter(slug__startswith="reorder-").values_list("pk", flat=True))
+        self.admin_client = Client()
+        self.admin_client.force_login(User.objects.create(username="superuser", is_staff=True, is_superuser=True))
+
+    def _orders(self):
+        return dict(Category.objects.filter(pk__in=self.ids).values_list("pk", "display_order"))
+
+    def test_thousand_categories_in_constant_queries(self):
+        """Test that reordering 1,000 categories validates and updates in one query each."""
+        ordered = list(reversed(self.ids))
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post("/api/auctions/categories/reorder/", {"ordered_ids": ordered}, format="json")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len([q for q in queries if q["sql"].startswith(("SELECT", "UPDATE"))]), 2)
+        self.assertEqual(self._orders(), {pk: index for index, pk in enumerate(ordered, start=1)})
+
+    def test_items_payload(self):
+        """Test that explicit display_order values are applied."""
+        items = [{"id": pk, "display_order": 5000 + index} for index, pk in enumerate(self.ids[:3])]
+        response = self.client.post("/api/auctions/categories/reorder/", {"items": items}, format="json")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([self._orders()[pk] for pk in self.ids[:3]], [5000, 5001, 5002])
+
+    def test_malformed_items_change_nothing(self):
+        """Test that incomplete, duplicate or non-integer items reject the whole reorder."""
+        before = self._orders()
+        first, second = self.ids[:2]
+        for items in [
+            [{"id": first, "display_order": 1}, {"id": second}],
+            [{"id": first, "display_order": 1}, {"display_order": 2}],
+            [{"id": first, "display_order": 1}, {"id": second, "display_order": None}],
+            [{"id": first, "display_order": 1}, {"id": first, "display_order": 2}],
+            [{"id": first, "display_order": True}],
+            [{"id": True, "display_order": 1}],
+            [{"id": first, "display_order": 1.5}],
+            [first, second],
+        ]:
+            response = self.client.post("/api/auctions/categories/reorder/", {"items": items}, format="json")
+            self.assertEqual(response.status_code, 400, items)
+        response = self.client.post(
+            "/api/auctions/categories/reorder/", {"ordered_ids": [first, True]}, format="json",
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self._orders(), before)
+
+    def test_unknown_ids_change_nothing(self):
+        """Test that an unknown id rejects the whole reorder."""
+        before = self._orders()
+        response = self.client.post(
+            "/api/auctions/categories/reorder/", {"ordered_ids": [self.ids[1], self.ids[0], 999999]}, format="json",
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data["ids"], [999999])
+        self.assertEqual(self._orders(), before)
+
+    def _admin_reorder(self, updated_items):
+        return self.admin_client.post(
+            "/admin/auctions/category/adminsortable2_update/",
+            json.dumps({"updatedItems": updated_items}),
+            content_type="application/json",
+        )
+
+    def test_admin_drag_and_drop(self):
+        """Test that the sortable admin endpoint reorders with one UPDATE and invalidates cached reads."""
+        receiver = mock.Mock()
+        categories_changed.connect(receiver)
+        self.addCleanup(categories_changed.disconnect, receiver)
+        with CaptureQueriesContext(connection) as queries:
+            response = self._admin_reorder([[pk, 10 + index] for index, pk in enumerate(self.ids)])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.content, b"Updated 1000 items")
+        updates = [q["sql"] for q in queries if q["sql"].startswith("UPDATE")]
+        self.assertEqual(len(updates), 1, updates)
+        self.assertEqual(self._orders()[self.ids[-1]], 1009)
+        receiver.assert_called_once()
+
+    def test_admin_unknown_ids_change_nothing(self):
+        """Test that the sortable admin endpoint rejects unknown ids with 400."""
+        before = self._orders()
+        response = self._admin_reorder([[self.ids[0], 5], [999999, 6]])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self._orders(), before)
+
+
+class AuctionClosingTest(TestCase):
+    """Test settling ended auctions and the close scheduler."""
+
+    def setUp(self):
+        """Set up test data."""
+        self.seller = User.objects.create(username="seller")
+        self.bidder = User.objects.create(username="bidder")
+        self.category, _ = Category.objects.get_or_create(
+            slug="test-category", defaults={"name": "Test category"}
+        )
+        self.now = timezone.now()
+
+    def _create_auction(self, end_in, **kwargs):
+        defaults = {
+            "title": "Closing auction",
+            "description": "Test auction",
+            "category": self.category,
+            "seller": self.seller,
+            "starting_price": 10,
+            "start_time": self.now - timedelta(days=1),
+            "end_time": self.now + timedelta(seconds=end_in),
+            "status": "active",
+        }
+        defaults.update(kwargs)
+        return Auction.objects.create(**defaults)
+
+    def _bid(self, auction, amount):
+        Bid.objects.create(auction=auction, bidder=self.bidder, amount=amount)
+        Auction.objects.filter(pk=auction.pk).update(current_highest_bid=amount, bid_count=1)
+
+    def test_sold_when_reserve_met(self):
+        """Test that an ended auction with a bid above the reserve is sold."""
+        auction = self._create_auction(-1, reserve_price=20)
+        self._bid(auction, 25)
+        closed = settle_due_auctions(self.now)
+        self.assertEqual([a.pk for a in closed], [auction.pk])
+        auction.refresh_from_db()
+        self.assertEqual(auction.status, "sold")
+        self.assertEqual(auction.winner, self.bidder)
+        self.assertEqual(auction.final_price, 25)
+
+    def test_ended_without_bids_or_reserve(self):
+        """Test that auctions without bids or below reserve end unsold."""
+        no_bids = self._create_auction(-1)
+        below_reserve = self._create_auction(-1, reserve_price=100)
+        self._bid(below_reserve, 25)
+        settle_due_auctions(self.now)
+        for auction in (no_bids, below_reserve):
+            auction.refresh_from_db()
+            self.assertEqual(auction.status, "ended")
+            self.assertIsNone(auction.winner)
+
+    def test_future_auctions_untouched(self):
+        """Test that auctions still running are not closed."""
+        auction = self._create_auction(60)
+        self.assertEqual(settle_due_auctions(self.now), [])
+        auction.refresh_from_db()
+        self.assertEqual(auction.status, "active")
+
+    def test_batches_use_constant_queries(self):
+        """Test that settling costs the same queries for 3 or 30 auctions."""
+        def settle(count):
+            for index in range(count):
+                auction = self._create_auction(-1)
+                if index % 2:
+                    self._bid(auction, 25)
+            with CaptureQueriesContext(connection) as context:
+                closed = settle_due_auctions(self.now)
+            self.assertEqual(len(closed), count)
+            return len(context.captured_queries)
+
+        self.assertEqual(settle(4), settle(30))
+
+    def test_scheduler_closes_due_auctions(self):
+        """Test that the scheduler loads upcoming closes and settles them when due."""
+        soon = self._create_auction(2)
+        later = self._create_auction(3600)
+        scheduler = CloseScheduler(horizon=60, refill_interval=5)
+        scheduler.refill(self.now)
+        self.assertEqual(len(scheduler), 1)
+        self.assertAlmostEqual(scheduler.seconds_until_next(self.now), 2, places=3)
+        self.assertEqual(scheduler.tick(self.now), [])
+
+        closed = scheduler.tick(self.now + timedelta(seconds=3))
+        self.assertEqual([a.pk for a in closed], [soon.pk])
+        later.refresh_from_db()
+        self.assertEqual(later.status, "active")
+
+    def test_scheduler_follows_extensions(self):
+        """Test that an auction extended by anti-snipe is requeued instead of closed."""
+        auction = self._create_auction(2)
+        scheduler = CloseScheduler(horizon=60, refill_interval=5)
+        scheduler.refill(self.now)
+        extended = self.now + timedelta(seconds=30)
+        Auction.objects.filter(pk=auction.pk).update(end_time=extended)
+
+        self.assertEqual(scheduler.tick(self.now + timedelta(seconds=3)), [])
+        auction.refresh_from_db()
+        self.assertEqual(auction.status, "active")
+        self.assertEqual(scheduler.pop_due(extended), [auction.pk])
+
+    def test_reschedule_supersedes_previous_entry(self):
+        """Test that rescheduling moves a close rather than duplicating it."""
+        scheduler = CloseScheduler(horizon=60, refill_interval=5)
+        scheduler.reschedule(1, self.now + timedelta(seconds=1))
+        scheduler.reschedule(1, self.now + timedelta(seconds=10))
+        self.assertEqual(scheduler.pop_due(self.now + timedelta(seconds=5)), [])
+        self.assertEqual(scheduler.pop_due(self.now + timedelta(seconds=10)), [1])
+        self.assertEqual(len(scheduler), 0)
+
+
+class SerializerBenchmarkTest(TestCase):
+    """Test the serializer benchmark suite against its stored baselines."""
+
+    def test_query_counts_match_baseline(self):
+        """Test that no benchmarked serializer needs more queries than its baseline."""
+        user = seed(10)
+        baseline = load_baseline()
+        for name in CASES:
+            with self.subTest(name):
+                result = measure(name, user, 10, repeat=1)
+                self.assertLessEqual(result["queries"], baseline[name]["10"]["queries"])
@@ -14,5 +14,6 @@ urlpatterns = [
     path('', include(router.urls)),
     path('categories/<int:pk>/update/', views.UpdateCategoryView.as_view(), name='category-update'),
     path('watchlist/', views.WatchlistView.as_view(), name='watchlist'),
+    path('time/', views.ServerTimeView.as_view(), name='server-time'),
     path('auctions/live/', views.AuctionViewSet.as_view({'get': 'live'}), name='auction-live'),
 ]
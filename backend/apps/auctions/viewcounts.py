@@ -0,0 +1,186 @@
+"""Buffered auction view counting and trending scores.
+
+``AuctionViewSet.retrieve`` records a view per request in a per-process
+``ViewCounter`` instead of updating the auction row. Repeat views by the
+same user (or, for anonymous visitors, session, or else IP address and user
+agent) are dropped by a rotating
+pair of Bloom filters, so a viewer counts at most once per
+``AUCTION_VIEW_DEDUPE_SECONDS`` to twice that. Once
+``AUCTION_VIEW_FLUSH_SECONDS`` have passed the buffered deltas are written in
+one batch, by the next ``record()`` or by the periodic flusher shared with
+the activity buffer: ``view_count`` is bumped with ``F()`` and ``trending_score``
+absorbs the new views. The flushed auctions are announced with
+``auctions_changed`` so cached responses pick up the new counts.
+
+``trending_score`` is an exponentially decaying view count with a half-life
+of ``AUCTION_TRENDING_HALF_LIFE_HOURS``, stored as
+``log2(score) + hours / half_life``. In that form scores written at
+different times compare correctly without ever being decayed in place, so
+trending is a plain ``ORDER BY trending_score DESC``.
+
+Like the activity buffer, views buffered when a process is killed are lost.
+"""
+import hashlib
+import logging
+import math
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, F, FloatField, IntegerField, Value, When
+from django.utils import timezone
+from apps.users.activity import write_behind_flusher
+from .signals import auctions_changed
+
+logger = logging.getLogger('backend')
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter over strings."""
+
+    def __init__(self, capacity, error_rate=0.01):
+        self.size = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, item):
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], 'little')
+        second = int.from_bytes(digest[8:], 'little') | 1
+        return [(first + index * second) % self.size for index in range(self.hashes)]
+
+    def __contains__(self, item):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+    def add(self, item):
+        for position in self._positions(item):
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+
+def trending_score(previous, views, hours, half_life):
+    """Add ``views`` at time ``hours`` to a score stored as ``log2(score) + hours / half_life``."""
+    now = hours / half_life
+    decayed = 0.0 if previous is None else 2 ** (previous - now)
+    return math.log2(decayed + views) + now
+
+
+def viewer_key(request):
+    """Identify the viewer of ``request`` by user id, session, or IP address and user agent."""
+    user = getattr(request, 'user', None)
+    if user is not None and user.is_authenticated:
+        return f'u{user.pk}'
+    session = getattr(request, 'session', None)
+    if session is not None and session.session_key:
+        return f's{session.session_key}'
+    # Viewers behind one proxy or NAT share an address but rarely a browser
+    agent = hashlib.blake2b(request.META.get('HTTP_USER_AGENT', '').encode(), digest_size=8).hexdigest()
+    return f'ip{request.META.get("REMOTE_ADDR", "")}:{agent}'
+
+
+class ViewCounter:
+    """Deduplicated per-auction view deltas, flushed in bulk."""
+
+    def __init__(self, flush_interval=None, dedupe_seconds=None, capacity=100_000, clock=time.monotonic):
+        self.flush_interval = flush_interval
+        self.dedupe_seconds = dedupe_seconds
+        self.capacity = capacity
+        self.clock = clock
+        self._pending = Counter()
+        self._lock = threading.Lock()
+        self._last_flush = self._rotated_at = clock()
+        self._seen = BloomFilter(capacity)
+        self._previous = BloomFilter(capacity)
+
+    def _interval(self):
+        if self.flush_interval is not None:
+            return self.flush_interval
+        return getattr(settings, 'AUCTION_VIEW_FLUSH_SECONDS', 10)
+
+    def _dedupe_seconds(self):
+        if self.dedupe_seconds is not None:
+            return self.dedupe_seconds
+        return getattr(settings, 'AUCTION_VIEW_DEDUPE_SECONDS', 1800)
+
+    def record(self, auction_id, viewer):
+        """Count a view of ``auction_id`` unless ``viewer`` was seen recently.
+
+        Returns True if the view was counted.
+        """
+        key = f'{auction_id}:{viewer}'
+        now = self.clock()
+        with self._lock:
+            if now - self._rotated_at >= self._dedupe_seconds():
+                self._previous, self._seen = self._seen, BloomFilter(self.capacity)
+                self._rotated_at = now
+            counted = key not in self._seen and key not in self._previous
+            if counted:
+                self._seen.add(key)
+                self._pending[auction_id] += 1
+        self.flush_if_due()
+        return counted
+
+    def flush_if_due(self):
+        """Flush if any views are buffered and the interval has passed."""
+        with self._lock:
+            due = bool(self._pending) and self.clock() - self._last_flush >= self._interval()
+        return self.flush() if due else 0
+
+    def pending(self, auction_id):
+        """Views of ``auction_id`` not yet written."""
+        return self._pending.get(auction_id, 0)
+
+    def flush(self):
+        """Write buffered views; returns the number of auctions updated."""
+        from .models import Auction
+
+        with self._lock:
+            pending, self._pending = self._pending, Counter()
+            self._last_flush = self.clock()
+        if not pending:
+            return 0
+        half_life = getattr(settings, 'AUCTION_TRENDING_HALF_LIFE_HOURS', 6)
+        hours = timezone.now().timestamp() / 3600
+        try:
+            with transaction.atomic():
+                scores = dict(
+                    Auction.objects.select_for_update()
+                    .filter(pk__in=list(pending))
+                    .values_list('pk', 'trending_score')
+                )
+                if scores:
+                    Auction.objects.filter(pk__in=list(scores)).update(
+                        view_count=F('view_count') + Case(
+                            *[When(pk=auction_id, then=Value(pending[auction_id])) for auction_id in scores],
+                            output_field=IntegerField(),
+                        ),
+                        trending_score=Case(
+                            *[
+                                When(pk=auction_id, then=Value(
+                                    trending_score(score, pending[auction_id], hours, half_life)
+                                ))
+                                for auction_id, score in scores.items()
+                            ],
+                            output_field=FloatField(),
+                        ),
+                    )
+        except Exception:
+            logger.exception('Flushing views for %s auctions failed', len(pending))
+            with self._lock:
+                self._pending.update(pending)
+            return 0
+        if scores:
+            auctions_changed.send(sender=Auction, auction_ids=list(scores))
+        return len(scores)
+
+    def clear(self):
+        """Drop buffered views and forget seen viewers."""
+        with self._lock:
+            self._pending.clear()
+            self._seen = BloomFilter(self.capacity)
+            self._previous = BloomFilter(self.capacity)
+            self._last_flush = self._rotated_at = self.clock()
+
+
+auction_views = write_behind_flusher.register(ViewCounter())
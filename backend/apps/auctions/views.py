@@ -1,17 +1,25 @@
 """Auctions app views."""
 from rest_framework import viewsets, status, permissions
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
 from rest_framework.views import APIView
+from django.db.models import Prefetch
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework.filters import SearchFilter, OrderingFilter
+from config.pagination import paginated_response
+from apps.users.activity import track_activity
+from .cache import cached_response
+from .clock import server_now_ms
+from .facets import PRICE_BANDS, facet_counts, filter_price_band
 from .models import Auction, Category, Watchlist
-from .serializers import AuctionSerializer, CategorySerializer, WatchlistSerializer
-
-
-def _track_activity(user):
-    if user and user.is_authenticated:
-        user.update_activity()
+from .search import search_auctions
+from .serializers import (
+    CARD_FIELDS, AuctionCardSerializer, AuctionSearchSerializer, AuctionSerializer, CategorySerializer,
+    WatchlistSerializer,
+)
+from .signals import categories_changed
+from .viewcounts import auction_views, viewer_key
 
 
 class UpdateCategoryView(APIView):
@@ -31,6 +39,30 @@ class UpdateCategoryView(APIView):
             return Response({'error': 'Category not found'}, status=status.HTTP_404_NOT_FOUND)
 
 
+class ServerTimeView(APIView):
+    """Server clock for client countdowns; see ``apps.auctions.clock``."""
+    permission_classes = [permissions.AllowAny]
+    authentication_classes = []
+    
+    def get(self, request):
+        """Return the server time, echoing the client's send time ``t`` if given."""
+        try:
+            client_sent = int(request.query_params['t'])
+        except (KeyError, ValueError):
+            client_sent = None
+        return Response({
+            'server_now': server_now_ms(),
+            'client_sent': client_sent,
+        })
+
+
+def _order_number(value):
+    # int() would quietly accept True as 1 and truncate 2.5 to 2
+    if isinstance(value, bool) or (isinstance(value, float) and not value.is_integer()):
+        raise ValueError(value)
+    return int(value)
+
+
 class CategoryReorderView(APIView):
     """Reorder categories by admin."""
     permission_classes = [permissions.IsAdminUser]
@@ -39,35 +71,49 @@ class CategoryReorderView(APIView):
         ordered_ids = request.data.get("ordered_ids")
         items = request.data.get("items")
 
-        if isinstance(ordered_ids, list) and ordered_ids:
-            for index, category_id in enumerate(ordered_ids, start=1):
-                Category.objects.filter(pk=category_id).update(display_order=index)
-            return Response({"detail": "Category order updated"})
-
-        if isinstance(items, list) and items:
-            for item in items:
-                category_id = item.get("id")
-                display_order = item.get("display_order")
-                if category_id is None or display_order is None:
-                    continue
-                Category.objects.filter(pk=category_id).update(display_order=display_order)
-            return Response({"detail": "Category order updated"})
-
-        return Response(
-            {"detail": "ordered_ids or items payload required"},
-            status=status.HTTP_400_BAD_REQUEST,
-        )
+        try:
+            if isinstance(ordered_ids, list) and ordered_ids:
+                orders = {_order_number(category_id): index for index, category_id in enumerate(ordered_ids, start=1)}
+                if len(orders) != len(ordered_ids):
+                    return Response({"detail": "Duplicate category ids"}, status=status.HTTP_400_BAD_REQUEST)
+            elif isinstance(items, list) and items:
+                if not all(isinstance(item, dict) and {"id", "display_order"} <= item.keys() for item in items):
+                    return Response(
+                        {"detail": "Every item needs an id and a display_order"},
+                        status=status.HTTP_400_BAD_REQUEST,
+                    )
+                orders = {_order_number(item["id"]): _order_number(item["display_order"]) for item in items}
+                if len(orders) != len(items):
+                    return Response({"detail": "Duplicate category ids"}, status=status.HTTP_400_BAD_REQUEST)
+            else:
+                return Response(
+                    {"detail": "ordered_ids or items payload required"},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+        except (TypeError, ValueError, AttributeError):
+            return Response({"detail": "Category ids and display_order must be integers"}, status=status.HTTP_400_BAD_REQUEST)
+
+        unknown = set(orders) - set(Category.objects.filter(pk__in=list(orders)).values_list("pk", flat=True))
+        if unknown:
+            return Response(
+                {"detail": "Unknown category ids", "ids": sorted(unknown)},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        Category.objects.reorder(orders)
+        categories_changed.send(sender=Category)
+        return Response({"detail": "Category order updated"})
 
 
 class AuctionViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['get'], permission_classes=[permissions.AllowAny])
     def live(self, request):
-        """Return all live auctions (status 'active' and end_time in the future)."""
+        """Return live auctions (status 'active' and end_time in the future), ending soonest first."""
         from django.utils import timezone
         now = timezone.now()
-        live_auctions = Auction.objects.filter(status='active', end_time__gt=now)
-        serializer = self.get_serializer(live_auctions, many=True)
-        return Response(serializer.data)
+        # Also the keyset for cursor pagination, served by the (status, end_time) index
+        self.ordering = ['end_time', 'id']
+        live_auctions = self.get_queryset().filter(status='active', end_time__gt=now).order_by(*self.ordering)
+        return cached_response(self, request, ['auctions', 'categories'], lambda: paginated_response(self, live_auctions))
 
     """ViewSet for Auction model."""
     queryset = Auction.objects.all()
@@ -77,44 +123,144 @@ class AuctionViewSet(viewsets.ModelViewSet):
     filterset_fields = ['status', 'category', 'seller']
     search_fields = ['title', 'description']
     ordering_fields = ['created_at', 'start_time', 'end_time', 'current_highest_bid']
-    ordering = ['-created_at']
+    ordering = ['-created_at', '-id']
+    # Listings that serve compact cards for ?view=card or ?fields=
+    card_actions = {'list', 'live', 'trending', 'browse', 'my_auctions', 'my_won_auctions'}
+    
+    def card_fields(self):
+        """Card fields requested for this listing ([] for all), or None for full auctions."""
+        if self.action not in self.card_actions:
+            return None
+        params = self.request.query_params
+        fields = [field for field in params.get('fields', '').split(',') if field]
+        if not fields and params.get('view') != 'card':
+            return None
+        unknown = sorted(set(fields) - set(CARD_FIELDS))
+        if unknown:
+            raise ValidationError({'error': f"unknown fields: {', '.join(unknown)}"})
+        return fields
+    
+    def get_queryset(self):
+        """Return auctions with seller, winner, images and last bidder preloaded, or card rows."""
+        if self.card_fields() is not None:
+            return super().get_queryset().as_cards()
+        return super().get_queryset().with_list_data()
+    
+    def get_serializer_class(self):
+        if self.action == 'search':
+            return AuctionSearchSerializer
+        if self.card_fields() is not None:
+            return AuctionCardSerializer
+        return super().get_serializer_class()
+    
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        if self.card_fields():
+            context['fields'] = self.card_fields()
+        return context
     
     def perform_create(self, serializer):
         """Create auction with current user as seller."""
-        _track_activity(self.request.user)
+        track_activity(self.request.user)
         serializer.save(seller=self.request.user)
     
     def perform_update(self, serializer):
         """Update auction only if user is the seller."""
-        _track_activity(self.request.user)
+        track_activity(self.request.user)
         if serializer.instance.seller != self.request.user:
             raise PermissionError("You can only update your own auctions")
         serializer.save()
     
+    def list(self, request, *args, **kwargs):
+        """List auctions; anonymous responses are cached."""
+        return cached_response(
+            self, request, ['auctions', 'categories'], lambda: super(AuctionViewSet, self).list(request, *args, **kwargs),
+        )
+    
     def retrieve(self, request, *args, **kwargs):
-        """Get auction details and track activity for authenticated user."""
-        _track_activity(request.user)
+        """Get auction details, count the view and track activity for authenticated user."""
+        track_activity(request.user)
         
-        return super().retrieve(request, *args, **kwargs)
+        response = cached_response(
+            self, request, [f"auction:{kwargs['pk']}", 'categories'],
+            lambda: super(AuctionViewSet, self).retrieve(request, *args, **kwargs),
+        )
+        if response.status_code in (200, 304):
+            auction_views.record(int(kwargs['pk']), viewer_key(request))
+        return response
+    
+    @action(detail=False, methods=['get'], permission_classes=[permissions.AllowAny])
+    def trending(self, request):
+        """Live auctions with the most recent views first."""
+        from django.utils import timezone
+        # Also the keyset for cursor pagination, served by the (status, trending_score) index
+        self.ordering = ['-trending_score', '-id']
+        auctions = self.get_queryset().filter(
+            status='active', end_time__gt=timezone.now(), trending_score__isnull=False,
+        ).order_by(*self.ordering)
+        return paginated_response(self, auctions)
+    
+    @action(detail=False, methods=['get'], permission_classes=[permissions.AllowAny])
+    def search(self, request):
+        """Full-text search on title and description, best matches first."""
+        query = request.query_params.get('q', '').strip()
+        if not query:
+            return Response({'error': 'q required'}, status=status.HTTP_400_BAD_REQUEST)
+        auctions = self.get_queryset()
+        if request.query_params.get('status'):
+            auctions = auctions.filter(status=request.query_params['status'])
+        # Also the keyset for cursor pagination
+        self.ordering = ['-search_rank', '-id']
+        return paginated_response(self, search_auctions(auctions, query))
+    
+    @action(detail=False, methods=['get'], permission_classes=[permissions.AllowAny])
+    def browse(self, request):
+        """Auctions filtered by status, category, location and price band, plus facet counts.
+
+        Facet counts come from the precomputed cube in ``facets`` and are at
+        most ``AUCTION_FACET_REFRESH_SECONDS`` old; the auctions are live.
+        """
+        filters = {}
+        auctions = self.filter_queryset(self.get_queryset())
+        for key in ('status', 'category'):
+            if request.query_params.get(key):
+                filters[key] = request.query_params[key]
+        if filters.get('category'):
+            filters['category'] = int(filters['category'])
+        location = request.query_params.get('location', '').strip()
+        if location:
+            filters['location'] = location
+            auctions = auctions.filter(location=location)
+        price_band = request.query_params.get('price_band')
+        if price_band:
+            try:
+                price_band = int(price_band)
+            except ValueError:
+                price_band = -1
+            if not 0 <= price_band < len(PRICE_BANDS):
+                return Response({'error': 'invalid price_band'}, status=status.HTTP_400_BAD_REQUEST)
+            filters['price_band'] = price_band
+            auctions = filter_price_band(auctions, filters['price_band'])
+        response = paginated_response(self, auctions)
+        response.data['facets'] = facet_counts(filters)
+        return response
     
     @action(detail=False, methods=['get'], permission_classes=[permissions.IsAuthenticated])
     def my_auctions(self, request):
         """Get current user's auctions."""
-        auctions = Auction.objects.filter(seller=request.user)
-        serializer = self.get_serializer(auctions, many=True)
-        return Response(serializer.data)
+        auctions = self.get_queryset().filter(seller=request.user).order_by(*self.ordering)
+        return paginated_response(self, auctions)
     
     @action(detail=False, methods=['get'], permission_classes=[permissions.IsAuthenticated])
     def my_won_auctions(self, request):
         """Get auctions won by current user."""
-        auctions = Auction.objects.filter(winner=request.user)
-        serializer = self.get_serializer(auctions, many=True)
-        return Response(serializer.data)
+        auctions = self.get_queryset().filter(winner=request.user).order_by(*self.ordering)
+        return paginated_response(self, auctions)
     
     @action(detail=True, methods=['post'], permission_classes=[permissions.IsAuthenticated])
     def add_to_watchlist(self, request, pk=None):
         """Add auction to user watchlist."""
-        _track_activity(request.user)
+        track_activity(request.user)
         
         auction = self.get_object()
         watchlist, created = Watchlist.objects.get_or_create(user=request.user, auction=auction)
@@ -125,7 +271,7 @@ class AuctionViewSet(viewsets.ModelViewSet):
     @action(detail=True, methods=['delete'], permission_classes=[permissions.IsAuthenticated])
     def remove_from_watchlist(self, request, pk=None):
         """Remove auction from user watchlist."""
-        _track_activity(request.user)
+        track_activity(request.user)
         
         auction = self.get_object()
         watchlist = Watchlist.objects.filter(user=request.user, auction=auction)
@@ -165,10 +311,16 @@ class WatchlistViewSet(viewsets.ModelViewSet):
 
 
 class CategoryViewSet(viewsets.ReadOnlyModelViewSet):
-    """ViewSet for Category model."""
+    """ViewSet for Category model; anonymous responses are cached."""
     queryset = Category.objects.all()
     serializer_class = CategorySerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
+    
+    def list(self, request, *args, **kwargs):
+        return cached_response(self, request, ['categories'], lambda: super(CategoryViewSet, self).list(request, *args, **kwargs))
+    
+    def retrieve(self, request, *args, **kwargs):
+        return cached_response(self, request, ['categories'], lambda: super(CategoryViewSet, self).retrieve(request, *args, **kwargs))
 
 
 class WatchlistView(APIView):
@@ -179,7 +331,9 @@ class WatchlistView(APIView):
         """Get user's watchlist. If not authenticated, return empty list."""
         if not request.user.is_authenticated:
             return Response([])
-        watchlist = Watchlist.objects.filter(user=request.user).select_related('auction')
+        watchlist = Watchlist.objects.filter(user=request.user).prefetch_related(
+            Prefetch('auction', queryset=Auction.objects.with_list_data())
+        )
         serializer = WatchlistSerializer(watchlist, many=True)
         return Response(serializer.data)
     
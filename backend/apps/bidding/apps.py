@@ -5,3 +5,8 @@ from django.apps import AppConfig
 class BiddingConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.bidding'
+
+    def ready(self):
+        from .events import connect_signals
+
+        connect_signals()
@@ -0,0 +1,89 @@
+"""Proxy auto-bid resolution.
+
+After every bid the active ``AutoBidRule``s of the auction are resolved in
+a single pass: the highest ``max_bid`` wins at one ``minimum_increment``
+above the runner-up (second-price), and only the runner-up's final bid and
+the winner's bid are written instead of replaying the bidding war step by
+step.
+"""
+from collections import namedtuple
+
+from django.db.models import Q
+from .models import AutoBidRule
+
+ProxyBid = namedtuple('ProxyBid', 'bidder_id amount rule_id')
+
+
+def resolve_proxy_bids(price, leader_id, increment, rules):
+    """Return the ``ProxyBid``s that settle a bidding war, in write order.
+
+    ``price`` and ``leader_id`` describe the bid that was just placed and
+    ``rules`` is an iterable of ``(rule_id, bidder_id, max_bid)``. Rules
+    that cannot beat ``price`` by ``increment`` are ignored. Ties between
+    rules go to the one seen first, so pass them ordered by creation; the
+    current leader wins ties because their bid came first.
+    """
+    threshold = price + increment
+    leader_max = price
+    leader_rule_id = None
+    best = second = None
+
+    for rule_id, bidder_id, max_bid in rules:
+        if bidder_id == leader_id:
+            if max_bid > leader_max:
+                leader_max, leader_rule_id = max_bid, rule_id
+            continue
+        if max_bid < threshold:
+            continue
+        if best is None or max_bid > best[0]:
+            best, second = (max_bid, bidder_id, rule_id), best
+        elif second is None or max_bid > second[0]:
+            second = (max_bid, bidder_id, rule_id)
+
+    if best is None:
+        return []
+
+    if leader_max >= best[0]:
+        # The leader's own rule defends against the strongest challenger
+        return [
+            ProxyBid(best[1], best[0], best[2]),
+            ProxyBid(leader_id, min(leader_max, best[0] + increment), leader_rule_id),
+        ]
+
+    bids = []
+    if second is not None and second[0] > leader_max:
+        runner_up = second[0]
+        bids.append(ProxyBid(second[1], second[0], second[2]))
+    else:
+        runner_up = leader_max
+        if leader_rule_id is not None and leader_max >= threshold:
+            bids.append(ProxyBid(leader_id, leader_max, leader_rule_id))
+    bids.append(ProxyBid(best[1], min(best[0], runner_up + increment), best[2]))
+    return bids
+
+
+def candidate_rules(auction, price, leader_id):
+    """Fetch the few active rules that can affect the outcome at ``price``.
+
+    Only the two strongest challengers and the leader's own rule matter, so
+    at most three rows are read however many rules the auction has.
+    """
+    return list(
+        AutoBidRule.objects.filter(auction=auction, is_active=True)
+        .filter(Q(max_bid__gte=price + auction.minimum_increment) | Q(bidder_id=leader_id))
+        .order_by('-max_bid', 'created_at', 'id')
+        .values_list('id', 'bidder_id', 'max_bid')[:3]
+    )
+
+
+def deactivate_exhausted_rules(auction, price, winner_rule_id):
+    """Switch off rules whose ``max_bid`` can no longer beat ``price``."""
+    return (
+        AutoBidRule.objects.filter(
+            auction=auction,
+            is_active=True,
+            max_bid__lt=price + auction.minimum_increment,
+        )
+        .exclude(pk=winner_rule_id)
+        .update(is_active=False)
+    )
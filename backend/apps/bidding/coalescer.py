@@ -0,0 +1,137 @@
+"""Per-auction coalescing of bid broadcasts.
+
+The first ``bid_placed`` event after a quiet period is sent at once. Events
+arriving within ``BIDDING_BROADCAST_WINDOW_MS`` of the last frame are
+folded together and only the latest auction state is sent when the window
+closes, with ``coalesced`` set to the number of bids it covers. Every
+``bid_placed`` carries the full state, so a consumer can derive per-socket
+deltas with ``state_delta`` and encode frames with ``encode_frame``.
+Frames are sent with ``events.send_event``, which gives them a ``seq``.
+"""
+import json
+import logging
+import threading
+import time
+from collections import Counter
+
+import msgpack
+from django.conf import settings
+
+from .events import send_event
+
+logger = logging.getLogger('backend')
+
+# Process-wide counters: events published, frames sent and their JSON sizes,
+# plus what consumers actually wrote to sockets after delta/msgpack encoding.
+metrics = Counter()
+
+
+def state_delta(previous, current):
+    """Return the keys of ``current`` whose values differ from ``previous``."""
+    return {key: value for key, value in current.items() if previous.get(key) != value}
+
+
+def encode_frame(frame, binary=False):
+    """Serialise a ``{type, data}`` frame as msgpack bytes or JSON text."""
+    if binary:
+        return msgpack.packb(frame, use_bin_type=True)
+    return json.dumps(frame, separators=(',', ':'))
+
+
+def _json_size(frame):
+    return len(json.dumps(frame, separators=(',', ':')))
+
+
+class BroadcastCoalescer:
+    """Throttles ``bid_placed`` group sends to one frame per auction per window."""
+
+    def __init__(self, window=None, send=None, clock=time.monotonic, timers=True):
+        self.window = window
+        self.clock = clock
+        self.timers = timers
+        self._send = send or self._group_send
+        self._pending = {}
+        self._last_sent = {}
+        self._lock = threading.Lock()
+
+    def _window(self):
+        if self.window is not None:
+            return self.window
+        return getattr(settings, 'BIDDING_BROADCAST_WINDOW_MS', 50) / 1000
+
+    def _group_send(self, auction_id, message):
+        send_event(auction_id, message)
+
+    def publish(self, auction_id, data, now=None):
+        """Broadcast the ``bid_placed`` state ``data`` now or at the end of the window."""
+        now = self.clock() if now is None else now
+        window = self._window()
+        metrics['events'] += 1
+        metrics['event_bytes'] += _json_size({'type': 'bid_placed', 'data': data})
+
+        with self._lock:
+            pending = self._pending.get(auction_id)
+            if pending is not None:
+                pending[0] = data
+                pending[1] += 1
+                return
+            last_sent = self._last_sent.get(auction_id)
+            if window <= 0 or last_sent is None or now - last_sent >= window:
+                self._last_sent[auction_id] = now
+                send_now = True
+            else:
+                self._pending[auction_id] = [data, 1]
+                send_now = False
+
+        if send_now:
+            self._emit(auction_id, data, 1)
+        elif self.timers:
+            timer = threading.Timer(last_sent + window - now, self._flush_auction, (auction_id,))
+            timer.daemon = True
+            timer.start()
+
+    def flush_due(self, now=None):
+        """Send every pending frame whose window has closed; for callers without timers."""
+        now = self.clock() if now is None else now
+        window = self._window()
+        with self._lock:
+            due = [
+                auction_id for auction_id in self._pending
+                if now - self._last_sent.get(auction_id, now) >= window
+            ]
+        for auction_id in due:
+            self._flush_auction(auction_id, now)
+        return len(due)
+
+    def _flush_auction(self, auction_id, now=None):
+        now = self.clock() if now is None else now
+        with self._lock:
+            pending = self._pending.pop(auction_id, None)
+            if pending is None:
+                return
+            self._last_sent[auction_id] = now
+            # Forget auctions that went quiet so the map does not grow forever
+            for other_id, sent_at in list(self._last_sent.items()):
+                if now - sent_at > 60:
+                    del self._last_sent[other_id]
+        self._emit(auction_id, *pending)
+
+    def _emit(self, auction_id, data, count):
+        message = {'type': 'bid_placed', 'data': data}
+        if count > 1:
+            message['data'] = dict(data, coalesced=count)
+        metrics['frames'] += 1
+        metrics['frame_bytes'] += _json_size(message)
+        try:
+            self._send(auction_id, message)
+        except Exception:
+            logger.exception('Bid broadcast for auction %s failed', auction_id)
+
+    def clear(self):
+        """Drop pending frames and send history."""
+        with self._lock:
+            self._pending.clear()
+            self._last_sent.clear()
+
+
+bid_coalescer = BroadcastCoalescer()
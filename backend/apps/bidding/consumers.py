@@ -1,41 +1,516 @@
+import asyncio
+import itertools
+import logging
+import time
+from collections import OrderedDict
+from urllib.parse import parse_qs
+
+from asgiref.sync import sync_to_async
+from channels.db import database_sync_to_async
 from channels.generic.websocket import AsyncWebsocketConsumer
+from django.conf import settings
+from django.db import DatabaseError
+from rest_framework.exceptions import ValidationError
 import json
+import msgpack
+
+from apps.auctions.clock import server_now_ms
+from .coalescer import encode_frame, metrics, state_delta
+from .events import current_seq, events_since
+from .presence import presence
+from .serializers import BidSerializer
+from .services import RETRY_MESSAGE, BidRejected, submit_bid
+
+logger = logging.getLogger('backend')
+
+# Frames holding the latest state of something; a newer one supersedes a queued one
+LATEST_STATE_FRAMES = {'bid_placed', 'viewers', 'clock'}
+
+# Close code for clients that cannot keep up
+SLOW_CLIENT_CLOSE_CODE = 4008
+
+
+def _auction_id(value):
+	"""``value`` as an auction id, or ``None`` when it is not one."""
+	if isinstance(value, bool):
+		return None
+	if isinstance(value, int):
+		return value if value > 0 else None
+	if isinstance(value, str) and value.isdigit():
+		return int(value)
+	return None
+
+
+class FrameConsumer(AsyncWebsocketConsumer):
+	"""Sends and receives ``{type, data}`` frames as JSON or msgpack.
+
+	Outgoing frames are queued in a per-connection outbox drained by a
+	writer task, so events are taken off the channel layer at once however
+	slowly the client reads. A queued frame with a ``replace`` key is
+	superseded by the next one with the same key, which moves to the back:
+	a backlogged client skips to the latest auction state instead of
+	receiving every step. A client whose outbox stays above
+	``BIDDING_WS_QUEUE_HIGH_WATER`` frames for
+	``BIDDING_WS_SLOW_CLIENT_SECONDS``, or reaches twice that many, is
+	closed with code 4008. Queue depth, superseded frames and slow client
+	disconnects are counted in ``metrics``.
+
+	Sequenced auction events are kept contiguous per auction in
+	``sequences``: a ``seq`` already sent by a replay is dropped, a gap is
+	filled from the event buffer, and a ``seq`` that cannot be accounted
+	for (behind the client, or missing from the buffer) gets a ``resume``
+	frame with ``snapshot: true`` telling the client to reload the auction.
+	"""
+
+	binary = False
+	outbox = None
+	writer = None
+
+	def subprotocol(self):
+		"""The offered subprotocol to answer the handshake with, if any."""
+		if self.binary:
+			return 'msgpack'
+		if 'jwt' in self.scope.get('subprotocols', []):
+			# Sent with the access token, see apps.users.websocket_auth
+			return 'jwt'
+		return None
+
+	def start_writer(self):
+		self.outbox = OrderedDict()
+		self.outbox_ready = asyncio.Event()
+		self.outbox_keys = itertools.count()
+		self.backlogged_since = None
+		self.writer = asyncio.ensure_future(self.write_outbox())
+
+	def discard_outbox(self):
+		if self.outbox is not None:
+			metrics['outbox_depth'] -= len(self.outbox)
+			self.outbox = None
+
+	async def stop_writer(self):
+		self.discard_outbox()
+		if self.writer is not None:
+			self.writer.cancel()
+			try:
+				await self.writer
+			except asyncio.CancelledError:
+				pass
+			self.writer = None
+
+	def decode(self, text_data=None, bytes_data=None):
+		"""The client frame as a dict, or ``None`` when it is malformed."""
+		try:
+			if bytes_data is not None:
+				data = msgpack.unpackb(bytes_data, raw=False)
+			else:
+				data = json.loads(text_data or '')
+		except (ValueError, msgpack.UnpackException):
+			return None
+		return data if isinstance(data, dict) else None
+
+	async def send_json(self, message_type, data):
+		await self.send_frame({'type': message_type, 'data': data})
+
+	async def send_frame(self, frame, replace=None):
+		"""Queue ``frame``, superseding a queued frame with the same ``replace`` key."""
+		if self.outbox is None:
+			return
+		if replace is None:
+			replace = next(self.outbox_keys)
+		if replace in self.outbox:
+			self.outbox.move_to_end(replace)
+			metrics['outbox_superseded'] += 1
+		else:
+			metrics['outbox_depth'] += 1
+		self.outbox[replace] = frame
+		depth = len(self.outbox)
+		metrics['outbox_peak'] = max(metrics['outbox_peak'], depth)
+		high_water = getattr(settings, 'BIDDING_WS_QUEUE_HIGH_WATER', 64)
+		if depth > high_water:
+			now = time.monotonic()
+			if self.backlogged_since is None:
+				self.backlogged_since = now
+			if depth >= 2 * high_water or now - self.backlogged_since >= getattr(settings, 'BIDDING_WS_SLOW_CLIENT_SECONDS', 10):
+				await self.close_slow_client(depth)
+				return
+		self.outbox_ready.set()
+
+	async def write_outbox(self):
+		high_water = getattr(settings, 'BIDDING_WS_QUEUE_HIGH_WATER', 64)
+		while True:
+			await self.outbox_ready.wait()
+			self.outbox_ready.clear()
+			while self.outbox:
+				_, message = self.outbox.popitem(last=False)
+				metrics['outbox_depth'] -= 1
+				frame = self.prepare(message)
+				payload = encode_frame(frame, self.binary)
+				if self.binary:
+					await self.send(bytes_data=payload)
+				else:
+					await self.send(text_data=payload)
+				json_payload = payload if frame is message and not self.binary else encode_frame(message)
+				metrics['socket_frames'] += 1
+				metrics['socket_json_bytes'] += len(json_payload)
+				metrics['socket_bytes'] += len(payload)
+				if self.backlogged_since is not None and self.outbox is not None and len(self.outbox) <= high_water // 2:
+					self.backlogged_since = None
+
+	def prepare(self, message):
+		"""The frame to write for queued ``message``."""
+		return message
+
+	async def close_slow_client(self, depth):
+		metrics['outbox_slow_disconnects'] += 1
+		logger.warning('Closing slow WebSocket %s with %s queued frames', self.channel_name, depth)
+		self.discard_outbox()
+		await self.close(code=SLOW_CLIENT_CLOSE_CODE)
+
+	async def pong(self, data):
+		presence.heartbeat(self.channel_name)
+		await self.send_json('pong', {'request_id': data.get('request_id'), 'server_now': server_now_ms()})
+
+	def resume_data(self, auction_id, **data):
+		"""The data of a ``resume`` frame about ``auction_id``."""
+		return data
+
+	async def send_event(self, auction_id, message, replay=False):
+		"""Queue auction event ``message`` for the client."""
+		message_type = message.get('type')
+		# Replays send every missed event, live frames may skip to the latest state
+		latest = not replay and message_type in LATEST_STATE_FRAMES
+		await self.send_frame(message, replace=message_type if latest else None)
+
+	async def replay(self, auction_id, last_seq, events):
+		seq = events[-1]['seq'] if events else last_seq
+		self.sequences[auction_id] = (seq, range(last_seq + 1, seq + 1))
+		for message in events:
+			await self.send_event(auction_id, message, replay=True)
+
+	async def resync(self, auction_id, seq):
+		"""Tell the client to reload ``auction_id`` and carry on after ``seq``."""
+		metrics['event_resyncs'] += 1
+		self.sequences[auction_id] = (seq, range(0))
+		await self.send_json('resume', self.resume_data(auction_id, seq=seq, replayed=0, snapshot=True))
+
+	async def resume_events(self, auction_id, last_seq):
+		"""Replay the events of ``auction_id`` after ``last_seq`` and confirm with a ``resume`` frame."""
+		events = await sync_to_async(events_since)(auction_id, last_seq)
+		if events is None:
+			await self.resync(auction_id, await sync_to_async(current_seq)(auction_id))
+			return
+		await self.replay(auction_id, last_seq, events)
+		seq, _ = self.sequences[auction_id]
+		await self.send_json('resume', self.resume_data(auction_id, seq=seq, replayed=len(events), snapshot=False))
+
+	async def deliver(self, auction_id, message):
+		"""Send a live auction event, keeping its ``seq`` contiguous for the client."""
+		seq = message.get('seq')
+		if seq is None:
+			await self.send_event(auction_id, message)
+			return
+		last_seq, replayed = self.sequences.get(auction_id, (None, range(0)))
+		if last_seq is None or seq == last_seq + 1:
+			self.sequences[auction_id] = (seq, replayed)
+			await self.send_event(auction_id, message)
+		elif seq in replayed:
+			# Already sent by a replay
+			return
+		elif seq > last_seq:
+			# Missed events, e.g. recorded by another process a moment earlier
+			events = await sync_to_async(events_since)(auction_id, last_seq)
+			if events and events[-1]['seq'] >= seq:
+				await self.replay(auction_id, last_seq, events)
+			else:
+				await self.resync(auction_id, seq)
+		else:
+			# The counter went backwards, e.g. it was evicted from the cache
+			await self.resync(auction_id, seq)
+
+
+class AuctionConsumer(FrameConsumer):
+	"""WebSocket consumer for auction rooms.
 
+	Clients receive the server-authored events of the auction group
+	(``bid_placed``, ``auction_ended``). Authenticated clients can bid
+	without an HTTP round trip by sending
+	``{"type": "place_bid", "amount": "12.00", "request_id": ...}``; the bid
+	goes through the same service as ``BidViewSet`` and the sender gets a
+	``bid_accepted`` or ``bid_rejected`` frame echoing ``request_id``.
+	Client frames are never rebroadcast.
 
-class AuctionConsumer(AsyncWebsocketConsumer):
-	"""Minimal WebSocket consumer for auction rooms.
+	Clients offering the ``msgpack`` subprotocol exchange msgpack binary
+	frames instead of JSON. With ``?delta=1`` every ``bid_placed`` after
+	the first is sent as a ``bid_delta`` holding only the changed fields.
 
-	This provides connect/disconnect and simple message broadcasting to the
-	auction group. It is intentionally lightweight to satisfy routing imports
-	and allow the dev server to start.
+	Connections are counted by ``presence``, which sends throttled
+	``viewers`` frames with the number of people watching and periodic
+	``clock`` frames; ``ping`` frames double as presence heartbeats and are
+	answered with the server time.
+
+	``bid_placed`` and ``auction_ended`` frames carry a per-auction ``seq``.
+	After reconnecting, clients send ``{"type": "resume", "last_seq": n}``
+	with the last one they saw: the missed events are replayed, followed by
+	a ``resume`` frame with the current ``seq`` and ``snapshot: false``, or
+	just a ``resume`` frame with ``snapshot: true`` when they are no longer
+	buffered and the client has to reload the auction. The same frame is
+	sent unprompted when live events skip or repeat a ``seq``.
 	"""
 
 	async def connect(self):
 		self.auction_id = self.scope.get('url_route', {}).get('kwargs', {}).get('auction_id')
 		self.group_name = f"auction_{self.auction_id}"
+		self.binary = 'msgpack' in self.scope.get('subprotocols', [])
+		query = parse_qs(self.scope.get('query_string', b'').decode())
+		self.delta = query.get('delta', ['0'])[0] == '1'
+		self.last_bid_state = None
+		self.sequences = {}
 		print(f"[WS] CONNECT: auction_id={self.auction_id}, channel={self.channel_name}")
 		await self.channel_layer.group_add(self.group_name, self.channel_name)
-		await self.accept()
+		await self.accept(subprotocol=self.subprotocol())
+		self.start_writer()
+		user = self.scope.get('user')
+		presence.connect(self.channel_name, self.auction_id, user.pk if user is not None and user.is_authenticated else None)
 
 	async def disconnect(self, close_code):
 		print(f"[WS] DISCONNECT: auction_id={self.auction_id}, channel={self.channel_name}, close_code={close_code}")
+		presence.disconnect(self.channel_name)
+		await self.stop_writer()
 		await self.channel_layer.group_discard(self.group_name, self.channel_name)
 
 	async def receive(self, text_data=None, bytes_data=None):
-		if text_data:
-			try:
-				data = json.loads(text_data)
-			except Exception:
-				data = {"message": text_data}
+		data = self.decode(text_data, bytes_data)
+		if data is None:
+			await self.send_json('error', {'detail': 'Nederīgs ziņojums'})
+			return
+
+		message_type = data.get('type')
+		if message_type == 'place_bid':
+			await self.place_bid(data)
+		elif message_type == 'resume':
+			await self.resume(data)
+		elif message_type == 'ping':
+			await self.pong(data)
 		else:
-			data = {"message": ""}
+			await self.send_json('error', {'detail': 'Nezināms ziņojuma tips', 'request_id': data.get('request_id')})
 
-		# Broadcast incoming message to the auction group
-		await self.channel_layer.group_send(
-			self.group_name,
-			{"type": "auction.message", "message": data},
-		)
+	async def place_bid(self, data):
+		request_id = data.get('request_id')
+		user = self.scope.get('user')
+		if user is None or not user.is_authenticated:
+			await self.send_json('bid_rejected', {'request_id': request_id, 'detail': 'Nepieciešama autorizācija'})
+			return
+		try:
+			amount = BidSerializer().fields['amount'].run_validation(data.get('amount'))
+		except ValidationError as exc:
+			await self.send_json('bid_rejected', {'request_id': request_id, 'detail': ' '.join(map(str, exc.detail))})
+			return
+
+		try:
+			bid = await self.submit_bid(user, amount)
+		except BidRejected as exc:
+			await self.send_json('bid_rejected', {'request_id': request_id, 'detail': str(exc)})
+			return
+		except DatabaseError:
+			# Not the client's fault, so keep the socket open and let it resend
+			logger.warning('Bid on auction %s failed in the database', self.auction_id, exc_info=True)
+			await self.send_json('bid_rejected', {'request_id': request_id, 'detail': RETRY_MESSAGE, 'reason': 'retry'})
+			return
+
+		auction = bid.auction
+		await self.send_json('bid_accepted', {
+			'request_id': request_id,
+			'bid_id': bid.pk,
+			'pending': bid.pk is None,
+			'amount': str(bid.amount),
+			'current_highest_bid': str(auction.current_highest_bid),
+			'bid_count': auction.bid_count,
+			'end_time': auction.end_time.isoformat(),
+			'server_now': server_now_ms(),
+		})
+
+	async def resume(self, data):
+		last_seq = data.get('last_seq')
+		if not isinstance(last_seq, int) or isinstance(last_seq, bool) or last_seq < 0:
+			await self.send_json('error', {'detail': 'Nederīgs last_seq', 'request_id': data.get('request_id')})
+			return
+		await self.resume_events(self.auction_id, last_seq)
+
+	@database_sync_to_async
+	def submit_bid(self, user, amount):
+		if not str(self.auction_id).isdigit():
+			raise BidRejected('Izsole nav atrasta')
+		user.update_activity()
+		return submit_bid(int(self.auction_id), user, amount)
 
 	async def auction_message(self, event):
 		# Send event message to WebSocket
-		await self.send(text_data=json.dumps(event.get("message", {})))
+		await self.deliver(self.auction_id, event.get("message", {}))
+
+	def prepare(self, message):
+		# Deltas are taken when writing, against the state the client last got
+		if not self.delta or message.get('type') != 'bid_placed':
+			return message
+		previous, self.last_bid_state = self.last_bid_state, message['data']
+		if previous is None:
+			return message
+		frame = {'type': 'bid_delta', 'data': state_delta(previous, message['data'])}
+		if 'seq' in message:
+			frame['seq'] = message['seq']
+		return frame
+
+
+class MultiAuctionConsumer(FrameConsumer):
+	"""One WebSocket for the events of many auctions.
+
+	Clients manage their rooms with
+	``{"type": "subscribe", "auction_ids": [...]}`` and ``unsubscribe``, and
+	authenticated clients can follow their whole watchlist with
+	``{"type": "subscribe_watchlist"}``, which keeps up as auctions are added
+	to or removed from it. Each answer is a ``subscribed`` frame listing the
+	current rooms and any ids ``rejected`` over
+	``BIDDING_WS_MAX_SUBSCRIPTIONS``. Auction frames are those of
+	``AuctionConsumer`` with an ``auction_id`` added, and ``resume`` takes
+	an ``auction_id`` as well. Bidding stays on ``AuctionConsumer`` and HTTP.
+	"""
+
+	async def connect(self):
+		self.binary = 'msgpack' in self.scope.get('subprotocols', [])
+		self.user = self.scope.get('user')
+		if self.user is not None and not self.user.is_authenticated:
+			self.user = None
+		# Rooms asked for by id and those followed through the watchlist
+		self.explicit = set()
+		self.watchlist = None
+		self.sequences = {}
+		await self.accept(subprotocol=self.subprotocol())
+		self.start_writer()
+		presence.connect(self.channel_name, user_id=self.user.pk if self.user else None)
+
+	async def disconnect(self, close_code):
+		presence.disconnect(self.channel_name)
+		await self.stop_writer()
+		for auction_id in self.subscriptions():
+			await self.channel_layer.group_discard(f'auction_{auction_id}', self.channel_name)
+		if self.watchlist is not None:
+			await self.channel_layer.group_discard(f'watchlist_{self.user.pk}', self.channel_name)
+
+	def subscriptions(self):
+		return self.explicit | (self.watchlist or set())
+
+	async def receive(self, text_data=None, bytes_data=None):
+		data = self.decode(text_data, bytes_data)
+		if data is None:
+			await self.send_json('error', {'detail': 'Nederīgs ziņojums'})
+			return
+
+		message_type = data.get('type')
+		request_id = data.get('request_id')
+		if message_type in ('subscribe', 'unsubscribe'):
+			auction_ids = data.get('auction_ids')
+			if not isinstance(auction_ids, list) or None in map(_auction_id, auction_ids):
+				await self.send_json('error', {'detail': 'Nederīgi auction_ids', 'request_id': request_id})
+				return
+			auction_ids = [_auction_id(value) for value in auction_ids]
+			if message_type == 'subscribe':
+				rejected = await self.add(self.explicit, auction_ids)
+			else:
+				rejected = []
+				await self.remove(self.explicit, auction_ids)
+			await self.send_subscribed(request_id, rejected)
+		elif message_type == 'subscribe_watchlist':
+			if self.user is None:
+				await self.send_json('error', {'detail': 'Nepieciešama autorizācija', 'request_id': request_id})
+				return
+			rejected = []
+			if self.watchlist is None:
+				self.watchlist = set()
+				await self.channel_layer.group_add(f'watchlist_{self.user.pk}', self.channel_name)
+				rejected = await self.add(self.watchlist, await self.watchlist_ids())
+			await self.send_subscribed(request_id, rejected)
+		elif message_type == 'unsubscribe_watchlist':
+			if self.watchlist is not None:
+				await self.channel_layer.group_discard(f'watchlist_{self.user.pk}', self.channel_name)
+				watchlist, self.watchlist = self.watchlist, None
+				await self.remove(watchlist, list(watchlist))
+			await self.send_subscribed(request_id, [])
+		elif message_type == 'resume':
+			await self.resume(data)
+		elif message_type == 'ping':
+			await self.pong(data)
+		else:
+			await self.send_json('error', {'detail': 'Nezināms ziņojuma tips', 'request_id': request_id})
+
+	async def add(self, source, auction_ids):
+		"""Add ``auction_ids`` to ``source`` up to the limit; returns the rejected ids."""
+		rejected = []
+		current = self.subscriptions()
+		limit = getattr(settings, 'BIDDING_WS_MAX_SUBSCRIPTIONS', 50)
+		for auction_id in dict.fromkeys(auction_ids):
+			if auction_id not in current:
+				if len(current) >= limit:
+					rejected.append(auction_id)
+					continue
+				await self.channel_layer.group_add(f'auction_{auction_id}', self.channel_name)
+				current.add(auction_id)
+				presence.watch(self.channel_name, [auction_id])
+			source.add(auction_id)
+		return rejected
+
+	async def remove(self, source, auction_ids):
+		source.difference_update(auction_ids)
+		current = self.subscriptions()
+		for auction_id in set(auction_ids) - current:
+			await self.channel_layer.group_discard(f'auction_{auction_id}', self.channel_name)
+			presence.unwatch(self.channel_name, [auction_id])
+			self.sequences.pop(auction_id, None)
+
+	async def send_subscribed(self, request_id, rejected):
+		data = {'request_id': request_id, 'auction_ids': sorted(self.subscriptions()), 'watchlist': self.watchlist is not None}
+		if rejected:
+			data['rejected'] = rejected
+			data['detail'] = 'Sasniegts abonementu limits'
+		await self.send_json('subscribed', data)
+
+	@database_sync_to_async
+	def watchlist_ids(self):
+		from apps.auctions.models import Watchlist
+
+		return list(
+			Watchlist.objects.filter(user=self.user, auction__status='active')
+			.order_by('auction__end_time').values_list('auction_id', flat=True)
+		)
+
+	async def resume(self, data):
+		auction_id = _auction_id(data.get('auction_id'))
+		last_seq = data.get('last_seq')
+		if auction_id not in self.subscriptions() or not isinstance(last_seq, int) or isinstance(last_seq, bool) or last_seq < 0:
+			await self.send_json('error', {'detail': 'Nederīgs resume', 'request_id': data.get('request_id')})
+			return
+		await self.resume_events(auction_id, last_seq)
+
+	def resume_data(self, auction_id, **data):
+		return dict(data, auction_id=auction_id)
+
+	async def auction_message(self, event):
+		auction_id = _auction_id(event.get('auction_id'))
+		if auction_id in self.subscriptions():
+			await self.deliver(auction_id, event.get('message', {}))
+
+	async def send_event(self, auction_id, message, replay=False):
+		# Frames name their auction, and each auction keeps its own latest state
+		message_type = message.get('type')
+		latest = not replay and message_type in LATEST_STATE_FRAMES
+		await self.send_frame(dict(message, auction_id=auction_id), replace=(message_type, auction_id) if latest else None)
+
+	async def watchlist_changed(self, event):
+		"""Follow auctions added to or removed from the user's watchlist."""
+		if self.watchlist is None:
+			return
+		auction_id = event['auction_id']
+		rejected = []
+		if event['watching']:
+			rejected = await self.add(self.watchlist, [auction_id])
+		else:
+			await self.remove(self.watchlist, [auction_id])
+		await self.send_subscribed(None, rejected)
@@ -0,0 +1,104 @@
+"""Sequenced auction events and their replay buffer.
+
+Every ``bid_placed`` and ``auction_ended`` frame sent to an auction group
+gets a ``seq`` from a per-auction counter and is kept in a ring of the last
+``BIDDING_EVENT_BUFFER_SIZE`` events in the default cache, slot
+``seq % size``. Processes only agree on sequence numbers when that cache is
+shared (``CACHE_BACKEND=redis``, required with the Redis channel layer);
+consumers resync clients instead of dropping events when a counter is lost
+or goes backwards. A reconnecting
+client sends ``{"type": "resume", "last_seq": n}`` and ``AuctionConsumer``
+replays what it missed from ``events_since``, or tells it to reload the
+auction when those events have already been overwritten or expired.
+Ephemeral frames (``viewers``, ``clock``) are not sequenced.
+
+Watchlist additions and removals are sent to the ``watchlist_<user id>``
+group, so ``MultiAuctionConsumer`` sockets following a watchlist keep up.
+"""
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models.signals import post_delete, post_save
+
+
+def _buffer_size():
+    return getattr(settings, 'BIDDING_EVENT_BUFFER_SIZE', 100)
+
+
+def _seq_key(auction_id):
+    return f'auction_events:{auction_id}:seq'
+
+
+def _slot_key(auction_id, seq):
+    return f'auction_events:{auction_id}:{seq % _buffer_size()}'
+
+
+def current_seq(auction_id):
+    """Sequence number of the last event of ``auction_id``, 0 before the first."""
+    return cache.get(_seq_key(auction_id), 0)
+
+
+def record_event(auction_id, message):
+    """Number ``message`` with the next sequence of ``auction_id`` and buffer it."""
+    key = _seq_key(auction_id)
+    # The counter never expires, so sequence numbers are not reused
+    cache.add(key, 0, timeout=None)
+    seq = cache.incr(key)
+    message = dict(message, seq=seq)
+    cache.set(_slot_key(auction_id, seq), message, getattr(settings, 'BIDDING_EVENT_BUFFER_TTL_SECONDS', 3600))
+    return message
+
+
+def events_since(auction_id, last_seq):
+    """Buffered events of ``auction_id`` after ``last_seq``, oldest first.
+
+    Returns ``None`` when some of them are no longer buffered, or when
+    ``last_seq`` is ahead of the counter, and the client needs a snapshot.
+    """
+    seq = current_seq(auction_id)
+    if last_seq > seq or seq - last_seq > _buffer_size():
+        return None
+    wanted = range(last_seq + 1, seq + 1)
+    stored = cache.get_many([_slot_key(auction_id, number) for number in wanted])
+    events = [stored.get(_slot_key(auction_id, number)) for number in wanted]
+    # A slot holding another sequence was overwritten by a newer lap of the ring
+    if any(event is None or event['seq'] != number for event, number in zip(events, wanted)):
+        return None
+    return events
+
+
+def send_event(auction_id, message):
+    """Record ``message`` and send it to the auction group."""
+    channel_layer = get_channel_layer()
+    if not channel_layer:
+        return
+    async_to_sync(channel_layer.group_send)(
+        f'auction_{auction_id}',
+        {'type': 'auction.message', 'auction_id': auction_id, 'message': record_event(auction_id, message)},
+    )
+
+
+def _send_watchlist_change(user_id, auction_id, watching):
+    channel_layer = get_channel_layer()
+    if channel_layer:
+        async_to_sync(channel_layer.group_send)(
+            f'watchlist_{user_id}',
+            {'type': 'watchlist.changed', 'auction_id': auction_id, 'watching': watching},
+        )
+
+
+def _watchlist_saved(sender, instance, created, **kwargs):
+    if created:
+        _send_watchlist_change(instance.user_id, instance.auction_id, True)
+
+
+def _watchlist_deleted(sender, instance, **kwargs):
+    _send_watchlist_change(instance.user_id, instance.auction_id, False)
+
+
+def connect_signals():
+    from apps.auctions.models import Watchlist
+
+    post_save.connect(_watchlist_saved, sender=Watchlist, dispatch_uid='events_watchlist_saved')
+    post_delete.connect(_watchlist_deleted, sender=Watchlist, dispatch_uid='events_watchlist_deleted')
@@ -0,0 +1,379 @@
+"""In-process order book for auctions in their final minutes.
+
+When ``BIDDING_HOT_BOOK_ENABLED`` is set, an auction whose ``end_time`` is
+within ``BIDDING_HOT_BOOK_WINDOW_SECONDS`` is loaded into memory after its
+next bid. Later bids are validated against the cached price, leader,
+end_time and bid_count without touching the database, and the accepted bids
+are appended to ``Bid``/``BidHistory`` in batches by a background flusher
+that also reconciles the auction counters.
+
+The book is authoritative for the auctions it holds, so it is only safe
+when every bid for an auction is handled by the same process (a single
+Daphne/gunicorn worker). Bids accepted since the last flush are lost if the
+process dies.
+
+While it holds an auction the book keeps a marker with the in-memory
+``end_time`` in the default cache, and the auction closer, which usually
+runs in another process, leaves marked auctions alone until they are
+flushed and released (see ``held_end_times``).
+"""
+import logging
+import threading
+import time
+from collections import namedtuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import close_old_connections, transaction
+from django.db.models import F
+from django.utils import timezone
+from apps.auctions.models import Auction
+from apps.auctions.signals import auctions_changed
+from .models import Bid, BidHistory
+from .services import BidRejected
+
+logger = logging.getLogger('backend')
+
+# Extra lifetime of a held marker past the end_time, so one left behind by
+# a dead process only delays closing
+HELD_GRACE_SECONDS = 30
+
+PendingBid = namedtuple(
+    'PendingBid',
+    'auction_id bidder_id amount previous_amount previous_bidder_id created_at',
+)
+
+
+def _held_key(auction_id):
+    return f'hot_book:held:{auction_id}'
+
+
+def held_end_times(auction_ids):
+    """Map the ids held by a hot book in any process to their in-memory ``end_time``."""
+    if not auction_ids or not getattr(settings, 'BIDDING_HOT_BOOK_ENABLED', False):
+        return {}
+    stored = cache.get_many([_held_key(auction_id) for auction_id in auction_ids])
+    return {
+        auction_id: stored[_held_key(auction_id)]
+        for auction_id in auction_ids
+        if _held_key(auction_id) in stored
+    }
+
+
+class HotAuctionState:
+    """Cached bidding state of one auction."""
+
+    __slots__ = (
+        'auction_id', 'price', 'leader_id', 'end_time', 'bid_count',
+        'starting_price', 'minimum_increment', 'anti_snipe_seconds', 'unflushed', 'closing', 'failures',
+    )
+
+    def __init__(self, auction, leader_id):
+        self.auction_id = auction.pk
+        self.price = auction.current_highest_bid
+        self.leader_id = leader_id
+        self.end_time = auction.end_time
+        self.bid_count = auction.bid_count
+        self.starting_price = auction.starting_price
+        self.minimum_increment = auction.minimum_increment
+        self.anti_snipe_seconds = auction.anti_snipe_seconds
+        self.unflushed = 0
+        self.closing = False
+        self.failures = 0
+
+    def as_auction(self):
+        """Return an unsaved ``Auction`` carrying the cached state."""
+        return Auction(
+            id=self.auction_id,
+            current_highest_bid=self.price,
+            bid_count=self.bid_count,
+            end_time=self.end_time,
+            anti_snipe_seconds=self.anti_snipe_seconds,
+        )
+
+
+class HotAuctionBook:
+    """Holds hot auctions in memory and writes their bids behind."""
+
+    def __init__(self, window_seconds=None, flush_interval=None, background=True):
+        self.window_seconds = window_seconds
+        self.flush_interval = flush_interval
+        self.background = background
+        self._states = {}
+        self._pending = []
+        # Bids given up on after repeated write failures, see flush()
+        self.dead_letters = []
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._thread = None
+
+    @property
+    def enabled(self):
+        return getattr(settings, 'BIDDING_HOT_BOOK_ENABLED', False)
+
+    def _window(self):
+        if self.window_seconds is not None:
+            return self.window_seconds
+        return getattr(settings, 'BIDDING_HOT_BOOK_WINDOW_SECONDS', 300)
+
+    def _interval(self):
+        if self.flush_interval is not None:
+            return self.flush_interval
+        return getattr(settings, 'BIDDING_HOT_BOOK_FLUSH_INTERVAL', 0.5)
+
+    def get(self, auction_id):
+        """Return the cached state for ``auction_id`` or ``None``."""
+        return self._states.get(int(auction_id))
+
+    def is_hot(self, auction):
+        """Return True if ``auction`` is close enough to its end to cache."""
+        remaining = (auction.end_time - timezone.now()).total_seconds()
+        return 0 < remaining <= self._window()
+
+    def promote(self, auction, leader_id):
+        """Start serving ``auction`` from memory after a database bid."""
+        with self._lock:
+            if auction.pk in self._states:
+                return
+            state = self._states[auction.pk] = HotAuctionState(auction, leader_id)
+        self._hold(state.auction_id, state.end_time)
+
+    def _hold(self, auction_id, end_time):
+        remaining = max((end_time - timezone.now()).total_seconds(), 0)
+        cache.set(_held_key(auction_id), end_time, int(remaining) + HELD_GRACE_SECONDS)
+
+    def place(self, auction_id, bidder, amount):
+        """Validate and accept a bid against the cached state.
+
+        Returns the ``PendingBid`` and a snapshot ``Auction``; raises
+        ``BidRejected`` with the same messages as ``place_bid``.
+        """
+        now = timezone.now()
+        with self._lock:
+            state = self._states.get(int(auction_id))
+            if state is None:
+                raise KeyError(auction_id)
+            if state.closing or now >= state.end_time:
+                raise BidRejected('Izsole nav aktīva')
+            if state.failures:
+                raise BidRejected('Izsole tikko tika atjaunināta, mēģiniet vēlreiz')
+            if state.leader_id == bidder.pk:
+                raise BidRejected('Jūs jau esat augstākais solītājs')
+            minimum = state.price + state.minimum_increment if state.bid_count else state.starting_price
+            if amount < minimum:
+                raise BidRejected(f'Minimālais solījums ir {minimum} €')
+
+            pending = PendingBid(
+                auction_id=state.auction_id,
+                bidder_id=bidder.pk,
+                amount=amount,
+                previous_amount=state.price if state.bid_count else None,
+                previous_bidder_id=state.leader_id,
+                created_at=now,
+            )
+            state.price = amount
+            state.leader_id = bidder.pk
+            state.bid_count += 1
+            state.unflushed += 1
+            extended = bool(state.anti_snipe_seconds) and (
+                (state.end_time - now).total_seconds() < state.anti_snipe_seconds
+            )
+            if extended:
+                state.end_time = now + timezone.timedelta(seconds=state.anti_snipe_seconds)
+            self._pending.append(pending)
+            snapshot = state.as_auction()
+
+        if extended:
+            self._hold(snapshot.pk, snapshot.end_time)
+        if self.background:
+            self._ensure_flusher()
+        return pending, snapshot
+
+    def flush(self):
+        """Persist pending bids and reconcile auction counters.
+
+        All pending bids are written in one transaction. If that fails, each
+        auction is retried in a transaction of its own, so one bad row only
+        holds back its own auction. A failing auction stops taking bids and
+        leaves the book once its bids are written. After
+        ``BIDDING_HOT_BOOK_MAX_FLUSH_ATTEMPTS`` failed writes its bids are
+        moved to ``dead_letters`` and logged instead. Returns the number of
+        bids written.
+        """
+        with self._flush_lock:
+            with self._lock:
+                pending, self._pending = self._pending, []
+                batches = {}
+                for item in pending:
+                    batches.setdefault(item.auction_id, []).append(item)
+                snapshots = {
+                    auction_id: (state.price, state.end_time, len(batches[auction_id]))
+                    for auction_id, state in self._states.items()
+                    if auction_id in batches
+                }
+            if not pending:
+                self._evict_ended()
+                return 0
+
+            failed = []
+            try:
+                with transaction.atomic():
+                    self._write(pending, snapshots)
+            except Exception:
+                logger.exception('Hot book flush of %d bids failed, retrying per auction', len(pending))
+                failed = None
+            if failed is None:
+                failed = self._write_each(batches, snapshots)
+
+            written = [auction_id for auction_id in batches if auction_id not in failed]
+            self._settle(batches, written, failed)
+            if written:
+                auctions_changed.send(sender=Bid, auction_ids=written)
+            self._evict_ended()
+            return sum(len(batches[auction_id]) for auction_id in written)
+
+    def _write(self, pending, snapshots):
+        bids = Bid.objects.bulk_create([
+            Bid(auction_id=item.auction_id, bidder_id=item.bidder_id, amount=item.amount)
+            for item in pending
+        ])
+        BidHistory.objects.bulk_create([
+            BidHistory(
+                auction_id=item.auction_id,
+                bidder_id=item.bidder_id,
+                bid_amount=item.amount,
+                previous_highest_amount=item.previous_amount,
+                previous_highest_bidder_id=item.previous_bidder_id,
+            )
+            for item in pending
+        ])
+        # auto_now_add stamps every row with the flush time; keep
+        # the acceptance time so bid ordering is preserved.
+        for bid, item in zip(bids, pending):
+            bid.created_at = item.created_at
+        if bids and bids[0].pk is not None:
+            Bid.objects.bulk_update(bids, ['created_at'])
+        for auction_id, (price, end_time, count) in snapshots.items():
+            updated = Auction.objects.filter(pk=auction_id, status='active').update(
+                current_highest_bid=price,
+                bid_count=F('bid_count') + count,
+                end_time=end_time,
+                updated_at=timezone.now(),
+            )
+            if not updated:
+                # Closed without waiting for the book, e.g. by an admin
+                logger.error('Hot book flushed %d bids for auction %s after it closed', count, auction_id)
+
+    def _write_each(self, batches, snapshots):
+        """Write each auction's bids on its own; returns the ids that failed."""
+        if len(batches) == 1:
+            return list(batches)
+        failed = []
+        for auction_id, items in batches.items():
+            try:
+                with transaction.atomic():
+                    self._write(items, {auction_id: snapshots[auction_id]} if auction_id in snapshots else {})
+            except Exception:
+                logger.exception('Hot book could not write %d bids for auction %s', len(items), auction_id)
+                failed.append(auction_id)
+        return failed
+
+    def _settle(self, batches, written, failed):
+        max_attempts = getattr(settings, 'BIDDING_HOT_BOOK_MAX_FLUSH_ATTEMPTS', 5)
+        released = []
+        with self._lock:
+            retry = []
+            for auction_id in failed:
+                state = self._states.get(auction_id)
+                if state is None:
+                    # Dropped by clear()
+                    continue
+                state.failures += 1
+                if state.failures < max_attempts:
+                    retry.extend(batches[auction_id])
+                    continue
+                for item in batches[auction_id]:
+                    logger.error('Hot book gave up on bid %s after %d failed writes', item, state.failures)
+                self.dead_letters.extend(batches[auction_id])
+                state.unflushed -= len(batches[auction_id])
+            # Retried bids go ahead of those accepted during the flush
+            self._pending = retry + self._pending
+            for auction_id in written:
+                if auction_id in self._states:
+                    self._states[auction_id].unflushed -= len(batches[auction_id])
+            for auction_id in [*written, *failed]:
+                state = self._states.get(auction_id)
+                # A failing auction goes back to the database path once settled
+                if state is not None and state.failures and not state.unflushed:
+                    del self._states[auction_id]
+                    released.append(auction_id)
+        if released:
+            cache.delete_many([_held_key(auction_id) for auction_id in released])
+
+    def _evict_ended(self):
+        now = timezone.now()
+        with self._lock:
+            evicted = [
+                auction_id for auction_id, state in self._states.items()
+                if state.end_time <= now and not state.unflushed
+            ]
+            for auction_id in evicted:
+                del self._states[auction_id]
+        if evicted:
+            cache.delete_many([_held_key(auction_id) for auction_id in evicted])
+
+    def release(self, auction_id):
+        """Flush and stop caching ``auction_id`` so it is bid on through the database again.
+
+        Bids on the auction are rejected from the moment it starts closing;
+        if its bids cannot be written it stays held and keeps rejecting them.
+        """
+        with self._lock:
+            state = self._states.get(int(auction_id))
+            if state is None:
+                return
+            state.closing = True
+        self.flush()
+        with self._lock:
+            if state.unflushed or self._states.get(state.auction_id) is not state:
+                return
+            del self._states[state.auction_id]
+        cache.delete(_held_key(state.auction_id))
+
+    def release_ended(self, now=None):
+        """Release every auction whose ``end_time`` has passed, before it is closed."""
+        now = now or timezone.now()
+        with self._lock:
+            ended = [auction_id for auction_id, state in self._states.items() if state.end_time <= now]
+        for auction_id in ended:
+            self.release(auction_id)
+
+    def clear(self):
+        """Drop all cached state and pending bids."""
+        with self._lock:
+            held = list(self._states)
+            self._states.clear()
+            self._pending = []
+            self.dead_letters = []
+        cache.delete_many([_held_key(auction_id) for auction_id in held])
+
+    def _ensure_flusher(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run, name='hot-book-flusher', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            time.sleep(self._interval())
+            close_old_connections()
+            try:
+                self.flush()
+            except Exception:
+                logger.exception('Hot book flush failed')
+
+
+hot_book = HotAuctionBook()
@@ -0,0 +1,249 @@
+"""End-to-end bid load test against a running ASGI server.
+
+Simulated bidders bid on one auction as fast as they get answers, over HTTP
+(``BidViewSet``) or the ``AuctionConsumer`` WebSocket, while anonymous
+watchers listen for ``bid_placed`` broadcasts. Each bid is a little above the
+highest bid seen so far, so bidders race each other the way they do in the
+final seconds of a hot auction and many bids are rejected as too low.
+
+Measured per run:
+
+- ack latency: send to ``201``/``400`` or ``bid_accepted``/``bid_rejected``,
+  per transport;
+- broadcast latency: bid sent to the first ``bid_placed`` frame at a watcher
+  showing that amount as the highest bid;
+- lost updates: bids a watcher never learned about, i.e. how far its last
+  ``bid_count`` is behind the last acknowledged one once the run has drained.
+  Coalesced frames cover several bids and are not losses.
+
+``manage.py loadtest_bids`` sets up the data and server and prints the report.
+"""
+import asyncio
+import itertools
+import json
+import random
+import re
+import time
+from collections import Counter
+from decimal import Decimal
+
+CENT = Decimal('0.01')
+
+
+def percentile(samples, fraction):
+    """Nearest-rank percentile of ``samples`` in seconds, as milliseconds."""
+    ordered = sorted(samples)
+    return round(ordered[min(len(ordered) - 1, int(len(ordered) * fraction))] * 1000, 2)
+
+
+def latency_summary(samples):
+    if not samples:
+        return None
+    return {
+        'count': len(samples),
+        'p50': percentile(samples, 0.50),
+        'p95': percentile(samples, 0.95),
+        'p99': percentile(samples, 0.99),
+        'max': round(max(samples) * 1000, 2),
+    }
+
+
+def _price_key(amount):
+    return Decimal(str(amount)).quantize(CENT)
+
+
+class BidLoadTest:
+    """One load test run against the server at ``base_url``.
+
+    ``bidders`` is a list of ``(transport, JWT access token)`` pairs, with
+    transport ``'http'`` or ``'ws'``; sockets send the token as a subprotocol.
+    """
+
+    def __init__(self, base_url, auction_id, bidders, watchers=5, duration=10, start_price=Decimal('0'),
+                 increment=Decimal('1.00'), think=0.0, timeout=10.0, drain=1.0, seed=42):
+        self.base_url = base_url.rstrip('/')
+        self.ws_url = 'ws' + self.base_url[len('http'):]
+        self.auction_id = auction_id
+        self.bidders = bidders
+        self.watchers = watchers
+        self.duration = duration
+        self.increment = Decimal(increment)
+        self.think = think
+        self.timeout = timeout
+        self.drain = drain
+        self.seed = seed
+
+        self.highest = Decimal(start_price)
+        self.elapsed = 0.0
+        self.sent_at = {}
+        self.ack_latencies = {'http': [], 'ws': []}
+        self.broadcast_latencies = []
+        self.outcomes = Counter()
+        self.rejections = Counter()
+        self.errors = Counter()
+        self.last_ack_count = 0
+        self.last_ack_highest = Decimal('0')
+        self.watcher_counts = [0] * watchers
+
+    async def run(self):
+        import aiohttp
+
+        self._aiohttp = aiohttp
+        async with aiohttp.ClientSession(
+            timeout=aiohttp.ClientTimeout(total=self.timeout),
+            # Daphne may close idle keep-alive connections under load
+            connector=aiohttp.TCPConnector(force_close=True),
+        ) as session:
+            self._session = session
+            sockets = [await self._connect() for _ in range(self.watchers)]
+            listeners = [asyncio.ensure_future(self._watch(index, ws)) for index, ws in enumerate(sockets)]
+            started = time.monotonic()
+            deadline = started + self.duration
+            await asyncio.gather(*[
+                self._bid_loop(index, transport, credential, deadline)
+                for index, (transport, credential) in enumerate(self.bidders)
+            ])
+            self.elapsed = time.monotonic() - started
+            # Let coalesced broadcasts and the last frames arrive
+            await asyncio.sleep(self.drain)
+            for ws in sockets:
+                await ws.close()
+            await asyncio.gather(*listeners, return_exceptions=True)
+        return self.report()
+
+    async def _connect(self, token=None):
+        return await self._session.ws_connect(
+            f'{self.ws_url}/ws/auction/{self.auction_id}/',
+            protocols=('jwt', token) if token else (),
+            timeout=self.timeout,
+        )
+
+    def _observe(self, frame):
+        if frame.get('type') == 'bid_placed':
+            self.highest = max(self.highest, _price_key(frame['data']['current_highest_bid']))
+
+    async def _watch(self, index, ws):
+        async for message in ws:
+            if message.type != self._aiohttp.WSMsgType.TEXT:
+                break
+            received = time.monotonic()
+            frame = json.loads(message.data)
+            self._observe(frame)
+            if frame.get('type') != 'bid_placed':
+                continue
+            data = frame['data']
+            sent = self.sent_at.pop((index, _price_key(data['current_highest_bid'])), None)
+            if sent is not None:
+                self.broadcast_latencies.append(received - sent)
+            self.watcher_counts[index] = max(self.watcher_counts[index], data['bid_count'])
+
+    def _next_amount(self, index, rng):
+        # Bidder-specific cents keep concurrent amounts apart
+        amount = self.highest + self.increment * rng.randint(1, 3) + Decimal(index % 100) * CENT
+        return amount.quantize(CENT)
+
+    async def _bid_loop(self, index, transport, credential, deadline):
+        rng = random.Random(self.seed + index)
+        ws = await self._connect(credential) if transport == 'ws' else None
+        request_ids = itertools.count(1)
+        try:
+            while time.monotonic() < deadline:
+                amount = self._next_amount(index, rng)
+                started = time.monotonic()
+                for watcher in range(self.watchers):
+                    self.sent_at.setdefault((watcher, amount), started)
+                try:
+                    if ws is None:
+                        outcome, detail = await self._bid_http(credential, amount)
+                    else:
+                        outcome, detail = await self._bid_ws(ws, next(request_ids), amount)
+                except (self._aiohttp.ClientError, asyncio.TimeoutError, ValueError) as exc:
+                    outcome, detail = 'error', type(exc).__name__
+                self.outcomes[outcome] += 1
+                if outcome == 'error':
+                    self.errors[detail] += 1
+                    await asyncio.sleep(0.1)
+                    if ws is not None and ws.closed:
+                        # Reconnect like a browser would; failures count as errors next round
+                        try:
+                            ws = await self._connect(credential)
+                            self.outcomes['reconnect'] += 1
+                        except (self._aiohttp.ClientError, asyncio.TimeoutError):
+                            pass
+                    continue
+                self.ack_latencies[transport].append(time.monotonic() - started)
+                if outcome == 'rejected':
+                    # Group reasons that only differ in the amount
+                    self.rejections[re.sub(r'\d+(\.\d+)?', 'N', detail)] += 1
+                if self.think:
+                    await asyncio.sleep(self.think)
+        finally:
+            if ws is not None:
+                await ws.close()
+
+    def _accepted(self, bid_count, highest):
+        if bid_count >= self.last_ack_count:
+            self.last_ack_count = bid_count
+            self.last_ack_highest = _price_key(highest)
+        self.highest = max(self.highest, _price_key(highest))
+
+    async def _bid_http(self, token, amount):
+        async with self._session.post(
+            f'{self.base_url}/api/bidding/bids/',
+            json={'auction_id': self.auction_id, 'amount': str(amount)},
+            headers={'Authorization': f'Bearer {token}'},
+        ) as response:
+            text = await response.text()
+        if response.status == 201:
+            auction = json.loads(text)['auction']
+            self._accepted(auction['bid_count'], auction['current_highest_bid'])
+            return 'accepted', None
+        if response.status == 400:
+            body = json.loads(text)
+            return 'rejected', str(body.get('detail', body))
+        return 'error', f'HTTP {response.status}'
+
+    async def _bid_ws(self, ws, request_id, amount):
+        await ws.send_str(json.dumps({'type': 'place_bid', 'amount': str(amount), 'request_id': request_id}))
+        while True:
+            message = await ws.receive(timeout=self.timeout)
+            if message.type != self._aiohttp.WSMsgType.TEXT:
+                return 'error', f'WebSocket {message.type.name}'
+            frame = json.loads(message.data)
+            self._observe(frame)
+            data = frame.get('data') or {}
+            if frame.get('type') in ('bid_accepted', 'bid_rejected') and data.get('request_id') == request_id:
+                break
+        if frame['type'] == 'bid_accepted':
+            self._accepted(data['bid_count'], data['current_highest_bid'])
+            return 'accepted', None
+        if data.get('reason') == 'retry':
+            # Counted like the HTTP 503 for the same server-side failure
+            return 'error', 'WebSocket retry'
+        return 'rejected', str(data.get('detail'))
+
+    def report(self):
+        attempted = self.outcomes['accepted'] + self.outcomes['rejected'] + self.outcomes['error']
+        accepted = self.outcomes['accepted']
+        return {
+            'bidders': dict(Counter(transport for transport, _ in self.bidders)),
+            'watchers': self.watchers,
+            'duration_s': round(self.elapsed, 2),
+            'bids_attempted': attempted,
+            'bids_accepted': accepted,
+            'accepted_per_second': round(accepted / self.elapsed, 1) if self.elapsed else 0.0,
+            'attempted_per_second': round(attempted / self.elapsed, 1) if self.elapsed else 0.0,
+            'rejected': self.outcomes['rejected'],
+            'errors': self.outcomes['error'],
+            'reconnects': self.outcomes['reconnect'],
+            'error_rate': round(self.outcomes['error'] / attempted, 4) if attempted else 0.0,
+            'rejection_reasons': dict(self.rejections.most_common()),
+            'error_reasons': dict(self.errors.most_common()),
+            'ack_latency_ms': {
+                transport: latency_summary(samples) for transport, samples in self.ack_latencies.items() if samples
+            },
+            'broadcast_latency_ms': latency_summary(self.broadcast_latencies),
+            'last_ack_bid_count': self.last_ack_count,
+            'last_ack_highest_bid': str(self.last_ack_highest),
+            'lost_updates': sum(max(0, self.last_ack_count - seen) for seen in self.watcher_counts),
+        }
@@ -0,0 +1,60 @@
+import random
+import time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from apps.bidding.autobid import resolve_proxy_bids
+from apps.bidding.models import AutoBidRule
+from apps.bidding.services import place_bid
+from apps.users.models import User
+from benchmarks.db import rolled_back
+from benchmarks.factories import AuctionFactory, AutoBidRuleFactory, UserFactory
+
+
+class Command(BaseCommand):
+    help = 'Benchmark proxy auto-bid resolution with thousands of competing rules'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rules', type=int, nargs='+', default=[100, 1000, 5000])
+        parser.add_argument('--repeat', type=int, default=200)
+        parser.add_argument('--db-rules', type=int, default=2000,
+                            help='Rules stored in the database for the place_bid timing')
+
+    def handle(self, *args, **options):
+        rng = random.Random(42)
+        increment = Decimal('1.00')
+        for count in options['rules']:
+            rules = [
+                (index, index + 2, Decimal(rng.randint(11, 100000)))
+                for index in range(count)
+            ]
+            started = time.perf_counter()
+            for _ in range(options['repeat']):
+                resolve_proxy_bids(Decimal('10.00'), 1, increment, rules)
+            elapsed = (time.perf_counter() - started) / options['repeat']
+            self.stdout.write(f'resolve {count:>6} rules: {elapsed * 1e6:8.1f} us CPU per bid')
+
+        with rolled_back():
+            self._bench_place_bid(options['db_rules'], rng)
+
+    def _bench_place_bid(self, count, rng):
+        users = User.objects.bulk_create(UserFactory.build_batch(count + 2))
+        auction = AuctionFactory(
+            seller=users[0],
+            starting_price=Decimal('1.00'),
+            current_highest_bid=Decimal('0.00'),
+            bid_count=0,
+            end_time=timezone.now() + timezone.timedelta(hours=1),
+        )
+        AutoBidRule.objects.bulk_create([
+            AutoBidRuleFactory.build(auction=auction, bidder=user, max_bid=Decimal(rng.randint(2, 100000)))
+            for user in users[2:]
+        ])
+        started = time.perf_counter()
+        bid = place_bid(auction.pk, users[1], Decimal('1.00'))
+        elapsed = time.perf_counter() - started
+        self.stdout.write(
+            f'place_bid with {count} stored rules: {elapsed * 1000:.2f} ms, '
+            f'{len(bid.auto_bids)} auto-bids written, final price {bid.auction.current_highest_bid}'
+        )
@@ -0,0 +1,155 @@
+import asyncio
+import multiprocessing
+import statistics
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from channels_redis.core import RedisChannelLayer
+from apps.bidding.testing import fake_redis_channel_layers
+
+GROUP = 'auction_bench'
+
+
+async def _subscribe(layer, count):
+    channels = [await layer.new_channel() for _ in range(count)]
+    for channel in channels:
+        await layer.group_add(GROUP, channel)
+    return channels
+
+
+async def _collect(layer, channels, messages, timeout):
+    latencies = []
+
+    async def listen(channel):
+        for _ in range(messages):
+            message = await layer.receive(channel)
+            latencies.append(time.time() - message['sent_at'])
+
+    try:
+        await asyncio.wait_for(asyncio.gather(*(listen(channel) for channel in channels)), timeout)
+    except asyncio.TimeoutError:
+        pass
+    return latencies
+
+
+async def _publish(layer, messages, interval):
+    for sequence in range(messages):
+        await layer.group_send(GROUP, {'type': 'auction.message', 'seq': sequence, 'sent_at': time.time()})
+        await asyncio.sleep(interval)
+
+
+def _worker(config, count, messages, timeout, ready, results):
+    async def run():
+        layer = RedisChannelLayer(**config)
+        channels = await _subscribe(layer, count)
+        ready.put(count)
+        latencies = await _collect(layer, channels, messages, timeout)
+        await layer.close_pools()
+        return latencies
+
+    results.put(asyncio.run(run()))
+
+
+class Command(BaseCommand):
+    help = 'Benchmark bid broadcast latency from one publisher to many WebSocket subscribers'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--subscribers', type=int, default=10000)
+        parser.add_argument('--workers', type=int, default=4,
+                            help='Simulated Daphne workers sharing the subscribers')
+        parser.add_argument('--messages', type=int, default=20)
+        parser.add_argument('--interval', type=float, default=0.05,
+                            help='Seconds between broadcasts')
+        parser.add_argument('--timeout', type=float, default=60)
+        parser.add_argument('--hosts', default=None,
+                            help='Comma-separated Redis URLs; workers then run as separate processes. '
+                                 'Defaults to the redis CHANNEL_LAYERS hosts, or fake Redis in one process.')
+        parser.add_argument('--shards', type=int, default=2,
+                            help='Fake Redis servers to shard across when no real hosts are used')
+
+    def handle(self, *args, **options):
+        config = self._redis_config(options['hosts'])
+        per_worker = [
+            options['subscribers'] // options['workers'] + (index < options['subscribers'] % options['workers'])
+            for index in range(options['workers'])
+        ]
+        started = time.perf_counter()
+        if config is None:
+            self.stdout.write(f'Fake Redis, {options["shards"]} shards, {options["workers"]} workers in one process')
+            fake = fake_redis_channel_layers(shards=options['shards'])['default']['CONFIG']
+            latencies = asyncio.run(self._run_in_process(fake, per_worker, options))
+        else:
+            self.stdout.write(f'Redis {config["hosts"]}, {options["workers"]} worker processes')
+            latencies = self._run_processes(config, per_worker, options)
+        elapsed = time.perf_counter() - started
+        self._report(latencies, options, elapsed)
+
+    def _redis_config(self, hosts):
+        if hosts:
+            return {'hosts': [host.strip() for host in hosts.split(',') if host.strip()]}
+        layer = settings.CHANNEL_LAYERS['default']
+        if layer['BACKEND'] == 'channels_redis.core.RedisChannelLayer':
+            return dict(layer.get('CONFIG', {}))
+        return None
+
+    async def _run_in_process(self, config, per_worker, options):
+        layers = [RedisChannelLayer(**config) for _ in per_worker]
+        subscriptions = [await _subscribe(layer, count) for layer, count in zip(layers, per_worker)]
+        collectors = [
+            asyncio.ensure_future(_collect(layer, channels, options['messages'], options['timeout']))
+            for layer, channels in zip(layers, subscriptions)
+        ]
+        publisher = RedisChannelLayer(**config)
+        await _publish(publisher, options['messages'], options['interval'])
+        latencies = []
+        for result in await asyncio.gather(*collectors):
+            latencies.extend(result)
+        for layer in [publisher, *layers]:
+            await layer.close_pools()
+        return latencies
+
+    def _run_processes(self, config, per_worker, options):
+        ready, results = multiprocessing.Queue(), multiprocessing.Queue()
+        processes = [
+            multiprocessing.Process(
+                target=_worker,
+                args=(config, count, options['messages'], options['timeout'], ready, results),
+                daemon=True,
+            )
+            for count in per_worker
+        ]
+        for process in processes:
+            process.start()
+        for _ in processes:
+            ready.get(timeout=options['timeout'])
+
+        async def publish():
+            layer = RedisChannelLayer(**config)
+            await _publish(layer, options['messages'], options['interval'])
+            await layer.close_pools()
+
+        asyncio.run(publish())
+        latencies = []
+        for _ in processes:
+            latencies.extend(results.get(timeout=options['timeout'] + 10))
+        for process in processes:
+            process.join()
+        if not latencies:
+            raise CommandError('No broadcasts were delivered')
+        return latencies
+
+    def _report(self, latencies, options, elapsed):
+        expected = options['subscribers'] * options['messages']
+        self.stdout.write(f'delivered {len(latencies)}/{expected} messages in {elapsed:.1f}s')
+        if not latencies:
+            return
+        latencies.sort()
+
+        def percentile(fraction):
+            return latencies[min(len(latencies) - 1, int(len(latencies) * fraction))] * 1000
+
+        self.stdout.write(
+            f'latency ms: mean {statistics.mean(latencies) * 1000:.1f}  p50 {percentile(0.50):.1f}  '
+            f'p95 {percentile(0.95):.1f}  p99 {percentile(0.99):.1f}  max {latencies[-1] * 1000:.1f}'
+        )
@@ -0,0 +1,65 @@
+import time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from apps.bidding.hotbook import HotAuctionBook
+from apps.bidding.services import place_bid
+from benchmarks.db import rolled_back
+from benchmarks.factories import AuctionFactory, UserFactory
+
+
+class Command(BaseCommand):
+    help = 'Benchmark bids/second on a single hot auction with and without the hot book'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--bids', type=int, default=2000)
+        parser.add_argument('--bidders', type=int, default=50)
+        parser.add_argument('--flush-every', type=int, default=200,
+                            help='Hot book flush batch size')
+
+    def handle(self, *args, **options):
+        with rolled_back():
+            self._run(options)
+
+    def _setup(self, bidders):
+        users = UserFactory.create_batch(bidders)
+        auction = AuctionFactory(
+            starting_price=Decimal('1.00'),
+            current_highest_bid=Decimal('0.00'),
+            minimum_increment=Decimal('1.00'),
+            bid_count=0,
+            end_time=timezone.now() + timezone.timedelta(minutes=2),
+            anti_snipe_seconds=0,
+        )
+        return auction, users
+
+    def _run(self, options):
+        bids = options['bids']
+        auction, users = self._setup(options['bidders'])
+
+        started = time.perf_counter()
+        for index in range(bids):
+            place_bid(auction.pk, users[index % len(users)], Decimal(index + 1))
+        database_rate = bids / (time.perf_counter() - started)
+
+        auction.refresh_from_db()
+        book = HotAuctionBook(window_seconds=600, background=False)
+        book.promote(auction, users[(bids - 1) % len(users)].pk)
+        base = int(auction.current_highest_bid)
+        started = time.perf_counter()
+        for index in range(bids):
+            book.place(auction.pk, users[index % len(users)], Decimal(base + index + 1))
+            if (index + 1) % options['flush_every'] == 0:
+                book.flush()
+        book.flush()
+        book_rate = bids / (time.perf_counter() - started)
+
+        auction.refresh_from_db()
+        self.stdout.write(f'bids per run:        {bids}')
+        self.stdout.write(f'place_bid (DB):      {database_rate:,.0f} bids/s')
+        self.stdout.write(f'hot book + flush:    {book_rate:,.0f} bids/s')
+        self.stdout.write(f'speedup:             {book_rate / database_rate:.1f}x')
+        self.stdout.write(self.style.SUCCESS(
+            f'Reconciled bid_count={auction.bid_count}, current_highest_bid={auction.current_highest_bid}'
+        ))
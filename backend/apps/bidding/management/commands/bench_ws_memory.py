@@ -0,0 +1,84 @@
+import asyncio
+import contextlib
+import gc
+import io
+import time
+import tracemalloc
+
+from channels.layers import get_channel_layer
+from channels.routing import URLRouter
+from channels.testing import WebsocketCommunicator
+from django.core.management.base import BaseCommand
+from apps.bidding.presence import presence
+from apps.bidding.routing import websocket_urlpatterns
+
+
+class Command(BaseCommand):
+    help = ('Compare memory per client watching many auctions with one socket per auction '
+            'and with one multiplexed socket')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clients', type=int, default=50)
+        parser.add_argument('--auctions', type=int, default=40, help='Auctions each client watches')
+
+    def handle(self, *args, **options):
+        clients, auctions = options['clients'], options['auctions']
+        self.stdout.write(
+            f'{clients} clients watching {auctions} auctions each, '
+            f'{type(get_channel_layer()).__name__}, in-process ASGI (no TCP buffers)'
+        )
+        background = presence.background
+        presence.background = False
+        try:
+            # AuctionConsumer logs every connect and disconnect to stdout
+            with contextlib.redirect_stdout(io.StringIO()):
+                results = {
+                    'per auction': asyncio.run(self._measure(clients, auctions, self._per_auction)),
+                    'multiplexed': asyncio.run(self._measure(clients, auctions, self._multiplexed)),
+                }
+        finally:
+            presence.background = background
+            presence.clear()
+        for mode, result in results.items():
+            self.stdout.write(
+                f"{mode:<12} {result['sockets']:>6} sockets  {result['kib_per_client']:9.1f} KiB/client  "
+                f"connect {result['connect_s']:6.2f}s"
+            )
+        ratio = results['per auction']['kib_per_client'] / max(results['multiplexed']['kib_per_client'], 0.01)
+        self.stdout.write(f'multiplexed clients use {ratio:.1f}x less memory')
+
+    async def _per_auction(self, application, auctions):
+        sockets = []
+        for auction_id in range(1, auctions + 1):
+            communicator = WebsocketCommunicator(application, f'/ws/auction/{auction_id}/')
+            await communicator.connect()
+            sockets.append(communicator)
+        return sockets
+
+    async def _multiplexed(self, application, auctions):
+        communicator = WebsocketCommunicator(application, '/ws/auctions/')
+        await communicator.connect()
+        await communicator.send_json_to({'type': 'subscribe', 'auction_ids': list(range(1, auctions + 1))})
+        await communicator.receive_json_from()
+        return [communicator]
+
+    async def _measure(self, clients, auctions, open_client):
+        application = URLRouter(websocket_urlpatterns)
+        gc.collect()
+        tracemalloc.start()
+        before = tracemalloc.get_traced_memory()[0]
+        started = time.perf_counter()
+        sockets = []
+        for _ in range(clients):
+            sockets.extend(await open_client(application, auctions))
+        elapsed = time.perf_counter() - started
+        gc.collect()
+        used = tracemalloc.get_traced_memory()[0] - before
+        tracemalloc.stop()
+        for communicator in sockets:
+            await communicator.disconnect()
+        return {
+            'sockets': len(sockets),
+            'kib_per_client': used / clients / 1024,
+            'connect_s': elapsed,
+        }
@@ -0,0 +1,184 @@
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from rest_framework_simplejwt.tokens import AccessToken
+from apps.auctions.models import Auction, Category
+from apps.bidding.loadtest import BidLoadTest
+from apps.bidding.models import Bid
+from apps.users.models import User
+
+
+class Command(BaseCommand):
+    help = 'Load test bidding on one hot auction over HTTP and WebSocket against a local Daphne'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--bidders', type=int, default=20)
+        parser.add_argument('--ws-share', type=float, default=0.5,
+                            help='Fraction of bidders using the WebSocket instead of HTTP')
+        parser.add_argument('--watchers', type=int, default=5, help='Anonymous sockets timing broadcasts')
+        parser.add_argument('--duration', type=float, default=10, help='Seconds of bidding')
+        parser.add_argument('--think-ms', type=float, default=0, help='Pause per bidder between bids')
+        parser.add_argument('--host', default='127.0.0.1')
+        parser.add_argument('--port', type=int, default=8765)
+        parser.add_argument('--url', default=None,
+                            help='Use an already running server using this database instead of starting Daphne')
+        parser.add_argument('--channel-layer', choices=['memory', 'fakeredis'], default='memory',
+                            help='Channel layer of the started Daphne')
+        parser.add_argument('--hot-book', action='store_true', help='Enable the in-memory hot auction book')
+        parser.add_argument('--report', default=None, help='Also write the report as JSON to this file')
+        parser.add_argument('--server-log', default=None, help='Write the started Daphne output to this file')
+        parser.add_argument('--keep-data', action='store_true', help='Keep the auction, bids and users')
+
+    def handle(self, *args, **options):
+        try:
+            import aiohttp  # noqa: F401
+        except ImportError:
+            raise CommandError('The load test client needs aiohttp: pip install aiohttp')
+
+        auction, users = self._setup(options['bidders'], options['duration'])
+        try:
+            ws_bidders = round(options['bidders'] * options['ws_share'])
+            bidders = [
+                ('ws' if index < ws_bidders else 'http', str(AccessToken.for_user(user)))
+                for index, user in enumerate(users)
+            ]
+            server = None
+            try:
+                if options['url']:
+                    base_url = options['url']
+                else:
+                    server = self._start_server(options)
+                    base_url = f"http://{options['host']}:{options['port']}"
+                self.stdout.write(
+                    f"{len(bidders) - ws_bidders} HTTP + {ws_bidders} WebSocket bidders, {options['watchers']} watchers, "
+                    f"{options['duration']:g}s against {base_url}"
+                )
+                test = BidLoadTest(
+                    base_url, auction.pk, bidders,
+                    watchers=options['watchers'],
+                    duration=options['duration'],
+                    start_price=auction.starting_price,
+                    increment=auction.minimum_increment,
+                    think=options['think_ms'] / 1000,
+                    # Long enough for hot book flushes and coalesced broadcasts
+                    drain=max(1.0, 2 * settings.BIDDING_HOT_BOOK_FLUSH_INTERVAL),
+                )
+                report = asyncio.run(test.run())
+            finally:
+                if server is not None:
+                    self._stop_server(server)
+
+            auction.refresh_from_db()
+            report['db_bid_count'] = auction.bid_count
+            report['db_bids_saved'] = Bid.objects.filter(auction=auction).count()
+            report['db_highest_bid'] = str(auction.current_highest_bid)
+            # Acknowledged bids that never reached the database
+            report['lost_writes'] = max(0, report['last_ack_bid_count'] - report['db_bids_saved'])
+            self._print(report)
+            if options['report']:
+                with open(options['report'], 'w') as handle:
+                    json.dump(report, handle, indent=2, ensure_ascii=False)
+                self.stdout.write(f"report written to {options['report']}")
+        finally:
+            # Also after a failed or interrupted run, so it leaves no users behind
+            if not options['keep_data']:
+                auction.delete()
+                User.objects.filter(pk__in=[user.pk for user in users] + [auction.seller_id]).delete()
+
+    def _setup(self, bidders, duration):
+        prefix = f'loadtest-{uuid.uuid4().hex[:8]}'
+        now = timezone.now()
+        seller = User.objects.create(username=f'{prefix}-seller')
+        users = [User.objects.create(username=f'{prefix}-bidder-{index}') for index in range(bidders)]
+        category = Category.objects.first() or Category.objects.create(name='Load test', slug='load-test')
+        auction = Auction.objects.create(
+            title='Load test auction',
+            description='Load test',
+            category=category,
+            seller=seller,
+            starting_price=Decimal('1.00'),
+            minimum_increment=Decimal('1.00'),
+            start_time=now,
+            # In its final minutes for the whole run, where the hot book applies
+            end_time=now + timezone.timedelta(seconds=duration + 120),
+            status='active',
+            anti_snipe_seconds=0,
+        )
+        return auction, users
+
+    def _start_server(self, options):
+        env = dict(
+            os.environ,
+            CHANNEL_LAYER_BACKEND=options['channel_layer'],
+            BIDDING_HOT_BOOK_ENABLED='True' if options['hot_book'] else 'False',
+        )
+        log = open(options['server_log'], 'w+b') if options['server_log'] else tempfile.TemporaryFile()
+        server = subprocess.Popen(
+            [sys.executable, '-m', 'daphne', '-b', options['host'], '-p', str(options['port']),
+             'config.asgi:application'],
+            cwd=settings.BASE_DIR, env=env, stdout=log, stderr=subprocess.STDOUT,
+        )
+        server.log = log
+        deadline = time.monotonic() + 20
+        while time.monotonic() < deadline:
+            if server.poll() is not None:
+                break
+            try:
+                socket.create_connection((options['host'], options['port']), timeout=0.5).close()
+                return server
+            except OSError:
+                time.sleep(0.2)
+        log.seek(0)
+        output = log.read().decode(errors='replace')[-2000:]
+        self._stop_server(server)
+        raise CommandError('Daphne did not start:\n' + output)
+
+    def _stop_server(self, server):
+        server.terminate()
+        try:
+            server.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            server.kill()
+            server.wait()
+        server.log.close()
+
+    def _print(self, report):
+        self.stdout.write(
+            f"bids: {report['bids_attempted']} attempted ({report['attempted_per_second']}/s), "
+            f"{report['bids_accepted']} accepted ({report['accepted_per_second']}/s), "
+            f"{report['rejected']} rejected, {report['errors']} errors ({report['error_rate']:.2%}), "
+            f"{report['reconnects']} WebSocket reconnects"
+        )
+        for reason, count in report['rejection_reasons'].items():
+            self.stdout.write(f'  rejected {count:>6}  {reason}')
+        for reason, count in report['error_reasons'].items():
+            self.stdout.write(f'  error    {count:>6}  {reason}')
+        latencies = [(f'ack {transport}', summary) for transport, summary in report['ack_latency_ms'].items()]
+        latencies.append(('broadcast', report['broadcast_latency_ms']))
+        for name, summary in latencies:
+            if summary:
+                self.stdout.write(
+                    f"{name:<14} ms: p50 {summary['p50']:8.1f}  p95 {summary['p95']:8.1f}  "
+                    f"p99 {summary['p99']:8.1f}  max {summary['max']:8.1f}  ({summary['count']} samples)"
+                )
+        self.stdout.write(
+            f"last ack: bid_count {report['last_ack_bid_count']}, highest {report['last_ack_highest_bid']}; "
+            f"database: {report['db_bids_saved']} bids saved, bid_count {report['db_bid_count']}, "
+            f"highest {report['db_highest_bid']}"
+        )
+        style = self.style.SUCCESS if not (report['lost_updates'] or report['lost_writes']) else self.style.ERROR
+        self.stdout.write(style(
+            f"lost updates (watchers behind last ack): {report['lost_updates']}, "
+            f"lost writes (acked, not saved): {report['lost_writes']}"
+        ))
@@ -0,0 +1,83 @@
+import json
+import random
+from datetime import datetime, timedelta, timezone
+
+from django.core.management.base import BaseCommand
+from apps.bidding.coalescer import BroadcastCoalescer, encode_frame, metrics, state_delta
+
+
+class Command(BaseCommand):
+    help = 'Simulate bid broadcasts for a busy auction and report frames and bytes saved by coalescing'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--bids-per-minute', type=int, default=1000)
+        parser.add_argument('--minutes', type=float, default=1)
+        parser.add_argument('--window-ms', type=int, default=50)
+        parser.add_argument('--subscribers', type=int, default=100)
+        parser.add_argument('--burst', type=int, default=2,
+                            help='Bids per arrival, e.g. a bid and the proxy bid answering it')
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        frames = []
+        coalescer = BroadcastCoalescer(
+            window=options['window_ms'] / 1000,
+            send=lambda auction_id, message: frames.append(message),
+            timers=False,
+        )
+        before = metrics.copy()
+
+        events = []
+        end_time = datetime(2030, 1, 1, tzinfo=timezone.utc)
+        arrivals_per_second = options['bids_per_minute'] / 60 / options['burst']
+        now, price, count = 0.0, 100.0, 0
+        while now < options['minutes'] * 60:
+            now += rng.expovariate(arrivals_per_second)
+            for offset in range(options['burst']):
+                price += 5
+                count += 1
+                end_time += timedelta(seconds=rng.choice([0, 0, 0, 30]))
+                data = {
+                    'amount': price,
+                    'bidder': f'bidder{rng.randint(1, 40)}',
+                    'bidderAvatar': None,
+                    'end_time': end_time.isoformat(),
+                    'bid_count': count,
+                    'current_highest_bid': price,
+                    'anti_snipe_seconds': 30,
+                }
+                events.append(data)
+                at = now + offset * 0.005
+                coalescer.flush_due(at)
+                coalescer.publish(1, data, now=at)
+        coalescer.flush_due(float('inf'))
+
+        naive = sum(len(json.dumps({'type': 'bid_placed', 'data': data})) for data in events)
+        coalesced = sum(len(encode_frame(frame)) for frame in frames)
+        delta_json = delta_msgpack = 0
+        previous = None
+        for frame in frames:
+            data = frame['data']
+            if previous is not None:
+                frame = {'type': 'bid_delta', 'data': state_delta(previous, data)}
+            previous = data
+            delta_json += len(encode_frame(frame))
+            delta_msgpack += len(encode_frame(frame, binary=True))
+
+        subscribers = options['subscribers']
+        self.stdout.write(
+            f'{len(events)} bids, {len(frames)} frames '
+            f'({100 * (1 - len(frames) / len(events)):.1f}% fewer) with a {options["window_ms"]} ms window'
+        )
+        self.stdout.write(f'coalescer metrics: {dict(metrics - before)}')
+        self.stdout.write(f'bytes to {subscribers} subscribers:')
+        for label, size in [
+            ('one JSON frame per bid', naive),
+            ('coalesced JSON', coalesced),
+            ('coalesced JSON deltas', delta_json),
+            ('coalesced msgpack deltas', delta_msgpack),
+        ]:
+            self.stdout.write(
+                f'  {label:<26} {size * subscribers / 1024:10.1f} KiB  ({100 * (1 - size / naive):5.1f}% saved)'
+            )
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+from apps.bidding.presence import SOCKET_METRICS, socket_stats
+
+
+class Command(BaseCommand):
+    help = 'Show WebSocket connections and outbox counters of every live worker'
+
+    def handle(self, *args, **options):
+        stats = socket_stats()
+        if not stats:
+            self.stdout.write('no live workers have published stats')
+            return
+        columns = ('connections', *SOCKET_METRICS)
+        width = max(len(process_id) for process_id in stats)
+        self.stdout.write(f"{'worker':<{width}}  " + '  '.join(f'{column:>23}' for column in columns))
+        for process_id, values in sorted(stats.items()):
+            self.stdout.write(f'{process_id:<{width}}  ' + '  '.join(f'{values.get(column, 0):>23}' for column in columns))
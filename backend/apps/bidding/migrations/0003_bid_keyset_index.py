@@ -0,0 +1,23 @@
+# Generated by Django 4.2.7 on 2026-10-18 05:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("bidding", "0002_initial"),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name="bid",
+            name="bidding_bid_auction_d1ea3d_idx",
+        ),
+        migrations.AddIndex(
+            model_name="bid",
+            index=models.Index(
+                fields=["auction", "-created_at", "-id"],
+                name="bidding_bid_auction_bcf4f8_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 4.2.7 on 2026-10-18 05:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("bidding", "0003_bid_keyset_index"),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name="bid",
+            name="bidding_bid_auction_bcf4f8_idx",
+        ),
+        migrations.AddIndex(
+            model_name="bid",
+            index=models.Index(
+                fields=["auction", "-created_at", "-id"],
+                include=("amount", "bidder", "is_auto_bid"),
+                name="bidding_bid_ladder_idx",
+            ),
+        ),
+    ]
@@ -7,6 +7,18 @@ from apps.auctions.models import Auction
 User = get_user_model()
 
 
+class BidQuerySet(models.QuerySet):
+    def as_ladder(self):
+        """Rows for ``BidLadderSerializer``: the bid columns and bidder name, as dicts.
+
+        Apart from the bidder join these are all in the ``(auction, -created_at, -id)``
+        index, which covers them on PostgreSQL.
+        """
+        return self.values(
+            'id', 'amount', 'is_auto_bid', 'created_at', 'bidder__username', 'bidder__avatar',
+        )
+
+
 class Bid(models.Model):
     """Individual bid on an auction."""
     
@@ -22,11 +34,18 @@ class Bid(models.Model):
     
     created_at = models.DateTimeField(auto_now_add=True)
     
+    objects = BidQuerySet.as_manager()
+    
     class Meta:
         db_table = 'bidding_bid'
         ordering = ['-created_at']
         indexes = [
-            models.Index(fields=['auction', 'created_at']),
+            # Covering index for the bid ladder; ``include`` is ignored outside PostgreSQL
+            models.Index(
+                fields=['auction', '-created_at', '-id'],
+                include=['amount', 'bidder', 'is_auto_bid'],
+                name='bidding_bid_ladder_idx',
+            ),
             models.Index(fields=['bidder', 'created_at']),
         ]
     
@@ -0,0 +1,260 @@
+"""Presence of users and auction viewers, fed by WebSocket connections.
+
+Every process tracks its own open ``AuctionConsumer`` and
+``MultiAuctionConsumer`` connections and the auctions they watch exactly,
+and publishes a summary to the default cache, which must be shared
+(``CACHE_BACKEND=redis``) once there is more than one worker, every
+``PRESENCE_BROADCAST_SECONDS``: the ids of connected users and the number of
+viewers per auction, stored under per-process keys that expire after
+``PRESENCE_TTL_SECONDS``. A process that dies without cleaning up simply
+drops out when its keys expire. Readers combine the keys of all live
+processes with one ``get_many``.
+
+The live process with the lowest id also sums the viewer counts and sends
+``{"type": "viewers", "data": {"auction_id", "count"}}`` to auction groups
+whose count changed, so clients get at most one update per interval. Every
+``AUCTION_CLOCK_TICK_SECONDS`` it also sends a ``clock`` frame to auctions
+with viewers so clients can keep correcting for clock skew.
+
+Each process also publishes its WebSocket outbox counters (queue depth,
+superseded frames, slow client disconnects), read back per process with
+``socket_stats``.
+
+The cache must be shared between processes (Redis) for cross-process
+presence; with the default local-memory cache each process sees only its
+own connections.
+"""
+import logging
+import os
+import socket
+import threading
+import time
+import uuid
+from collections import Counter
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.conf import settings
+from django.core.cache import cache
+from apps.auctions.clock import clock_frame
+from .coalescer import metrics
+
+logger = logging.getLogger('backend')
+
+PROCESSES_KEY = 'presence:processes'
+
+SOCKET_METRICS = ('outbox_depth', 'outbox_peak', 'outbox_superseded', 'outbox_slow_disconnects', 'event_resyncs')
+
+
+def _ttl():
+    return getattr(settings, 'PRESENCE_TTL_SECONDS', 30)
+
+
+def _users_key(process_id):
+    return f'presence:{process_id}:users'
+
+
+def _viewers_key(process_id):
+    return f'presence:{process_id}:viewers'
+
+
+def _sockets_key(process_id):
+    return f'presence:{process_id}:sockets'
+
+
+def _live_processes():
+    now = time.time()
+    return sorted(
+        process_id
+        for process_id, expires_at in (cache.get(PROCESSES_KEY) or {}).items()
+        if expires_at > now
+    )
+
+
+class PresenceTracker:
+    """Open connections of this process and their published summary."""
+
+    def __init__(self, interval=None, background=True):
+        self.interval = interval
+        self.background = background
+        self.process_id = f'{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}'
+        self._connections = {}
+        self._broadcast_counts = {}
+        self._registered_until = 0
+        self._last_tick = 0
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def _interval(self):
+        if self.interval is not None:
+            return self.interval
+        return getattr(settings, 'PRESENCE_BROADCAST_SECONDS', 2)
+
+    def connect(self, channel_name, auction_id=None, user_id=None):
+        """Register an open connection, watching ``auction_id`` if given."""
+        with self._lock:
+            self._connections[channel_name] = [set() if auction_id is None else {str(auction_id)}, user_id, None]
+        if self.background:
+            self._ensure_publisher()
+
+    def watch(self, channel_name, auction_ids):
+        """Count the connection as a viewer of ``auction_ids`` too."""
+        with self._lock:
+            connection = self._connections.get(channel_name)
+            if connection is not None:
+                connection[0].update(str(auction_id) for auction_id in auction_ids)
+
+    def unwatch(self, channel_name, auction_ids):
+        with self._lock:
+            connection = self._connections.get(channel_name)
+            if connection is not None:
+                connection[0].difference_update(str(auction_id) for auction_id in auction_ids)
+
+    def heartbeat(self, channel_name):
+        """Note a client heartbeat; clients that stop sending them are dropped."""
+        with self._lock:
+            connection = self._connections.get(channel_name)
+            if connection is not None:
+                connection[2] = time.monotonic()
+
+    def disconnect(self, channel_name):
+        with self._lock:
+            self._connections.pop(channel_name, None)
+
+    def _drop_silent(self):
+        # Only clients that have sent heartbeats are expected to keep sending them
+        cutoff = time.monotonic() - _ttl()
+        with self._lock:
+            for channel_name, (_, _, last_heartbeat) in list(self._connections.items()):
+                if last_heartbeat is not None and last_heartbeat < cutoff:
+                    del self._connections[channel_name]
+
+    def local_summary(self):
+        """Return ``(user ids, viewers per auction id)`` for this process."""
+        with self._lock:
+            connections = list(self._connections.values())
+        users = sorted({user_id for _, user_id, _ in connections if user_id is not None})
+        viewers = Counter(auction_id for auction_ids, _, _ in connections for auction_id in auction_ids)
+        return users, dict(viewers)
+
+    def publish(self):
+        """Publish this process's summary and, if leader, broadcast changed counts."""
+        self._drop_silent()
+        users, viewers = self.local_summary()
+        ttl = _ttl()
+        with self._lock:
+            connections = len(self._connections)
+        cache.set_many({
+            _users_key(self.process_id): users,
+            _viewers_key(self.process_id): viewers,
+            _sockets_key(self.process_id): {
+                'connections': connections,
+                **{key: metrics[key] for key in SOCKET_METRICS},
+            },
+        }, timeout=ttl)
+        now = time.time()
+        if self._registered_until - now < ttl / 2:
+            # Read-modify-write; a concurrent registration lost here is redone next round
+            processes = {
+                process_id: expires_at
+                for process_id, expires_at in (cache.get(PROCESSES_KEY) or {}).items()
+                if expires_at > now
+            }
+            processes[self.process_id] = self._registered_until = now + ttl
+            cache.set(PROCESSES_KEY, processes, timeout=None)
+        processes = _live_processes()
+        if processes and processes[0] == self.process_id:
+            self._broadcast(processes)
+
+    def _broadcast(self, processes):
+        counts = _sum_viewers(processes)
+        changed = {
+            auction_id: count
+            for auction_id, count in counts.items()
+            if self._broadcast_counts.get(auction_id) != count
+        }
+        # Auctions everyone left get a final zero
+        changed.update({
+            auction_id: 0
+            for auction_id in self._broadcast_counts
+            if auction_id not in counts and self._broadcast_counts[auction_id]
+        })
+        self._broadcast_counts = counts
+        messages = [
+            (auction_id, {'type': 'viewers', 'data': {'auction_id': auction_id, 'count': count}})
+            for auction_id, count in changed.items()
+        ]
+        tick_interval = getattr(settings, 'AUCTION_CLOCK_TICK_SECONDS', 15)
+        now = time.monotonic()
+        if tick_interval and now - self._last_tick >= tick_interval:
+            self._last_tick = now
+            messages.extend((auction_id, clock_frame()) for auction_id, count in counts.items() if count)
+        channel_layer = get_channel_layer()
+        if channel_layer is None:
+            return
+        for auction_id, message in messages:
+            async_to_sync(channel_layer.group_send)(
+                f'auction_{auction_id}',
+                {'type': 'auction.message', 'auction_id': auction_id, 'message': message},
+            )
+
+    def viewer_count(self, auction_id):
+        """Viewers of ``auction_id`` across processes, counting this one live."""
+        auction_id = str(auction_id)
+        others = [process_id for process_id in _live_processes() if process_id != self.process_id]
+        _, viewers = self.local_summary()
+        return viewers.get(auction_id, 0) + _sum_viewers(others).get(auction_id, 0)
+
+    def clear(self):
+        """Forget local connections and published state."""
+        with self._lock:
+            self._connections.clear()
+            self._broadcast_counts = {}
+            self._registered_until = 0
+            self._last_tick = 0
+        cache.delete_many([
+            PROCESSES_KEY, _users_key(self.process_id), _viewers_key(self.process_id), _sockets_key(self.process_id),
+        ])
+
+    def _ensure_publisher(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run, name='presence-publisher', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            try:
+                self.publish()
+            except Exception:
+                logger.exception('Publishing presence failed')
+            time.sleep(self._interval())
+
+
+def _sum_viewers(processes):
+    counts = Counter()
+    for viewers in cache.get_many([_viewers_key(process_id) for process_id in processes]).values():
+        counts.update(viewers)
+    return dict(counts)
+
+
+def socket_stats():
+    """WebSocket connection and outbox counters of each live process."""
+    processes = _live_processes()
+    stats = cache.get_many([_sockets_key(process_id) for process_id in processes])
+    return {process_id: stats[_sockets_key(process_id)] for process_id in processes if _sockets_key(process_id) in stats}
+
+
+def online_user_ids():
+    """Ids of users with an open WebSocket connection in any live process."""
+    keys = [_users_key(process_id) for process_id in _live_processes()]
+    online = set()
+    for users in cache.get_many(keys).values():
+        online.update(users)
+    return online
+
+
+presence = PresenceTracker()
@@ -4,4 +4,5 @@ from . import consumers
 
 websocket_urlpatterns = [
     re_path(r'ws/auction/(?P<auction_id>\w+)/$', consumers.AuctionConsumer.as_asgi()),
+    re_path(r'ws/auctions/$', consumers.MultiAuctionConsumer.as_asgi()),
 ]
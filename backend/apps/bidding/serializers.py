@@ -1,4 +1,6 @@
 """Bidding app serializers."""
+from django.core.files.storage import default_storage
+from django.utils import timezone
 from rest_framework import serializers
 from .models import Bid, AutoBidRule, BidHistory
 from apps.users.serializers import UserSerializer
@@ -24,21 +26,27 @@ class BidSerializer(serializers.ModelSerializer):
             'is_auto_bid', 'auto_bid_rule', 'created_at'
         ]
         read_only_fields = ['id', 'bidder', 'is_auto_bid', 'created_at']
-    
-    def validate(self, attrs):
-        """Validate that user is not already the highest bidder."""
-        auction = attrs.get('auction')
+
+
+class BidLadderSerializer(serializers.BaseSerializer):
+    """Compact read-only bid built from ``Bid.objects.as_ladder()`` rows."""
+
+    def _avatar(self, path):
+        if not path:
+            return None
+        url = default_storage.url(path)
         request = self.context.get('request')
-        
-        if auction and request and request.user:
-            # Get the last bid for this auction
-            last_bid = auction.bids.order_by('-created_at').first()
-            if last_bid and last_bid.bidder == request.user:
-                raise serializers.ValidationError(
-                    {'detail': 'Jūs jau esat augstākais solītājs'}
-                )
-        
-        return attrs
+        return request.build_absolute_uri(url) if request else url
+
+    def to_representation(self, row):
+        created_at = timezone.localtime(row['created_at']).isoformat()
+        return {
+            'id': row['id'],
+            'amount': str(row['amount']),
+            'bidder': {'username': row['bidder__username'], 'avatar': self._avatar(row['bidder__avatar'])},
+            'is_auto_bid': row['is_auto_bid'],
+            'created_at': created_at[:-6] + 'Z' if created_at.endswith('+00:00') else created_at,
+        }
 
 
 class AutoBidRuleSerializer(serializers.ModelSerializer):
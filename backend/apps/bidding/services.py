@@ -0,0 +1,185 @@
+"""Bid placement service.
+
+All bid writes go through ``place_bid`` so validation, the ``Bid`` and
+``BidHistory`` rows, proxy auto-bids and the auction counters are committed
+together while the auction row is locked.
+"""
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from apps.auctions.closing import notify_end_time_changed
+from apps.auctions.models import Auction
+from apps.auctions.signals import auctions_changed
+from .autobid import candidate_rules, deactivate_exhausted_rules, resolve_proxy_bids
+from .coalescer import bid_coalescer
+from .models import AutoBidRule, Bid, BidHistory
+
+
+class BidRejected(Exception):
+    """Raised when a bid is not accepted; the message is shown to the user."""
+
+
+# Shown when the database failed the bid, e.g. a locked SQLite file; the
+# bid was not placed and can be sent again
+RETRY_MESSAGE = 'Serveris ir aizņemts, mēģiniet vēlreiz'
+
+
+def _apply_anti_snipe(auction):
+    if auction.anti_snipe_seconds and auction.anti_snipe_seconds > 0:
+        now = timezone.now()
+        remaining = (auction.end_time - now).total_seconds()
+        if remaining < auction.anti_snipe_seconds:
+            auction.end_time = now + timezone.timedelta(
+                seconds=auction.anti_snipe_seconds
+            )
+
+
+def minimum_bid(auction):
+    """Return the lowest amount the next bid on ``auction`` may have."""
+    if not auction.bid_count:
+        return auction.starting_price
+    return auction.current_highest_bid + auction.minimum_increment
+
+
+def _validate_bid(auction, bidder, amount, leader_id):
+    if not auction.is_active:
+        raise BidRejected('Izsole nav aktīva')
+    if leader_id == bidder.pk:
+        raise BidRejected('Jūs jau esat augstākais solītājs')
+    minimum = minimum_bid(auction)
+    if amount < minimum:
+        raise BidRejected(f'Minimālais solījums ir {minimum} €')
+
+
+def _record_bid(auction, bidder_id, amount, previous_amount, previous_bidder_id, auto_bid_rule_id=None):
+    bid = Bid.objects.create(
+        auction=auction,
+        bidder_id=bidder_id,
+        amount=amount,
+        is_auto_bid=auto_bid_rule_id is not None,
+        auto_bid_rule_id=auto_bid_rule_id,
+    )
+    BidHistory.objects.create(
+        auction=auction,
+        bidder_id=bidder_id,
+        bid_amount=amount,
+        previous_highest_amount=previous_amount,
+        previous_highest_bidder_id=previous_bidder_id,
+    )
+    return bid
+
+
+def place_bid(auction_id, bidder, amount):
+    """Validate and record a bid, returning the saved ``Bid``.
+
+    The auction row is locked with ``select_for_update`` and the counters are
+    written with a conditional ``F()`` update keyed on ``bid_count``, so a
+    concurrent bid can never be lost even on backends without row locks.
+    Active auto-bid rules are resolved in the same transaction; the bids
+    they produce are returned in ``bid.auto_bids``. ``bid.auction`` carries
+    the updated counters and ``end_time``.
+    """
+    with transaction.atomic():
+        try:
+            auction = Auction.objects.select_for_update().get(pk=auction_id)
+        except Auction.DoesNotExist:
+            raise BidRejected('Izsole nav atrasta')
+
+        leader_id = (
+            Bid.objects.filter(auction=auction)
+            .order_by('-created_at', '-id')
+            .values_list('bidder_id', flat=True)
+            .first()
+        )
+        _validate_bid(auction, bidder, amount, leader_id)
+
+        proxy_bids = resolve_proxy_bids(
+            amount, bidder.pk, auction.minimum_increment,
+            candidate_rules(auction, amount, bidder.pk),
+        )
+        final_amount = proxy_bids[-1].amount if proxy_bids else amount
+
+        previous_amount = auction.current_highest_bid if auction.bid_count else None
+        original_end_time = auction.end_time
+        _apply_anti_snipe(auction)
+        updated = Auction.objects.filter(pk=auction.pk, bid_count=auction.bid_count).update(
+            current_highest_bid=final_amount,
+            bid_count=F('bid_count') + 1 + len(proxy_bids),
+            end_time=auction.end_time,
+            updated_at=timezone.now(),
+        )
+        if not updated:
+            raise BidRejected('Izsole tikko tika atjaunināta, mēģiniet vēlreiz')
+
+        bid = _record_bid(auction, bidder.pk, amount, previous_amount, leader_id)
+        bid.auto_bids = []
+        previous_amount, previous_bidder_id = amount, bidder.pk
+        for proxy in proxy_bids:
+            bid.auto_bids.append(_record_bid(
+                auction, proxy.bidder_id, proxy.amount,
+                previous_amount, previous_bidder_id, proxy.rule_id,
+            ))
+            previous_amount, previous_bidder_id = proxy.amount, proxy.bidder_id
+        deactivate_exhausted_rules(
+            auction, final_amount, proxy_bids[-1].rule_id if proxy_bids else None,
+        )
+        if auction.end_time != original_end_time:
+            end_time = auction.end_time
+            transaction.on_commit(lambda: notify_end_time_changed(auction.pk, end_time))
+
+    auction.current_highest_bid = final_amount
+    auction.bid_count += 1 + len(proxy_bids)
+    return bid
+
+
+def submit_bid(auction_id, bidder, amount):
+    """Place a bid and broadcast it, the same way for HTTP and WebSocket clients.
+
+    Auctions cached in the hot book are bid on in memory; the returned
+    ``Bid`` is then unsaved (``pk`` is ``None``) until the next flush.
+    Everything else goes through ``place_bid``, after which a hot auction
+    without proxy rules is promoted into the book.
+    """
+    from .hotbook import hot_book
+
+    if hot_book.enabled and hot_book.get(auction_id) is not None:
+        try:
+            pending, auction = hot_book.place(auction_id, bidder, amount)
+        except KeyError:
+            # Evicted since the lookup above
+            pass
+        else:
+            bid = Bid(auction=auction, bidder=bidder, amount=amount, created_at=pending.created_at)
+            bid.auto_bids = []
+            broadcast_bid(bid)
+            return bid
+
+    bid = place_bid(auction_id, bidder, amount)
+    for placed in [bid, *bid.auto_bids]:
+        broadcast_bid(placed)
+
+    # Auctions with proxy rules stay on the database path so the rules run
+    if hot_book.enabled and hot_book.is_hot(bid.auction) and not (
+        AutoBidRule.objects.filter(auction=bid.auction, is_active=True).exists()
+    ):
+        hot_book.promote(bid.auction, bid.bidder_id)
+    return bid
+
+
+def broadcast_bid(bid):
+    """Send a ``bid_placed`` event for ``bid`` to its auction group.
+
+    Goes through ``bid_coalescer``, so bids on the same auction within the
+    broadcast window reach clients as one frame with the latest state.
+    """
+    auction = bid.auction
+    auctions_changed.send(sender=Bid, auction_ids=[auction.id])
+    bid_coalescer.publish(auction.id, {
+        "amount": float(bid.amount),
+        "bidder": bid.bidder.username,
+        "bidderAvatar": bid.bidder.avatar.url if bid.bidder.avatar else None,
+        "end_time": auction.end_time.isoformat(),
+        "bid_count": auction.bid_count,
+        "current_highest_bid": float(auction.current_highest_bid),
+        "anti_snipe_seconds": auction.anti_snipe_seconds,
+    })
@@ -0,0 +1,41 @@
+"""Channel layer and cache helpers for tests and benchmarks."""
+
+
+def fake_redis_channel_layers(shards=2, **config):
+    """Return a ``CHANNEL_LAYERS`` setting backed by in-process fake Redis.
+
+    Each shard is its own ``FakeServer``, so channels-redis hashes groups
+    and channels across them exactly as it would across real hosts. All
+    layers built from the returned setting share the same servers, which
+    lets one process stand in for several Daphne workers.
+    """
+    from fakeredis import FakeServer
+    from fakeredis.aioredis import FakeConnection
+
+    hosts = [
+        {'connection_class': FakeConnection, 'server': FakeServer()}
+        for _ in range(shards)
+    ]
+    return {
+        'default': {
+            'BACKEND': 'channels_redis.core.RedisChannelLayer',
+            'CONFIG': {'hosts': hosts, **config},
+        },
+    }
+
+
+def fake_redis_caches(location='redis://fake-cache:6379/0'):
+    """Return a ``CACHES`` setting using django-redis over in-process fake Redis.
+
+    Every cache client built for the same ``location`` talks to the same
+    fake server, like processes sharing one Redis.
+    """
+    from fakeredis import FakeConnection
+
+    return {
+        'default': {
+            'BACKEND': 'django_redis.cache.RedisCache',
+            'LOCATION': location,
+            'OPTIONS': {'CONNECTION_POOL_KWARGS': {'connection_class': FakeConnection}},
+        },
+    }
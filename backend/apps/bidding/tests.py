@@ -0,0 +1,1098 @@
+"""Tests for Bidding app."""
+
+import asyncio
+import json
+import random
+import threading
+import time
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
+
+import msgpack
+from asgiref.sync import async_to_sync
+from channels.db import database_sync_to_async
+from channels.layers import channel_layers
+from channels.routing import URLRouter
+from channels.testing import WebsocketCommunicator
+from django.contrib.auth import get_user_model
+from django.core.cache import cache, caches
+from django.db import DatabaseError, connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from apps.auctions.closing import settle_due_auctions
+from apps.auctions.models import Auction, Category, Watchlist
+from apps.bidding.autobid import ProxyBid, resolve_proxy_bids
+from apps.bidding.coalescer import BroadcastCoalescer, metrics, state_delta
+from apps.bidding.consumers import SLOW_CLIENT_CLOSE_CODE, FrameConsumer
+from apps.bidding.events import current_seq, events_since, record_event, send_event
+from apps.bidding.hotbook import HotAuctionBook, hot_book
+from apps.bidding.loadtest import BidLoadTest, percentile
+from apps.bidding.models import AutoBidRule, Bid, BidHistory
+from apps.bidding.presence import PROCESSES_KEY, PresenceTracker, online_user_ids, presence, socket_stats
+from apps.bidding.routing import websocket_urlpatterns
+from apps.bidding.services import BidRejected, place_bid
+from apps.bidding.testing import fake_redis_caches, fake_redis_channel_layers
+from apps.users.activity import activity_buffer
+from apps.users.serializers import UserSerializer
+
+User = get_user_model()
+
+
+def create_auction(seller, **kwargs):
+    """Create an active auction ending in one hour."""
+    now = timezone.now()
+    category, _ = Category.objects.get_or_create(name="Test category", slug="test-category")
+    defaults = {
+        "title": "Test auction",
+        "description": "Test auction",
+        "category": category,
+        "seller": seller,
+        "starting_price": Decimal("10.00"),
+        "minimum_increment": Decimal("1.00"),
+        "start_time": now,
+        "end_time": now + timedelta(hours=1),
+        "status": "active",
+    }
+    defaults.update(kwargs)
+    return Auction.objects.create(**defaults)
+
+
+class PlaceBidTest(TestCase):
+    """Tests for the bid placement service."""
+
+    def setUp(self):
+        """Set up test data."""
+        self.seller = User.objects.create_user(username="seller", password="testpass123")
+        self.alice = User.objects.create_user(username="alice", password="testpass123")
+        self.bob = User.objects.create_user(username="bob", password="testpass123")
+        self.auction = create_auction(self.seller)
+
+    def test_first_bid_must_reach_starting_price(self):
+        """Test that the first bid is checked against starting_price."""
+        with self.assertRaises(BidRejected):
+            place_bid(self.auction.pk, self.alice, Decimal("9.99"))
+        bid = place_bid(self.auction.pk, self.alice, Decimal("10.00"))
+        self.assertEqual(bid.auction.current_highest_bid, Decimal("10.00"))
+        self.assertEqual(bid.auction.bid_count, 1)
+
+    def test_minimum_increment(self):
+        """Test that later bids must beat the current bid by minimum_increment."""
+        place_bid(self.auction.pk, self.alice, Decimal("10.00"))
+        with self.assertRaises(BidRejected):
+            place_bid(self.auction.pk, self.bob, Decimal("10.50"))
+        place_bid(self.auction.pk, self.bob, Decimal("11.00"))
+        self.auction.refresh_from_db()
+        self.assertEqual(self.auction.current_highest_bid, Decimal("11.00"))
+        self.assertEqual(self.auction.bid_count, 2)
+
+    def test_leader_cannot_outbid_self(self):
+        """Test that the current leader cannot bid again."""
+        place_bid(self.auction.pk, self.alice, Decimal("10.00"))
+        with self.assertRaises(BidRejected):
+            place_bid(self.auction.pk, self.alice, Decimal("20.00"))
+
+    def test_ended_auction_rejected(self):
+        """Test that bids on an ended auction are rejected."""
+        Auction.objects.filter(pk=self.auction.pk).update(end_time=timezone.now() - timedelta(seconds=1))
+        with self.assertRaises(BidRejected):
+            place_bid(self.auction.pk, self.alice, Decimal("10.00"))
+
+    def test_history_records_previous_leader(self):
+        """Test that BidHistory stores the previous highest bid."""
+        place_bid(self.auction.pk, self.alice, Decimal("10.00"))
+        place_bid(self.auction.pk, self.bob, Decimal("12.00"))
+        history = BidHistory.objects.filter(bidder=self.bob).get()
+        self.assertEqual(history.previous_highest_amount, Decimal("10.00"))
+        self.assertEqual(history.previous_highest_bidder, self.alice)
+
+    def test_create_endpoint_database_error_is_retryable(self):
+        """Test that a failing database write answers 503 with Retry-After instead of a 500."""
+        client = APIClient()
+        client.force_authenticate(self.alice)
+        with mock.patch("apps.bidding.views.submit_bid", side_effect=DatabaseError("database is locked")):
+            response = client.post("/api/bidding/bids/", {"auction_id": self.auction.pk, "amount": "15.00"})
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response["Retry-After"], "1")
+        self.assertTrue(response.data["retry"])
+        self.assertFalse(Bid.objects.exists())
+
+    def test_anti_snipe_extends_end_time(self):
+        """Test that a late bid pushes end_time out by anti_snipe_seconds."""
+        Auction.objects.filter(pk=self.auction.pk).update(end_time=timezone.now() + timedelta(seconds=5))
+        bid = place_bid(self.auction.pk, self.alice, Decimal("10.00"))
+        self.auction.refresh_from_db()
+        self.assertGreater(self.auction.end_time, timezone.now() + timedelta(seconds=25))
+        self.assertEqual(bid.auction.end_time, self.auction.end_time)
+
+    def test_create_endpoint(self):
+        """Test the bid create endpoint response and error shape."""
+        client = APIClient()
+        client.force_authenticate(self.alice)
+        response = client.post("/api/bidding/bids/", {"auction_id": self.auction.pk, "amount": "15.00"})
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data["auction"]["bid_count"], 1)
+        self.assertEqual(response.data["bid"]["bidder"]["username"], "alice")
+
+        response = client.post("/api/bidding/bids/", {"auction_id": self.auction.pk, "amount": "30.00"})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data["detail"], "Jūs jau esat augstākais solītājs")
+
+
+class BidLadderTest(TestCase):
+    """Tests for the compact bid ladder endpoint."""
+
+    def setUp(self):
+        """Set up test data."""
+        self.seller = User.objects.create_user(username="seller", password="testpass123")
+        self.alice = User.objects.create_user(username="alice", password="testpass123")
+        self.bob = User.objects.create_user(username="bob", password="testpass123")
+        self.auction = create_auction(self.seller)
+        self.bids = [
+            place_bid(self.auction.pk, bidder, Decimal(amount))
+            for bidder, amount in [(self.alice, "10.00"), (self.bob, "11.00"), (self.alice, "12.00")]
+        ]
+        self.client = APIClient()
+
+    def test_ladder_is_compact_and_newest_first(self):
+        """Test that the ladder lists bids newest first with only the compact fields."""
+        with self.assertNumQueries(2):
+            response = self.client.get("/api/bidding/bids/ladder/", {"auction_id": self.auction.pk})
+        self.assertEqual(response.status_code, 200)
+        results = response.data["results"]
+        self.assertEqual([row["amount"] for row in results], ["12.00", "11.00", "10.00"])
+        self.assertEqual(
+            set(results[0]), {"id", "amount", "bidder", "is_auto_bid", "created_at"}
+        )
+        self.assertEqual(results[0]["bidder"], {"username": "alice", "avatar": None})
+        self.assertFalse(results[0]["is_auto_bid"])
+
+    def test_since_returns_only_the_gap(self):
+        """Test that since=<bid id> returns only later bids."""
+        response = self.client.get(
+            "/api/bidding/bids/ladder/",
+            {"auction_id": self.auction.pk, "since": self.bids[0].pk, "pagination": "cursor"},
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([row["id"] for row in response.data["results"]], [self.bids[2].pk, self.bids[1].pk])
+
+    @override_settings(BIDDING_HOT_BOOK_ENABLED=True)
+    def test_since_includes_unflushed_hot_book_bids(self):
+        """Test that bids still held by the hot book are flushed before the gap is read."""
+        hot_book.background = False
+        self.addCleanup(hot_book.clear)
+        self.addCleanup(setattr, hot_book, "background", True)
+        self.auction.end_time = timezone.now() + timedelta(minutes=2)
+        self.auction.save(update_fields=["end_time"])
+        hot_book.promote(self.auction, self.alice.pk)
+        hot_book.place(self.auction.pk, self.bob, Decimal("13.00"))
+
+        response = self.client.get(
+            "/api/bidding/bids/ladder/",
+            {"auction_id": self.auction.pk, "since": self.bids[2].pk, "pagination": "cursor"},
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([row["amount"] for row in response.data["results"]], ["13.00"])
+        self.assertEqual(hot_book.get(self.auction.pk).unflushed, 0)
+
+    def test_invalid_parameters(self):
+        """Test that a missing auction_id or malformed since is rejected."""
+        response = self.client.get("/api/bidding/bids/ladder/")
+        self.assertEqual(response.status_code, 400)
+        response = self.client.get("/api/bidding/bids/ladder/", {"auction_id": self.auction.pk, "since": "x"})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("error", response.data)
+
+
+class ResolveProxyBidsTest(TestCase):
+    """Tests for the single-pass proxy bid resolver."""
+
+    def test_no_rules(self):
+        """Test that nothing is written without competing rules."""
+        self.assertEqual(resolve_proxy_bids(Decimal("10"), 1, Decimal("1"), []), [])
+
+    def test_single_rule_outbids_leader(self):
+        """Test that a lone rule bids one increment over the manual leader."""
+        bids = resolve_proxy_bids(Decimal("10"), 1, Decimal("1"), [(7, 2, Decimal("50"))])
+        self.assertEqual(bids, [ProxyBid(2, Decimal("11"), 7)])
+
+    def test_second_price_between_rules(self):
+        """Test that the strongest rule wins one increment above the runner-up."""
+        rules = [(7, 2, Decimal("30")), (8, 3, Decimal("50")), (9, 4, Decimal("12"))]
+        bids = resolve_proxy_bids(Decimal("10"), 1, Decimal("1"), rules)
+        self.assertEqual(bids, [ProxyBid(2, Decimal("30"), 7), ProxyBid(3, Decimal("31"), 8)])
+
+    def test_winner_capped_at_max_bid(self):
+        """Test that the winning bid never exceeds the winner's max_bid."""
+        rules = [(7, 2, Decimal("30")), (8, 3, Decimal("30.50"))]
+        bids = resolve_proxy_bids(Decimal("10"), 1, Decimal("1"), rules)
+        self.assertEqual(bids[-1], ProxyBid(3, Decimal("30.50"), 8))
+
+    def test_tie_goes_to_earlier_rule(self):
+        """Test that equal max bids are won by the rule seen first."""
+        rules = [(7, 2, Decimal("30")), (8, 3, Decimal("30"))]
+        bids = resolve_proxy_bids(Decimal("10"), 1, Decimal("1"), rules)
+        self.assertEqual(bids, [ProxyBid(3, Decimal("30"), 8), ProxyBid(2, Decimal("30"), 7)])
+
+    def test_leader_rule_defends(self):
+        """Test that the leader's own rule answers a weaker challenger."""
+        rules = [(7, 1, Decimal("100")), (8, 2, Decimal("40"))]
+        bids = resolve_proxy_bids(Decimal("10"), 1, Decimal("1"), rules)
+        self.assertEqual(bids, [ProxyBid(2, Decimal("40"), 8), ProxyBid(1, Decimal("41"), 7)])
+
+    def test_leader_rule_sets_second_price(self):
+        """Test that a beaten leader rule still raises the winning price."""
+        rules = [(7, 1, Decimal("25")), (8, 2, Decimal("40"))]
+        bids = resolve_proxy_bids(Decimal("10"), 1, Decimal("1"), rules)
+        self.assertEqual(bids, [ProxyBid(1, Decimal("25"), 7), ProxyBid(2, Decimal("26"), 8)])
+
+    def test_rules_below_threshold_ignored(self):
+        """Test that rules unable to beat the price by an increment are ignored."""
+        rules = [(7, 2, Decimal("10.50"))]
+        self.assertEqual(resolve_proxy_bids(Decimal("10"), 1, Decimal("1"), rules), [])
+
+
+class AutoBidPlacementTest(TestCase):
+    """Tests for auto-bids written by place_bid."""
+
+    def setUp(self):
+        """Set up test data."""
+        self.seller = User.objects.create_user(username="seller", password="testpass123")
+        self.alice = User.objects.create_user(username="alice", password="testpass123")
+        self.bob = User.objects.create_user(username="bob", password="testpass123")
+        self.carol = User.objects.create_user(username="carol", password="testpass123")
+        self.auction = create_auction(self.seller)
+
+    def test_rules_resolved_in_one_pass(self):
+        """Test that competing rules settle with only the resulting bids."""
+        AutoBidRule.objects.create(auction=self.auction, bidder=self.bob, max_bid=Decimal("40.00"))
+        carol_rule = AutoBidRule.objects.create(auction=self.auction, bidder=self.carol, max_bid=Decimal("60.00"))
+
+        bid = place_bid(self.auction.pk, self.alice, Decimal("10.00"))
+
+        self.assertEqual([(b.bidder_id, b.amount) for b in bid.auto_bids], [
+            (self.bob.pk, Decimal("40.00")),
+            (self.carol.pk, Decimal("41.00")),
+        ])
+        self.assertTrue(all(b.is_auto_bid for b in bid.auto_bids))
+        self.assertEqual(bid.auto_bids[-1].auto_bid_rule, carol_rule)
+        self.auction.refresh_from_db()
+        self.assertEqual(self.auction.current_highest_bid, Decimal("41.00"))
+        self.assertEqual(self.auction.bid_count, 3)
+        self.assertEqual(BidHistory.objects.filter(auction=self.auction).count(), 3)
+        self.assertFalse(AutoBidRule.objects.get(bidder=self.bob).is_active)
+        self.assertTrue(AutoBidRule.objects.get(bidder=self.carol).is_active)
+
+    def test_manual_bid_over_rule(self):
+        """Test that a manual bid above every rule max stands."""
+        AutoBidRule.objects.create(auction=self.auction, bidder=self.bob, max_bid=Decimal("20.00"))
+        place_bid(self.auction.pk, self.alice, Decimal("10.00"))
+        bid = place_bid(self.auction.pk, self.carol, Decimal("30.00"))
+        self.assertEqual(bid.auto_bids, [])
+        self.auction.refresh_from_db()
+        self.assertEqual(self.auction.current_highest_bid, Decimal("30.00"))
+        self.assertEqual(self.auction.bid_count, 3)
+
+
+class HotAuctionBookTest(TestCase):
+    """Tests for the in-memory hot auction book."""
+
+    def setUp(self):
+        """Set up test data."""
+        cache.clear()
+        self.seller = User.objects.create_user(username="seller", password="testpass123")
+        self.alice = User.objects.create_user(username="alice", password="testpass123")
+        self.bob = User.objects.create_user(username="bob", password="testpass123")
+        self.auction = create_auction(self.seller, end_time=timezone.now() + timedelta(minutes=2))
+        self.book = HotAuctionBook(window_seconds=300, background=False)
+        bid = place_bid(self.auction.pk, self.alice, Decimal("10.00"))
+        self.assertTrue(self.book.is_hot(bid.auction))
+        self.book.promote(bid.auction, self.alice.pk)
+
+    def test_validates_without_queries(self):
+        """Test that bids are validated against cached state."""
+        with self.assertNumQueries(0):
+            self.book.place(self.auction.pk, self.bob, Decimal("11.00"))
+            with self.assertRaises(BidRejected):
+                self.book.place(self.auction.pk, self.alice, Decimal("11.50"))
+            with self.assertRaises(BidRejected):
+                self.book.place(self.auction.pk, self.bob, Decimal("20.00"))
+
+    def test_flush_reconciles_auction(self):
+        """Test that pending bids are written and counters reconciled on flush."""
+        for index in range(10):
+            bidder = self.bob if index % 2 == 0 else self.alice
+            self.book.place(self.auction.pk, bidder, Decimal(11 + index))
+        self.assertEqual(Bid.objects.filter(auction=self.auction).count(), 1)
+
+        self.assertEqual(self.book.flush(), 10)
+        self.auction.refresh_from_db()
+        self.assertEqual(self.auction.bid_count, 11)
+        self.assertEqual(self.auction.current_highest_bid, Decimal("20.00"))
+        self.assertEqual(Bid.objects.filter(auction=self.auction).count(), 11)
+        self.assertEqual(BidHistory.objects.filter(auction=self.auction).count(), 11)
+        latest = Bid.objects.filter(auction=self.auction).order_by("-created_at", "-id").first()
+        self.assertEqual(latest.bidder, self.alice)
+        self.assertEqual(latest.amount, Decimal("20.00"))
+
+    def test_flush_query_count_is_constant(self):
+        """Test that a flush costs the same number of queries for any batch size."""
+        for index in range(50):
+            bidder = self.bob if index % 2 == 0 else self.alice
+            self.book.place(self.auction.pk, bidder, Decimal(11 + index))
+        with self.assertNumQueries(6):
+            self.book.flush()
+
+    def test_flush_leaves_closed_auctions_alone(self):
+        """Test that a flush does not overwrite the counters of a closed auction."""
+        self.book.place(self.auction.pk, self.bob, Decimal("11.00"))
+        Auction.objects.filter(pk=self.auction.pk).update(status="ended")
+        self.book.flush()
+        self.auction.refresh_from_db()
+        self.assertEqual(self.auction.bid_count, 1)
+        self.assertEqual(self.auction.current_highest_bid, Decimal("10.00"))
+
+    def test_closing_auction_rejects_bids(self):
+        """Test that bids are rejected once an auction starts closing, even if its flush fails."""
+        self.book.place(self.auction.pk, self.bob, Decimal("11.00"))
+        with mock.patch.object(Bid.objects, "bulk_create", side_effect=DatabaseError):
+            self.book.release(self.auction.pk)
+        self.assertIsNotNone(self.book.get(self.auction.pk))
+        with self.assertRaisesMessage(BidRejected, "Izsole nav aktīva"):
+            self.book.place(self.auction.pk, self.alice, Decimal("12.00"))
+
+    def _fail_writes_for(self, auction):
+        original = Bid.objects.bulk_create
+
+        def bulk_create(objs, *args, **kwargs):
+            if any(obj.auction_id == auction.pk for obj in objs):
+                raise DatabaseError("poison row")
+            return original(objs, *args, **kwargs)
+
+        return mock.patch.object(Bid.objects, "bulk_create", side_effect=bulk_create)
+
+    def test_failing_auction_does_not_hold_back_others(self):
+        """Test that a write failure only requeues the bids of its own auction."""
+        other = create_auction(self.seller, end_time=timezone.now() + timedelta(minutes=2))
+        bid = place_bid(other.pk, self.alice, Decimal("10.00"))
+        self.book.promote(bid.auction, self.alice.pk)
+        self.book.place(self.auction.pk, self.bob, Decimal("11.00"))
+        self.book.place(other.pk, self.bob, Decimal("11.00"))
+
+        with self._fail_writes_for(self.auction):
+            self.assertEqual(self.book.flush(), 1)
+        self.assertEqual(Bid.objects.filter(auction=other).count(), 2)
+        with self.assertRaisesMessage(BidRejected, "mēģiniet vēlreiz"):
+            self.book.place(self.auction.pk, self.alice, Decimal("12.00"))
+        self.book.place(other.pk, self.alice, Decimal("12.00"))
+
+        # The retry succeeds and the auction goes back to the database path
+        self.assertEqual(self.book.flush(), 2)
+        self.assertIsNone(self.book.get(self.auction.pk))
+        self.auction.refresh_from_db()
+        self.assertEqual((self.auction.bid_count, self.auction.current_highest_bid), (2, Decimal("11.00")))
+
+    @override_settings(BIDDING_HOT_BOOK_MAX_FLUSH_ATTEMPTS=2)
+    def test_bids_are_dead_lettered_after_repeated_failures(self):
+        """Test that bids failing every write are set aside and the auction released."""
+        self.book.place(self.auction.pk, self.bob, Decimal("11.00"))
+        with self._fail_writes_for(self.auction):
+            self.assertEqual(self.book.flush(), 0)
+            self.assertEqual(self.book.flush(), 0)
+        self.assertEqual([item.amount for item in self.book.dead_letters], [Decimal("11.00")])
+        self.assertIsNone(self.book.get(self.auction.pk))
+        self.assertEqual(self.book.flush(), 0)
+        self.assertEqual(Bid.objects.filter(auction=self.auction).count(), 1)
+
+    @override_settings(BIDDING_HOT_BOOK_ENABLED=True)
+    def test_closer_skips_auctions_held_elsewhere(self):
+        """Test that the closer waits until another process's book releases an auction."""
+        self.book.place(self.auction.pk, self.bob, Decimal("11.00"))
+        after_end = timezone.now() + timedelta(minutes=3)
+        self.assertEqual(settle_due_auctions(after_end), [])
+
+        self.book.release(self.auction.pk)
+        closed = settle_due_auctions(after_end)
+        self.assertEqual([auction.pk for auction in closed], [self.auction.pk])
+        self.assertEqual(closed[0].winner_id, self.bob.pk)
+        self.assertEqual(closed[0].final_price, Decimal("11.00"))
+
+    @override_settings(BIDDING_HOT_BOOK_ENABLED=True)
+    def test_closer_releases_auctions_held_here(self):
+        """Test that the closer flushes this process's book before settling."""
+        hot_book.background = False
+        self.addCleanup(hot_book.clear)
+        self.addCleanup(setattr, hot_book, "background", True)
+        hot_book.promote(self.auction, self.alice.pk)
+        hot_book.place(self.auction.pk, self.bob, Decimal("11.00"))
+        closed = settle_due_auctions(timezone.now() + timedelta(minutes=3))
+        self.assertEqual([auction.winner_id for auction in closed], [self.bob.pk])
+        self.assertIsNone(hot_book.get(self.auction.pk))
+
+    @override_settings(BIDDING_HOT_BOOK_ENABLED=True)
+    def test_create_endpoint_uses_book(self):
+        """Test that the create endpoint promotes hot auctions and then serves them from memory."""
+        hot_book.background = False
+        self.addCleanup(hot_book.clear)
+        self.addCleanup(setattr, hot_book, "background", True)
+        client = APIClient()
+        client.force_authenticate(self.bob)
+        response = client.post("/api/bidding/bids/", {"auction_id": self.auction.pk, "amount": "11.00"})
+        self.assertEqual(response.status_code, 201)
+        self.assertIsNotNone(hot_book.get(self.auction.pk))
+
+        client.force_authenticate(self.alice)
+        response = client.post("/api/bidding/bids/", {"auction_id": self.auction.pk, "amount": "12.00"})
+        self.assertEqual(response.status_code, 201)
+        self.assertTrue(response.data["bid"]["pending"])
+        self.assertEqual(response.data["auction"]["bid_count"], 3)
+        hot_book.flush()
+        self.assertEqual(Bid.objects.filter(auction=self.auction).count(), 3)
+
+
+@override_settings(AUCTION_CLOCK_TICK_SECONDS=0)
+class PresenceTest(TestCase):
+    """Tests for WebSocket presence across processes."""
+
+    def setUp(self):
+        """Set up two trackers standing in for two server processes."""
+        cache.clear()
+        self.addCleanup(cache.clear)
+        activity_buffer.clear()
+        self.first = PresenceTracker(background=False)
+        self.second = PresenceTracker(background=False)
+        self.first.process_id, self.second.process_id = "a", "b"
+        self.first.connect("a.1", 7, user_id=1001)
+        self.first.connect("a.2", 7)
+        self.second.connect("b.1", 7, user_id=1002)
+        self.second.connect("b.2", 8, user_id=1001)
+
+    def test_summaries_are_combined(self):
+        """Test that viewer counts and online users span processes."""
+        self.first.publish()
+        self.second.publish()
+        self.assertEqual(online_user_ids(), {1001, 1002})
+        self.assertEqual(self.first.viewer_count(7), 3)
+        self.assertEqual(self.second.viewer_count(8), 1)
+
+        self.second.disconnect("b.1")
+        self.assertEqual(self.second.viewer_count(7), 2)
+
+    def test_socket_stats_per_process(self):
+        """Test that each process publishes its connection and outbox counters."""
+        self.first.publish()
+        self.second.publish()
+        stats = socket_stats()
+        self.assertEqual(set(stats), {"a", "b"})
+        self.assertEqual(stats["a"]["connections"], 2)
+        self.assertIn("outbox_depth", stats["b"])
+
+    def test_expired_process_drops_out(self):
+        """Test that a process that stops publishing is ignored once its entry expires."""
+        self.first.publish()
+        self.second.publish()
+        processes = cache.get(PROCESSES_KEY)
+        processes["b"] = 0
+        cache.set(PROCESSES_KEY, processes)
+        self.assertEqual(online_user_ids(), {1001})
+        self.assertEqual(self.first.viewer_count(7), 2)
+
+    def test_leader_broadcasts_changed_counts(self):
+        """Test that only the leader broadcasts, and only counts that changed."""
+        layer = channel_layers["default"]
+        channel = async_to_sync(layer.new_channel)()
+        async_to_sync(layer.group_add)("auction_7", channel)
+        self.addCleanup(async_to_sync(layer.flush))
+        self.first.publish()
+        self.second.publish()
+
+        message = async_to_sync(layer.receive)(channel)
+        self.assertEqual(message["message"], {"type": "viewers", "data": {"auction_id": "7", "count": 2}})
+        self.first.publish()
+        message = async_to_sync(layer.receive)(channel)
+        self.assertEqual(message["message"], {"type": "viewers", "data": {"auction_id": "7", "count": 3}})
+        self.first.publish()
+        self.second.publish()
+        self.assertNotIn(channel, layer.channels)
+
+        self.first.disconnect("a.2")
+        self.first.publish()
+        message = async_to_sync(layer.receive)(channel)
+        self.assertEqual(message["message"]["data"]["count"], 2)
+
+    def test_leader_sends_clock_ticks(self):
+        """Test that the leader sends clock frames to watched auctions once per tick."""
+        layer = channel_layers["default"]
+        channel = async_to_sync(layer.new_channel)()
+        async_to_sync(layer.group_add)("auction_8", channel)
+        self.addCleanup(async_to_sync(layer.flush))
+        self.first.publish()
+        self.second.publish()
+        self.first.publish()
+        self.assertEqual(async_to_sync(layer.receive)(channel)["message"]["type"], "viewers")
+        with self.settings(AUCTION_CLOCK_TICK_SECONDS=60):
+            self.first.publish()
+            self.first.publish()
+        message = async_to_sync(layer.receive)(channel)["message"]
+        self.assertEqual(message["type"], "clock")
+        self.assertAlmostEqual(message["data"]["server_now"], time.time() * 1000, delta=5000)
+        self.assertNotIn(channel, layer.channels)
+
+    def test_serializer_looks_up_once_per_page(self):
+        """Test that serialising many users does one presence lookup."""
+        users = [User.objects.create(username=f"user{i}", last_activity=None) for i in range(3)]
+        self.first.connect("a.3", 7, user_id=users[1].pk)
+        self.first.publish()
+        with mock.patch("apps.bidding.presence.online_user_ids", wraps=online_user_ids) as lookup:
+            data = UserSerializer(users, many=True).data
+        self.assertEqual(lookup.call_count, 1)
+        self.assertEqual([user["is_online"] for user in data], [False, True, False])
+
+
+@override_settings(CHANNEL_LAYERS=fake_redis_channel_layers(shards=2))
+class RedisChannelLayerTest(TestCase):
+    """Tests for bid fan-out through a sharded Redis channel layer."""
+
+    def setUp(self):
+        """Set up test data."""
+        self.seller = User.objects.create_user(username="seller", password="testpass123")
+        self.bidder = User.objects.create_user(username="bidder", password="testpass123")
+        self.auction = create_auction(self.seller)
+
+    def test_bid_reaches_other_worker(self):
+        """Test that a bid broadcast by one layer instance reaches a consumer on another."""
+        # A separate instance stands in for a second Daphne worker
+        worker = channel_layers.make_backend("default")
+        channel = async_to_sync(worker.new_channel)()
+        async_to_sync(worker.group_add)(f"auction_{self.auction.pk}", channel)
+
+        client = APIClient()
+        client.force_authenticate(self.bidder)
+        response = client.post("/api/bidding/bids/", {"auction_id": self.auction.pk, "amount": "10.00"})
+        self.assertEqual(response.status_code, 201)
+
+        message = async_to_sync(worker.receive)(channel)
+        self.assertEqual(message["message"]["type"], "bid_placed")
+        self.assertEqual(message["message"]["data"]["bidder"], "bidder")
+        self.assertEqual(message["message"]["data"]["bid_count"], 1)
+
+    def test_groups_are_sharded(self):
+        """Test that auction groups are spread over every configured host."""
+        layer = channel_layers.make_backend("default")
+        shards = {layer.consistent_hash(f"auction_{index}") for index in range(50)}
+        self.assertEqual(shards, {0, 1})
+
+
+class AuctionConsumerTest(TransactionTestCase):
+    """Tests for bidding over the auction WebSocket."""
+
+    def setUp(self):
+        """Set up test data."""
+        self.seller = User.objects.create(username="seller")
+        self.bidder = User.objects.create(username="bidder")
+        self.auction = create_auction(self.seller)
+        presence.background = False
+        self.addCleanup(presence.clear)
+        self.addCleanup(setattr, presence, "background", True)
+
+    async def _connect(self, user=None):
+        communicator = WebsocketCommunicator(
+            URLRouter(websocket_urlpatterns), f"/ws/auction/{self.auction.pk}/"
+        )
+        if user is not None:
+            communicator.scope["user"] = user
+        connected, _ = await communicator.connect()
+        self.assertTrue(connected)
+        return communicator
+
+    async def test_place_bid_is_acked_and_broadcast(self):
+        """Test that a valid place_bid frame is saved, acked and broadcast to the room."""
+        sender = await self._connect(self.bidder)
+        watcher = await self._connect()
+        await sender.send_json_to({"type": "place_bid", "amount": "10.00", "request_id": "r1"})
+
+        frames = {}
+        for _ in range(2):
+            frame = await sender.receive_json_from()
+            frames[frame["type"]] = frame["data"]
+        self.assertEqual(frames["bid_accepted"]["request_id"], "r1")
+        self.assertEqual(frames["bid_accepted"]["bid_count"], 1)
+        self.assertEqual(frames["bid_placed"]["bidder"], "bidder")
+
+        broadcast = await watcher.receive_json_from()
+        self.assertEqual(broadcast["type"], "bid_placed")
+        self.assertEqual(await database_sync_to_async(Bid.objects.count)(), 1)
+        await sender.disconnect()
+        await watcher.disconnect()
+
+    async def test_invalid_bid_is_rejected(self):
+        """Test that a bid below the minimum is nacked to the sender only."""
+        sender = await self._connect(self.bidder)
+        watcher = await self._connect()
+        await sender.send_json_to({"type": "place_bid", "amount": "5.00", "request_id": "r2"})
+
+        frame = await sender.receive_json_from()
+        self.assertEqual(frame["type"], "bid_rejected")
+        self.assertEqual(frame["data"]["request_id"], "r2")
+        self.assertIn("Minimālais solījums", frame["data"]["detail"])
+        self.assertTrue(await watcher.receive_nothing())
+        self.assertEqual(await database_sync_to_async(Bid.objects.count)(), 0)
+        await sender.disconnect()
+        await watcher.disconnect()
+
+    async def test_anonymous_bid_is_rejected(self):
+        """Test that unauthenticated clients cannot bid."""
+        communicator = await self._connect()
+        await communicator.send_json_to({"type": "place_bid", "amount": "10.00"})
+        frame = await communicator.receive_json_from()
+        self.assertEqual(frame["type"], "bid_rejected")
+        self.assertEqual(await database_sync_to_async(Bid.objects.count)(), 0)
+        await communicator.disconnect()
+
+    async def test_client_frames_are_not_rebroadcast(self):
+        """Test that arbitrary client messages never reach other clients."""
+        sender = await self._connect(self.bidder)
+        watcher = await self._connect()
+        await sender.send_json_to({"type": "bid_placed", "data": {"amount": 1000000}})
+        frame = await sender.receive_json_from()
+        self.assertEqual(frame["type"], "error")
+        self.assertTrue(await watcher.receive_nothing())
+
+        await sender.send_json_to({"type": "ping", "request_id": 7})
+        pong = await sender.receive_json_from()
+        self.assertEqual(pong["type"], "pong")
+        self.assertEqual(pong["data"]["request_id"], 7)
+        self.assertIn("server_now", pong["data"])
+        await sender.disconnect()
+        await watcher.disconnect()
+
+    async def test_msgpack_deltas(self):
+        """Test that clients negotiating msgpack and deltas get binary delta frames."""
+        communicator = WebsocketCommunicator(
+            URLRouter(websocket_urlpatterns),
+            f"/ws/auction/{self.auction.pk}/?delta=1",
+            subprotocols=["msgpack"],
+        )
+        connected, subprotocol = await communicator.connect()
+        self.assertTrue(connected)
+        self.assertEqual(subprotocol, "msgpack")
+
+        layer = channel_layers["default"]
+        for count in (1, 2):
+            await layer.group_send(f"auction_{self.auction.pk}", {
+                "type": "auction.message",
+                "message": {"type": "bid_placed", "data": {"bid_count": count, "end_time": "t"}},
+            })
+        first = msgpack.unpackb(await communicator.receive_from())
+        second = msgpack.unpackb(await communicator.receive_from())
+        self.assertEqual(first, {"type": "bid_placed", "data": {"bid_count": 1, "end_time": "t"}})
+        self.assertEqual(second, {"type": "bid_delta", "data": {"bid_count": 2}})
+
+        await communicator.send_to(bytes_data=msgpack.packb({"type": "ping"}))
+        self.assertEqual(msgpack.unpackb(await communicator.receive_from())["type"], "pong")
+        await communicator.disconnect()
+
+    async def test_resume_replays_missed_events(self):
+        """Test that a resume frame replays only the events after last_seq."""
+        await database_sync_to_async(cache.clear)()
+        for count in (1, 2, 3):
+            await database_sync_to_async(send_event)(
+                self.auction.pk, {"type": "bid_placed", "data": {"bid_count": count}}
+            )
+        communicator = await self._connect()
+        await communicator.send_json_to({"type": "resume", "last_seq": 1})
+        replayed = [await communicator.receive_json_from() for _ in range(3)]
+        self.assertEqual([frame.get("seq") for frame in replayed[:2]], [2, 3])
+        self.assertEqual(replayed[2], {"type": "resume", "data": {"seq": 3, "replayed": 2, "snapshot": False}})
+
+        # Live events continue the sequence and stale ones are not sent twice
+        layer = channel_layers["default"]
+        await layer.group_send(f"auction_{self.auction.pk}", {
+            "type": "auction.message", "message": {"type": "bid_placed", "seq": 3, "data": {}},
+        })
+        await database_sync_to_async(send_event)(self.auction.pk, {"type": "auction_ended", "data": {}})
+        frame = await communicator.receive_json_from()
+        self.assertEqual((frame["type"], frame["seq"]), ("auction_ended", 4))
+        await communicator.disconnect()
+
+    async def test_resume_after_buffer_asks_for_snapshot(self):
+        """Test that a client too far behind is told to reload the auction."""
+        await database_sync_to_async(cache.clear)()
+        with override_settings(BIDDING_EVENT_BUFFER_SIZE=2):
+            for count in (1, 2, 3):
+                await database_sync_to_async(send_event)(
+                    self.auction.pk, {"type": "bid_placed", "data": {"bid_count": count}}
+                )
+            communicator = await self._connect()
+            await communicator.send_json_to({"type": "resume", "last_seq": 0})
+            frame = await communicator.receive_json_from()
+        self.assertEqual(frame, {"type": "resume", "data": {"seq": 3, "replayed": 0, "snapshot": True}})
+        await communicator.send_json_to({"type": "resume", "last_seq": "x"})
+        self.assertEqual((await communicator.receive_json_from())["type"], "error")
+        await communicator.disconnect()
+
+    async def test_live_gap_is_filled_from_buffer(self):
+        """Test that events missed between live frames are replayed from the buffer."""
+        await database_sync_to_async(cache.clear)()
+        communicator = await self._connect()
+        await database_sync_to_async(send_event)(self.auction.pk, {"type": "auction_ended", "data": {}})
+        self.assertEqual((await communicator.receive_json_from())["seq"], 1)
+        # Recorded, but its group_send has not arrived yet
+        await database_sync_to_async(record_event)(self.auction.pk, {"type": "auction_ended", "data": {}})
+        await database_sync_to_async(send_event)(self.auction.pk, {"type": "auction_ended", "data": {}})
+        frames = [await communicator.receive_json_from() for _ in range(2)]
+        self.assertEqual([frame["seq"] for frame in frames], [2, 3])
+
+        # The late frame was already replayed
+        layer = channel_layers["default"]
+        await layer.group_send(f"auction_{self.auction.pk}", {
+            "type": "auction.message", "message": {"type": "auction_ended", "seq": 2, "data": {}},
+        })
+        await database_sync_to_async(send_event)(self.auction.pk, {"type": "auction_ended", "data": {}})
+        self.assertEqual((await communicator.receive_json_from())["seq"], 4)
+        await communicator.disconnect()
+
+    async def test_backwards_sequence_asks_for_snapshot(self):
+        """Test that a reset counter makes the client reload instead of losing events."""
+        await database_sync_to_async(cache.clear)()
+        communicator = await self._connect()
+        for seq in (1, 2):
+            await database_sync_to_async(send_event)(self.auction.pk, {"type": "auction_ended", "data": {}})
+            self.assertEqual((await communicator.receive_json_from())["seq"], seq)
+        await database_sync_to_async(cache.clear)()
+        await database_sync_to_async(send_event)(self.auction.pk, {"type": "auction_ended", "data": {}})
+        frame = await communicator.receive_json_from()
+        self.assertEqual(frame, {"type": "resume", "data": {"seq": 1, "replayed": 0, "snapshot": True}})
+        await database_sync_to_async(send_event)(self.auction.pk, {"type": "auction_ended", "data": {}})
+        self.assertEqual((await communicator.receive_json_from())["seq"], 2)
+        await communicator.disconnect()
+
+    async def test_connections_are_counted(self):
+        """Test that connections feed presence and leave it on disconnect."""
+        bidder = await self._connect(self.bidder)
+        anonymous = await self._connect()
+        auction_id = str(self.auction.pk)
+        self.assertEqual(presence.local_summary(), ([self.bidder.pk], {auction_id: 2}))
+        await anonymous.disconnect()
+        self.assertEqual(presence.local_summary(), ([self.bidder.pk], {auction_id: 1}))
+        await bidder.disconnect()
+        self.assertEqual(presence.local_summary(), ([], {}))
+
+
+class MultiAuctionConsumerTest(TransactionTestCase):
+    """Tests for the multiplexed auctions WebSocket."""
+
+    def setUp(self):
+        """Set up test data."""
+        cache.clear()
+        self.seller = User.objects.create(username="seller")
+        self.watcher = User.objects.create(username="watcher")
+        self.auctions = [create_auction(self.seller, title=f"Auction {index}") for index in range(3)]
+        presence.background = False
+        self.addCleanup(presence.clear)
+        self.addCleanup(setattr, presence, "background", True)
+
+    async def _connect(self, user=None):
+        communicator = WebsocketCommunicator(URLRouter(websocket_urlpatterns), "/ws/auctions/")
+        if user is not None:
+            communicator.scope["user"] = user
+        connected, _ = await communicator.connect()
+        self.assertTrue(connected)
+        return communicator
+
+    async def test_subscribe_and_unsubscribe(self):
+        """Test that one socket receives events of every subscribed auction only."""
+        first, second, third = [auction.pk for auction in self.auctions]
+        communicator = await self._connect()
+        await communicator.send_json_to({"type": "subscribe", "auction_ids": [first, str(second)], "request_id": 1})
+        frame = await communicator.receive_json_from()
+        self.assertEqual(frame["type"], "subscribed")
+        self.assertEqual(frame["data"]["auction_ids"], [first, second])
+        self.assertEqual(presence.local_summary()[1], {str(first): 1, str(second): 1})
+
+        for auction_id in (first, second, third):
+            await database_sync_to_async(send_event)(auction_id, {"type": "bid_placed", "data": {}})
+        received = [await communicator.receive_json_from() for _ in range(2)]
+        self.assertEqual([frame["auction_id"] for frame in received], [first, second])
+        self.assertTrue(await communicator.receive_nothing())
+
+        await communicator.send_json_to({"type": "unsubscribe", "auction_ids": [first]})
+        self.assertEqual((await communicator.receive_json_from())["data"]["auction_ids"], [second])
+        await database_sync_to_async(send_event)(first, {"type": "bid_placed", "data": {}})
+        self.assertTrue(await communicator.receive_nothing())
+
+        await communicator.send_json_to({"type": "subscribe", "auction_ids": ["x"]})
+        self.assertEqual((await communicator.receive_json_from())["type"], "error")
+        await communicator.disconnect()
+        self.assertEqual(presence.local_summary(), ([], {}))
+
+    @override_settings(BIDDING_WS_MAX_SUBSCRIPTIONS=2)
+    async def test_subscription_limit(self):
+        """Test that subscriptions over the limit are rejected."""
+        communicator = await self._connect()
+        await communicator.send_json_to({
+            "type": "subscribe", "auction_ids": [auction.pk for auction in self.auctions],
+        })
+        frame = await communicator.receive_json_from()
+        self.assertEqual(len(frame["data"]["auction_ids"]), 2)
+        self.assertEqual(frame["data"]["rejected"], [self.auctions[2].pk])
+        await communicator.disconnect()
+
+    async def test_watchlist_subscription_follows_changes(self):
+        """Test that a watchlist subscription picks up added and removed auctions."""
+        first, second = self.auctions[0], self.auctions[1]
+        await database_sync_to_async(Watchlist.objects.create)(user=self.watcher, auction=first)
+        anonymous = await self._connect()
+        await anonymous.send_json_to({"type": "subscribe_watchlist"})
+        self.assertEqual((await anonymous.receive_json_from())["type"], "error")
+        await anonymous.disconnect()
+
+        communicator = await self._connect(self.watcher)
+        await communicator.send_json_to({"type": "subscribe_watchlist"})
+        frame = await communicator.receive_json_from()
+        self.assertEqual(frame["data"]["auction_ids"], [first.pk])
+        self.assertTrue(frame["data"]["watchlist"])
+
+        await database_sync_to_async(Watchlist.objects.create)(user=self.watcher, auction=second)
+        frame = await communicator.receive_json_from()
+        self.assertEqual(frame["data"]["auction_ids"], [first.pk, second.pk])
+        await database_sync_to_async(Watchlist.objects.filter(auction=first).delete)()
+        frame = await communicator.receive_json_from()
+        self.assertEqual(frame["data"]["auction_ids"], [second.pk])
+        await communicator.disconnect()
+
+    async def test_resume_per_auction(self):
+        """Test that resume replays the missed events of one subscribed auction."""
+        auction_id = self.auctions[0].pk
+        for _ in range(3):
+            await database_sync_to_async(send_event)(auction_id, {"type": "bid_placed", "data": {}})
+        communicator = await self._connect()
+        await communicator.send_json_to({"type": "subscribe", "auction_ids": [auction_id]})
+        await communicator.receive_json_from()
+        await communicator.send_json_to({"type": "resume", "auction_id": auction_id, "last_seq": 2})
+        replayed = await communicator.receive_json_from()
+        self.assertEqual((replayed["auction_id"], replayed["seq"]), (auction_id, 3))
+        frame = await communicator.receive_json_from()
+        self.assertEqual(frame["data"], {"auction_id": auction_id, "seq": 3, "replayed": 1, "snapshot": False})
+        await communicator.disconnect()
+
+
+class OutboxTest(TestCase):
+    """Tests for per-connection outbound queues and slow clients."""
+
+    def _consumer(self):
+        """A consumer whose socket writes block until ``unblocked`` is set."""
+        consumer = FrameConsumer()
+        consumer.channel_name = "test.1"
+        consumer.sent, consumer.closed = [], []
+        consumer.unblocked = asyncio.Event()
+
+        async def send(text_data=None, bytes_data=None):
+            await consumer.unblocked.wait()
+            consumer.sent.append(json.loads(text_data))
+
+        async def close(code=None):
+            consumer.closed.append(code)
+
+        consumer.send, consumer.close = send, close
+        consumer.start_writer()
+        return consumer
+
+    async def test_latest_state_supersedes_queued_frames(self):
+        """Test that a backlogged client gets the latest bid state after other frames."""
+        consumer = self._consumer()
+        superseded = metrics["outbox_superseded"]
+        await consumer.send_frame({"type": "bid_placed", "data": {"bid_count": 1}}, replace="bid_placed")
+        await asyncio.sleep(0)
+        for count in (2, 3):
+            await consumer.send_frame({"type": "bid_placed", "data": {"bid_count": count}}, replace="bid_placed")
+            await consumer.send_json("pong", {"request_id": count})
+        consumer.unblocked.set()
+        await asyncio.sleep(0.01)
+        self.assertEqual(
+            [(frame["type"], frame["data"]) for frame in consumer.sent],
+            [("bid_placed", {"bid_count": 1}), ("pong", {"request_id": 2}),
+             ("bid_placed", {"bid_count": 3}), ("pong", {"request_id": 3})],
+        )
+        self.assertEqual(metrics["outbox_superseded"] - superseded, 1)
+        await consumer.stop_writer()
+
+    @override_settings(BIDDING_WS_QUEUE_HIGH_WATER=2)
+    async def test_slow_client_is_closed(self):
+        """Test that a client whose outbox reaches twice the high-water mark is closed."""
+        consumer = self._consumer()
+        disconnects, depth = metrics["outbox_slow_disconnects"], metrics["outbox_depth"]
+        for request_id in range(6):
+            await consumer.send_json("pong", {"request_id": request_id})
+            await asyncio.sleep(0)
+        self.assertEqual(consumer.closed, [SLOW_CLIENT_CLOSE_CODE])
+        self.assertEqual(metrics["outbox_slow_disconnects"] - disconnects, 1)
+        self.assertEqual(metrics["outbox_depth"], depth)
+        await consumer.stop_writer()
+
+    @override_settings(BIDDING_WS_QUEUE_HIGH_WATER=2, BIDDING_WS_SLOW_CLIENT_SECONDS=0)
+    async def test_backlogged_client_is_closed_after_grace_period(self):
+        """Test that a client staying above the high-water mark is closed."""
+        consumer = self._consumer()
+        for request_id in range(4):
+            await consumer.send_json("pong", {"request_id": request_id})
+            await asyncio.sleep(0)
+        self.assertEqual(consumer.closed, [SLOW_CLIENT_CLOSE_CODE])
+        await consumer.stop_writer()
+
+
+class AuctionEventBufferTest(TestCase):
+    """Tests for sequenced auction events and the replay ring."""
+
+    def setUp(self):
+        """Clear the cached buffers."""
+        cache.clear()
+
+    def test_sequence_per_auction(self):
+        """Test that each auction numbers its events from 1."""
+        self.assertEqual(current_seq(1), 0)
+        self.assertEqual(record_event(1, {"type": "bid_placed", "data": {}})["seq"], 1)
+        self.assertEqual(record_event(1, {"type": "bid_placed", "data": {}})["seq"], 2)
+        self.assertEqual(record_event(2, {"type": "auction_ended", "data": {}})["seq"], 1)
+        self.assertEqual(current_seq(1), 2)
+
+    def test_events_since(self):
+        """Test that only events after last_seq are returned, oldest first."""
+        for count in range(1, 4):
+            record_event(1, {"type": "bid_placed", "data": {"bid_count": count}})
+        self.assertEqual([event["data"]["bid_count"] for event in events_since(1, 1)], [2, 3])
+        self.assertEqual(events_since(1, 3), [])
+        # Ahead of the counter, e.g. after the cache was flushed
+        self.assertIsNone(events_since(1, 7))
+
+    @override_settings(BIDDING_EVENT_BUFFER_SIZE=3)
+    def test_overwritten_events_need_a_snapshot(self):
+        """Test that events overwritten in the ring are not replayed."""
+        for count in range(1, 6):
+            record_event(1, {"type": "bid_placed", "data": {"bid_count": count}})
+        self.assertIsNone(events_since(1, 1))
+        self.assertEqual([event["seq"] for event in events_since(1, 2)], [3, 4, 5])
+        cache.delete("auction_events:1:1")
+        self.assertIsNone(events_since(1, 3))
+
+    @override_settings(CACHES=fake_redis_caches("redis://fake-events:6379/0"))
+    def test_sequence_shared_through_redis_cache(self):
+        """Test that processes sharing a Redis cache continue one sequence."""
+        cache.clear()
+        other_process = caches.create_connection("default")
+        record_event(1, {"type": "bid_placed", "data": {}})
+        self.assertEqual(other_process.incr("auction_events:1:seq"), 2)
+        self.assertEqual(record_event(1, {"type": "bid_placed", "data": {}})["seq"], 3)
+        self.assertEqual(other_process.get("auction_events:1:3")["seq"], 3)
+
+
+class BroadcastCoalescerTest(TestCase):
+    """Tests for per-auction broadcast coalescing."""
+
+    def setUp(self):
+        """Set up a coalescer driven by explicit timestamps."""
+        self.sent = []
+        self.coalescer = BroadcastCoalescer(
+            window=0.05,
+            send=lambda auction_id, message: self.sent.append((auction_id, message)),
+            timers=False,
+        )
+
+    def test_first_bid_is_sent_immediately(self):
+        """Test that a bid after a quiet period is not delayed."""
+        self.coalescer.publish(1, {"bid_count": 1}, now=0)
+        self.assertEqual(self.sent, [(1, {"type": "bid_placed", "data": {"bid_count": 1}})])
+
+    def test_bids_within_window_are_folded(self):
+        """Test that bids inside the window become one frame with the latest state."""
+        self.coalescer.publish(1, {"bid_count": 1}, now=0)
+        self.coalescer.publish(1, {"bid_count": 2}, now=0.01)
+        self.coalescer.publish(1, {"bid_count": 3}, now=0.02)
+        self.coalescer.publish(2, {"bid_count": 1}, now=0.02)
+        self.assertEqual(self.coalescer.flush_due(0.04), 0)
+        self.assertEqual(len(self.sent), 2)
+
+        self.assertEqual(self.coalescer.flush_due(0.05), 1)
+        self.assertEqual(self.sent[-1], (1, {"type": "bid_placed", "data": {"bid_count": 3, "coalesced": 2}}))
+
+    def test_state_delta(self):
+        """Test that only changed fields end up in a delta."""
+        previous = {"amount": 10, "bid_count": 1, "end_time": "t"}
+        current = {"amount": 11, "bid_count": 2, "end_time": "t"}
+        self.assertEqual(state_delta(previous, current), {"amount": 11, "bid_count": 2})
+
+
+class ConcurrentBidTest(TransactionTestCase):
+    """Stress test for parallel bidders on a single auction.
+
+    On SQLite most attempts fail with lock errors and are retried; run with
+    DATABASE_ENGINE=postgres to exercise the row-locked path at full rate.
+    """
+
+    BIDDERS = 200
+
+    def test_no_lost_bids(self):
+        """Test that every accepted bid is counted under heavy contention."""
+        seller = User.objects.create_user(username="seller", password="testpass123")
+        bidders = [
+            User.objects.create(username=f"bidder{index}")
+            for index in range(self.BIDDERS)
+        ]
+        auction = create_auction(seller)
+        accepted = []
+        start = threading.Barrier(self.BIDDERS)
+
+        def submit(bidder):
+            try:
+                start.wait()
+                for _ in range(20):
+                    try:
+                        current = Auction.objects.get(pk=auction.pk)
+                        amount = max(current.starting_price, current.current_highest_bid + current.minimum_increment)
+                        accepted.append(place_bid(auction.pk, bidder, amount))
+                        return
+                    except (BidRejected, DatabaseError):
+                        # Back off so retries interleave with other bidders
+                        time.sleep(random.uniform(0, 0.02))
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=submit, args=(bidder,)) for bidder in bidders]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        auction.refresh_from_db()
+        self.assertTrue(accepted)
+        self.assertEqual(Bid.objects.filter(auction=auction).count(), len(accepted))
+        self.assertEqual(BidHistory.objects.filter(auction=auction).count(), len(accepted))
+        self.assertEqual(auction.bid_count, len(accepted))
+        self.assertEqual(auction.current_highest_bid, max(bid.amount for bid in accepted))
+        amounts = list(Bid.objects.filter(auction=auction).order_by("id").values_list("amount", flat=True))
+        self.assertEqual(amounts, sorted(set(amounts)))
+
+
+class BidLoadTestReportTest(TestCase):
+    """Tests for the load test report."""
+
+    def test_percentiles_and_lost_updates(self):
+        """Test that latencies are ranked and watchers behind the last ack count as lost updates."""
+        self.assertEqual(percentile([0.003, 0.001, 0.002, 0.004], 0.5), 3.0)
+        self.assertEqual(percentile([0.001] * 99 + [0.5], 0.99), 500.0)
+
+        test = BidLoadTest("http://127.0.0.1:8765", 1, [("http", "token"), ("ws", "token")], watchers=3)
+        test.elapsed = 2.0
+        test.outcomes.update(accepted=10, rejected=6, error=4, reconnect=1)
+        test._accepted(10, "25.00")
+        test._accepted(9, "24.00")
+        test.watcher_counts = [10, 8, 10]
+        report = test.report()
+        self.assertEqual(report["bidders"], {"http": 1, "ws": 1})
+        self.assertEqual(report["bids_attempted"], 20)
+        self.assertEqual(report["accepted_per_second"], 5.0)
+        self.assertEqual(report["error_rate"], 0.2)
+        self.assertEqual(report["last_ack_highest_bid"], "25.00")
+        self.assertEqual(report["lost_updates"], 2)
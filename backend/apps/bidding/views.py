@@ -1,28 +1,21 @@
 """Bidding app views."""
+import logging
+
+from django.db import DatabaseError
 from rest_framework import viewsets, status, views
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, IsAuthenticatedOrReadOnly
 from rest_framework.decorators import action
-from django.utils import timezone
-from asgiref.sync import async_to_sync
-from channels.layers import get_channel_layer
+from rest_framework.exceptions import ValidationError
+from apps.users.activity import track_activity
+from apps.users.serializers import UserSerializer
+from config.pagination import paginated_response
+from .hotbook import hot_book
 from .models import Bid, AutoBidRule, BidHistory
-from .serializers import BidSerializer, AutoBidRuleSerializer
-
+from .serializers import BidSerializer, AutoBidRuleSerializer, BidLadderSerializer
+from .services import RETRY_MESSAGE, BidRejected, submit_bid
 
-def _track_activity(user):
-    if user and user.is_authenticated:
-        user.update_activity()
-
-
-def _apply_anti_snipe(auction):
-    if auction.anti_snipe_seconds and auction.anti_snipe_seconds > 0:
-        now = timezone.now()
-        remaining = (auction.end_time - now).total_seconds()
-        if remaining < auction.anti_snipe_seconds:
-            auction.end_time = now + timezone.timedelta(
-                seconds=auction.anti_snipe_seconds
-            )
+logger = logging.getLogger('backend')
 
 
 class BidViewSet(viewsets.ModelViewSet):
@@ -34,19 +27,54 @@ class BidViewSet(viewsets.ModelViewSet):
         """Filter bids by user."""
         return Bid.objects.filter(bidder=self.request.user)
     
+    def get_serializer_class(self):
+        if self.action == 'ladder':
+            return BidLadderSerializer
+        return super().get_serializer_class()
+    
     def create(self, request, *args, **kwargs):
         """Create a bid and return updated auction data."""
         serializer = self.get_serializer(data=request.data)
-        serializer.is_valid(raise_exception=True)
-        self.perform_create(serializer)
+        if self._is_hot(request):
+            # Cached auctions skip the auction_id lookup
+            auction_id = int(request.data.get('auction_id'))
+            amount = serializer.fields['amount'].run_validation(request.data.get('amount'))
+        else:
+            serializer.is_valid(raise_exception=True)
+            auction_id = serializer.validated_data['auction'].pk
+            amount = serializer.validated_data['amount']
         
-        # Get the created bid and its auction
-        bid = serializer.instance
+        track_activity(request.user)
+        try:
+            bid = submit_bid(auction_id, request.user, amount)
+        except BidRejected as exc:
+            raise ValidationError({'detail': str(exc)})
+        except DatabaseError:
+            logger.warning('Bid on auction %s failed in the database', auction_id, exc_info=True)
+            return Response(
+                {'detail': RETRY_MESSAGE, 'retry': True},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE,
+                headers={'Retry-After': '1'},
+            )
         auction = bid.auction
         
+        if bid.pk is None:
+            bid_data = {
+                'id': None,
+                'auction_id': auction_id,
+                'bidder': UserSerializer(request.user).data,
+                'amount': str(amount),
+                'is_auto_bid': False,
+                'created_at': bid.created_at,
+                'pending': True,
+            }
+        else:
+            serializer.instance = bid
+            bid_data = serializer.data
+        
         # Return bid data along with updated auction info
         return Response({
-            'bid': serializer.data,
+            'bid': bid_data,
             'auction': {
                 'id': auction.id,
                 'current_highest_bid': auction.current_highest_bid,
@@ -55,39 +83,13 @@ class BidViewSet(viewsets.ModelViewSet):
             }
         }, status=status.HTTP_201_CREATED)
     
-    def perform_create(self, serializer):
-        """Set bidder to current user and update auction's current_highest_bid."""
-        _track_activity(self.request.user)
-        
-        bid = serializer.save(bidder=self.request.user)
-        
-        # Update auction's current highest bid and bid count
-        auction = bid.auction
-        if auction.current_highest_bid is None or bid.amount > auction.current_highest_bid:
-            auction.current_highest_bid = bid.amount
-        auction.bid_count += 1
-        _apply_anti_snipe(auction)
-        auction.save(update_fields=['current_highest_bid', 'bid_count', 'end_time'])
-        channel_layer = get_channel_layer()
-        if channel_layer:
-            async_to_sync(channel_layer.group_send)(
-                f"auction_{auction.id}",
-                {
-                    "type": "auction.message",
-                    "message": {
-                        "type": "bid_placed",
-                        "data": {
-                            "amount": float(bid.amount),
-                            "bidder": bid.bidder.username,
-                            "bidderAvatar": bid.bidder.avatar.url if bid.bidder.avatar else None,
-                            "end_time": auction.end_time.isoformat(),
-                            "bid_count": auction.bid_count,
-                            "current_highest_bid": float(auction.current_highest_bid),
-                            "anti_snipe_seconds": auction.anti_snipe_seconds,
-                        },
-                    },
-                },
-            )
+    def _is_hot(self, request):
+        if not hot_book.enabled:
+            return False
+        try:
+            return hot_book.get(int(request.data.get('auction_id'))) is not None
+        except (TypeError, ValueError):
+            return False
     
     @action(detail=False, methods=['get'], permission_classes=[IsAuthenticatedOrReadOnly])
     def auction_bids(self, request):
@@ -100,8 +102,43 @@ class BidViewSet(viewsets.ModelViewSet):
             )
         
         bids = Bid.objects.filter(auction_id=auction_id).select_related('bidder')
-        serializer = self.get_serializer(bids, many=True)
-        return Response(serializer.data)
+        return paginated_response(self, bids)
+    
+    @action(detail=False, methods=['get'], permission_classes=[IsAuthenticatedOrReadOnly])
+    def ladder(self, request):
+        """Compact bid ladder of an auction, newest first.
+        
+        ``?since=<bid id>`` only returns bids placed after that one, so a
+        client reconnecting after a dropped socket fetches just the gap.
+        Bids the hot book accepted only get a row and an id when flushed, so
+        an auction held here is flushed first; otherwise a later ``since``
+        would skip them.
+        """
+        try:
+            auction_id = int(request.query_params['auction_id'])
+        except (KeyError, ValueError):
+            return Response(
+                {'error': 'auction_id required'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        if hot_book.enabled:
+            state = hot_book.get(auction_id)
+            # A failing auction is left to the flusher's own retries
+            if state is not None and state.unflushed and not state.failures:
+                hot_book.flush()
+        
+        bids = Bid.objects.filter(auction_id=auction_id)
+        since = request.query_params.get('since')
+        if since is not None:
+            try:
+                bids = bids.filter(id__gt=int(since))
+            except ValueError:
+                return Response(
+                    {'error': 'since must be a bid id'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+        return paginated_response(self, bids.order_by('-created_at', '-id').as_ladder())
 
 
 class AutoBidRuleView(views.APIView):
@@ -118,7 +155,8 @@ class AutoBidRuleView(views.APIView):
         """Create auto-bid rule."""
         serializer = AutoBidRuleSerializer(data=request.data)
         if serializer.is_valid():
-            serializer.save(bidder=request.user)
+            rule = serializer.save(bidder=request.user)
+            hot_book.release(rule.auction_id)
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
     
@@ -135,6 +173,7 @@ class AutoBidRuleView(views.APIView):
         
         serializer = AutoBidRuleSerializer(rule, data=request.data, partial=True)
         if serializer.is_valid():
-            serializer.save()
+            rule = serializer.save()
+            hot_book.release(rule.auction_id)
             return Response(serializer.data)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
@@ -0,0 +1,32 @@
+# Generated by Django 4.2.7 on 2026-10-18 05:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("fraud", "0002_initial"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="fraudsignal",
+            index=models.Index(
+                fields=["-created_at", "-id"], name="fraud_signa_created_f0fe27_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="fraudsignal",
+            index=models.Index(
+                fields=["is_reviewed", "-created_at", "-id"],
+                name="fraud_signa_is_revi_a241aa_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="fraudsignal",
+            index=models.Index(
+                fields=["risk_level", "-created_at", "-id"],
+                name="fraud_signa_risk_le_d94b8a_idx",
+            ),
+        ),
+    ]
@@ -49,6 +49,9 @@ class FraudSignal(models.Model):
         indexes = [
             models.Index(fields=['user', 'risk_level']),
             models.Index(fields=['is_reviewed', 'risk_level']),
+            models.Index(fields=['-created_at', '-id']),
+            models.Index(fields=['is_reviewed', '-created_at', '-id']),
+            models.Index(fields=['risk_level', '-created_at', '-id']),
         ]
     
     def __str__(self):
@@ -3,6 +3,7 @@ from rest_framework import viewsets
 from rest_framework.response import Response
 from rest_framework.permissions import IsAdminUser
 from rest_framework.decorators import action
+from config.pagination import paginated_response
 from .models import FraudSignal
 from .serializers import FraudSignalSerializer
 
@@ -20,15 +21,13 @@ class FraudSignalViewSet(viewsets.ModelViewSet):
     def unreviewed(self, request):
         """Get unreviewed fraud signals."""
         unreviewed = FraudSignal.objects.filter(is_reviewed=False)
-        serializer = self.get_serializer(unreviewed, many=True)
-        return Response(serializer.data)
+        return paginated_response(self, unreviewed)
     
     @action(detail=False, methods=['get'])
     def high_risk(self, request):
         """Get high risk signals."""
         high_risk = FraudSignal.objects.filter(risk_level__in=['high', 'critical'])
-        serializer = self.get_serializer(high_risk, many=True)
-        return Response(serializer.data)
+        return paginated_response(self, high_risk)
     
     @action(detail=True, methods=['post'])
     def review(self, request, pk=None):
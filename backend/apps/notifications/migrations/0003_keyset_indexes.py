@@ -0,0 +1,33 @@
+# Generated by Django 4.2.7 on 2026-10-18 05:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("notifications", "0002_initial"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="message",
+            index=models.Index(
+                fields=["recipient", "-created_at", "-id"],
+                name="notificatio_recipie_e446e8_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="message",
+            index=models.Index(
+                fields=["sender", "-created_at", "-id"],
+                name="notificatio_sender__cc914c_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="notification",
+            index=models.Index(
+                fields=["user", "-created_at", "-id"],
+                name="notificatio_user_id_90f3d6_idx",
+            ),
+        ),
+    ]
@@ -45,6 +45,7 @@ class Notification(models.Model):
         ordering = ['-created_at']
         indexes = [
             models.Index(fields=['user', 'is_read', 'created_at']),
+            models.Index(fields=['user', '-created_at', '-id']),
         ]
     
     def __str__(self):
@@ -70,6 +71,8 @@ class Message(models.Model):
         ordering = ['-created_at']
         indexes = [
             models.Index(fields=['recipient', 'is_read', 'created_at']),
+            models.Index(fields=['recipient', '-created_at', '-id']),
+            models.Index(fields=['sender', '-created_at', '-id']),
         ]
     
     def __str__(self):
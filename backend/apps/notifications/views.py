@@ -3,6 +3,7 @@ from rest_framework import viewsets
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.decorators import action
+from config.pagination import paginated_response
 from .models import Notification, Message
 from .serializers import NotificationSerializer, MessageSerializer
 
@@ -26,8 +27,7 @@ class NotificationViewSet(viewsets.ReadOnlyModelViewSet):
     def unread(self, request):
         """Get unread notifications."""
         unread = self.get_queryset().filter(is_read=False)
-        serializer = self.get_serializer(unread, many=True)
-        return Response(serializer.data)
+        return paginated_response(self, unread)
     
     @action(detail=True, methods=['post'])
     def mark_as_read(self, request, pk=None):
@@ -53,15 +53,13 @@ class MessageViewSet(viewsets.ModelViewSet):
     def inbox(self, request):
         """Get received messages."""
         messages = self.get_queryset()
-        serializer = self.get_serializer(messages, many=True)
-        return Response(serializer.data)
+        return paginated_response(self, messages)
     
     @action(detail=False, methods=['get'])
     def sent(self, request):
         """Get sent messages."""
         messages = Message.objects.filter(sender=request.user)
-        serializer = self.get_serializer(messages, many=True)
-        return Response(serializer.data)
+        return paginated_response(self, messages)
     
     @action(detail=True, methods=['post'])
     def mark_as_read(self, request, pk=None):
@@ -0,0 +1,156 @@
+"""Write-behind buffer for ``User.last_activity``.
+
+Views and consumers record activity on almost every authenticated request.
+Instead of one ``UPDATE users_user`` per request, timestamps are kept in a
+per-process buffer (latest value per user) and written with a single
+``UPDATE ... SET last_activity = CASE id ...`` once
+``USER_ACTIVITY_FLUSH_SECONDS`` have passed, by whichever request records
+activity next or, when the process goes quiet, by ``write_behind_flusher``.
+That daemon thread, started by the ASGI and WSGI entry points, flushes every
+registered write-behind buffer once it is due, and flushes them all again
+when the interpreter exits.
+
+``User.is_online`` checks the buffer before the database column, so the
+process that saw the activity answers immediately and others lag by at most
+one flush interval, well inside the five-minute online window. Timestamps
+still buffered when a process is killed are lost, which only makes a user
+look idle slightly earlier.
+"""
+import atexit
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.db.models import Case, DateTimeField, Value, When
+from django.utils import timezone
+
+logger = logging.getLogger('backend')
+
+
+class ActivityBuffer:
+    """Latest activity timestamp per user id, flushed in bulk."""
+
+    def __init__(self, flush_interval=None, batch_size=500, clock=time.monotonic):
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.clock = clock
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._last_flush = clock()
+
+    def _interval(self):
+        if self.flush_interval is not None:
+            return self.flush_interval
+        return getattr(settings, 'USER_ACTIVITY_FLUSH_SECONDS', 30)
+
+    def record(self, user_id, when=None):
+        """Buffer activity for ``user_id`` and flush if the interval has passed."""
+        when = when or timezone.now()
+        with self._lock:
+            self._pending[user_id] = when
+        self.flush_if_due()
+        return when
+
+    def flush_if_due(self):
+        """Flush if anything is buffered and the interval has passed."""
+        with self._lock:
+            due = bool(self._pending) and self.clock() - self._last_flush >= self._interval()
+        return self.flush() if due else 0
+
+    def last_seen(self, user_id):
+        """Return the buffered timestamp for ``user_id`` or ``None``."""
+        return self._pending.get(user_id)
+
+    def flush(self):
+        """Write all buffered timestamps; returns the number of users updated."""
+        from .models import User
+
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            self._last_flush = self.clock()
+        items = list(pending.items())
+        try:
+            for start in range(0, len(items), self.batch_size):
+                batch = dict(items[start:start + self.batch_size])
+                User.objects.filter(pk__in=batch).update(last_activity=Case(
+                    *[When(pk=user_id, then=Value(when)) for user_id, when in batch.items()],
+                    output_field=DateTimeField(),
+                ))
+        except Exception:
+            logger.exception('Flushing activity for %s users failed', len(items))
+            # Put them back unless newer activity arrived meanwhile
+            with self._lock:
+                for user_id, when in pending.items():
+                    self._pending.setdefault(user_id, when)
+            return 0
+        return len(items)
+
+    def clear(self):
+        """Drop buffered timestamps without writing them."""
+        with self._lock:
+            self._pending.clear()
+            self._last_flush = self.clock()
+
+
+class PeriodicFlusher:
+    """Flushes registered write-behind buffers from one daemon thread.
+
+    Every ``tick`` seconds each buffer's ``flush_if_due()`` runs, so writes
+    do not wait for the next ``record()`` in a quiet process; whatever is
+    still buffered is flushed at interpreter exit.
+    """
+
+    def __init__(self, tick=1.0):
+        self.tick = tick
+        self.buffers = []
+        self._lock = threading.Lock()
+        self._thread = None
+        self._exit_hook = False
+
+    def register(self, buffer):
+        if buffer not in self.buffers:
+            self.buffers.append(buffer)
+        return buffer
+
+    def start(self):
+        """Start the flush thread unless it is running already."""
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run, name='write-behind-flusher', daemon=True)
+            self._thread.start()
+            if not self._exit_hook:
+                atexit.register(self.flush_all)
+                self._exit_hook = True
+
+    def flush_due(self):
+        for buffer in list(self.buffers):
+            try:
+                buffer.flush_if_due()
+            except Exception:
+                logger.exception('Periodic flush of %s failed', type(buffer).__name__)
+
+    def flush_all(self):
+        for buffer in list(self.buffers):
+            try:
+                buffer.flush()
+            except Exception:
+                logger.exception('Final flush of %s failed', type(buffer).__name__)
+
+    def _run(self):
+        while True:
+            time.sleep(self.tick)
+            close_old_connections()
+            self.flush_due()
+
+
+write_behind_flusher = PeriodicFlusher()
+activity_buffer = write_behind_flusher.register(ActivityBuffer())
+
+
+def track_activity(user):
+    """Record activity for ``user`` if authenticated."""
+    if user and user.is_authenticated:
+        user.update_activity()
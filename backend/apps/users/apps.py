@@ -5,3 +5,8 @@ from django.apps import AppConfig
 class UsersConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.users'
+
+    def ready(self):
+        from .websocket_auth import connect_signals
+
+        connect_signals()
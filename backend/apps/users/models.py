@@ -43,17 +43,19 @@ class User(AbstractUser):
         return f"{self.get_full_name()} ({self.username})"
     
     def update_activity(self):
-        """Update user's last activity timestamp"""
-        self.last_activity = timezone.now()
-        self.save(update_fields=['last_activity'])
+        """Update user's last activity timestamp (buffered, see ``apps.users.activity``)"""
+        from .activity import activity_buffer
+        self.last_activity = activity_buffer.record(self.pk)
     
     @property
     def is_online(self):
         """Check if user is online (last activity within 5 minutes)"""
         from datetime import timedelta
-        if not self.last_activity:
+        from .activity import activity_buffer
+        last_activity = activity_buffer.last_seen(self.pk) or self.last_activity
+        if not last_activity:
             return False
-        return (timezone.now() - self.last_activity) < timedelta(minutes=5)
+        return (timezone.now() - last_activity) < timedelta(minutes=5)
 
 
 class UserProfile(models.Model):
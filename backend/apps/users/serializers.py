@@ -22,8 +22,15 @@ class UserSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'feedback_score', 'total_auctions', 'total_bids', 'is_online']
     
     def get_is_online(self, obj):
-        """Get online status from user property"""
-        return obj.is_online
+        """Online if connected over WebSocket or recently active.
+
+        Connected users are looked up once per response and shared through
+        the serializer context, so a page of users costs one presence lookup.
+        """
+        if 'online_user_ids' not in self.context:
+            from apps.bidding.presence import online_user_ids
+            self.context['online_user_ids'] = online_user_ids()
+        return obj.pk in self.context['online_user_ids'] or obj.is_online
 
     def _validate_passwords(self, password, password2):
         if password and password2 and password != password2:
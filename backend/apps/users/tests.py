@@ -0,0 +1,163 @@
+"""Tests for Users app."""
+
+from datetime import timedelta
+
+from channels.generic.websocket import AsyncJsonWebsocketConsumer
+from channels.routing import URLRouter
+from channels.testing import WebsocketCommunicator
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from rest_framework_simplejwt.tokens import AccessToken
+
+from apps.bidding.routing import websocket_urlpatterns
+from apps.users.activity import ActivityBuffer, PeriodicFlusher, activity_buffer
+from apps.users.websocket_auth import JWTAuthMiddlewareStack
+
+User = get_user_model()
+
+
+class ActivityBufferTest(TestCase):
+    """Test buffered last-activity tracking."""
+
+    def setUp(self):
+        """Set up test data."""
+        self.now = 0.0
+        self.buffer = ActivityBuffer(flush_interval=30, clock=lambda: self.now)
+        self.long_ago = timezone.now() - timedelta(days=1)
+        self.users = [
+            User.objects.create(username=f"user{i}", last_activity=self.long_ago) for i in range(50)
+        ]
+        activity_buffer.clear()
+        self.addCleanup(activity_buffer.clear)
+
+    def test_records_are_flushed_in_one_query(self):
+        """Test that many records become a single UPDATE once the interval passes."""
+        with CaptureQueriesContext(connection) as queries:
+            for _ in range(20):
+                for user in self.users:
+                    self.buffer.record(user.pk)
+        self.assertEqual(len(queries), 0)
+
+        self.now = 31
+        with CaptureQueriesContext(connection) as queries:
+            self.buffer.record(self.users[0].pk)
+        self.assertEqual(len(queries), 1)
+        self.assertFalse(User.objects.filter(last_activity=self.long_ago).exists())
+        self.assertIsNone(self.buffer.last_seen(self.users[0].pk))
+
+    def test_flush_keeps_each_users_latest_timestamp(self):
+        """Test that each user gets their own most recent timestamp."""
+        first, second = self.users[:2]
+        earlier = timezone.now() - timedelta(minutes=10)
+        later = timezone.now() - timedelta(minutes=1)
+        self.buffer.record(first.pk, earlier)
+        self.buffer.record(second.pk, earlier)
+        self.buffer.record(first.pk, later)
+        self.assertEqual(self.buffer.flush(), 2)
+        first.refresh_from_db()
+        second.refresh_from_db()
+        self.assertEqual(first.last_activity, later)
+        self.assertEqual(second.last_activity, earlier)
+
+    def test_periodic_flusher_writes_quiet_buffers(self):
+        """Test that activity is written once due without another record()."""
+        flusher = PeriodicFlusher()
+        flusher.register(self.buffer)
+        self.buffer.record(self.users[0].pk)
+        flusher.flush_due()
+        self.assertEqual(User.objects.get(pk=self.users[0].pk).last_activity, self.long_ago)
+
+        self.now = 31
+        flusher.flush_due()
+        self.assertNotEqual(User.objects.get(pk=self.users[0].pk).last_activity, self.long_ago)
+        self.buffer.record(self.users[1].pk)
+        flusher.flush_all()
+        self.assertIsNone(self.buffer.last_seen(self.users[1].pk))
+        self.assertNotEqual(User.objects.get(pk=self.users[1].pk).last_activity, self.long_ago)
+
+    def test_is_online_reads_buffer(self):
+        """Test that buffered activity counts as online before it is written."""
+        client = APIClient()
+        user = self.users[0]
+        client.force_authenticate(user)
+        self.assertFalse(User.objects.get(pk=user.pk).is_online)
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get("/api/users/me/")
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.data["is_online"])
+        self.assertFalse(any("UPDATE" in query["sql"] for query in queries))
+        self.assertTrue(User.objects.get(pk=user.pk).is_online)
+        self.assertEqual(User.objects.get(pk=user.pk).last_activity, self.long_ago)
+
+
+class WhoAmIConsumer(AsyncJsonWebsocketConsumer):
+    """Reports the authenticated user and remaining subprotocols."""
+
+    async def connect(self):
+        await self.accept()
+        user = self.scope["user"]
+        await self.send_json({
+            "user_id": user.pk,
+            "username": user.username if user.is_authenticated else None,
+            "subprotocols": self.scope.get("subprotocols", []),
+        })
+
+
+class WebSocketJWTAuthTest(TransactionTestCase):
+    """Test JWT authentication of WebSocket connections."""
+
+    def setUp(self):
+        """Set up test data."""
+        cache.clear()
+        self.user = User.objects.create_user(username="alice", password="testpass123")
+        self.token = str(AccessToken.for_user(self.user))
+        self.application = JWTAuthMiddlewareStack(WhoAmIConsumer.as_asgi())
+
+    async def _whoami(self, path="/ws/", subprotocols=None):
+        communicator = WebsocketCommunicator(self.application, path, subprotocols=subprotocols)
+        connected, _ = await communicator.connect()
+        self.assertTrue(connected)
+        response = await communicator.receive_json_from()
+        await communicator.disconnect()
+        return response
+
+    async def test_token_in_subprotocol_or_query_string(self):
+        """Test that a token is accepted as a subprotocol and as ?token=."""
+        response = await self._whoami(subprotocols=["msgpack", "jwt", self.token])
+        self.assertEqual(response["user_id"], self.user.pk)
+        self.assertEqual(response["subprotocols"], ["msgpack", "jwt"])
+        response = await self._whoami(f"/ws/?token={self.token}")
+        self.assertEqual(response["username"], "alice")
+
+    async def test_invalid_or_missing_token_is_anonymous(self):
+        """Test that bad tokens and sockets without a session are anonymous."""
+        self.assertIsNone((await self._whoami(subprotocols=["jwt", "invalid"]))["user_id"])
+        self.assertIsNone((await self._whoami())["user_id"])
+
+    async def test_user_fields_are_cached_until_saved(self):
+        """Test that connects reuse cached user fields until the user is saved."""
+        await self._whoami(subprotocols=["jwt", self.token])
+        await User.objects.filter(pk=self.user.pk).aupdate(username="renamed")
+        self.assertEqual((await self._whoami(subprotocols=["jwt", self.token]))["username"], "alice")
+
+        user = await User.objects.aget(pk=self.user.pk)
+        user.is_active = False
+        await user.asave()
+        self.assertIsNone((await self._whoami(subprotocols=["jwt", self.token]))["user_id"])
+
+    async def test_auction_consumers_answer_with_offered_subprotocol(self):
+        """Test that auction sockets accept "jwt", or "msgpack" when offered too."""
+        application = JWTAuthMiddlewareStack(URLRouter(websocket_urlpatterns))
+        for path in ("/ws/auction/1/", "/ws/auctions/"):
+            for offered, accepted in ((["jwt", self.token], "jwt"), (["msgpack", "jwt", self.token], "msgpack")):
+                communicator = WebsocketCommunicator(application, path, subprotocols=offered)
+                connected, subprotocol = await communicator.connect()
+                self.assertTrue(connected)
+                self.assertEqual(subprotocol, accepted)
+                await communicator.disconnect()
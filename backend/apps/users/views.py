@@ -4,14 +4,10 @@ from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework.decorators import action
 from django.contrib.auth import get_user_model
+from .activity import track_activity
 from .models import UserProfile, BusinessAccount
 from .serializers import UserSerializer, UserProfileSerializer, BusinessAccountSerializer
 
-
-def _track_activity(user):
-    if user and user.is_authenticated:
-        user.update_activity()
-
 User = get_user_model()
 
 
@@ -45,7 +41,7 @@ class UserViewSet(viewsets.ModelViewSet):
         """Get user details and track activity for current user if authenticated."""
         # Update activity only for authenticated user viewing their own profile
         if request.user.is_authenticated and int(kwargs.get('pk', 0)) == request.user.id:
-            _track_activity(request.user)
+            track_activity(request.user)
         
         return super().retrieve(request, *args, **kwargs)
 
@@ -57,7 +53,7 @@ class CurrentUserView(APIView):
     def get(self, request):
         """Get current user data and track activity."""
         # Update last activity
-        _track_activity(request.user)
+        track_activity(request.user)
         
         serializer = UserSerializer(request.user)
         return Response(serializer.data)
@@ -0,0 +1,113 @@
+"""JWT authentication for WebSocket connections.
+
+The API authenticates with simplejwt access tokens, which browsers cannot
+put in WebSocket headers, so sockets offer the subprotocols ``["jwt", <token>]`` (preferred, since query
+strings end up in access logs) or send ``?token=``. The token entry is
+removed from the scope and consumers accept ``jwt``, so the handshake
+answers with a protocol the client offered. The token signature and expiry are checked in memory; the
+few user fields consumers need are cached for ``WS_AUTH_USER_CACHE_SECONDS``
+so a reconnect storm after a deploy does not hit the database once per
+socket.
+
+Saving or deleting a user drops their entry. Sockets without a token fall
+back to Django session authentication.
+"""
+from urllib.parse import parse_qs
+
+from channels.auth import AuthMiddlewareStack
+from channels.db import database_sync_to_async
+from channels.middleware import BaseMiddleware
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.db.models.signals import post_delete, post_save
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import AccessToken
+
+User = get_user_model()
+
+SUBPROTOCOL = 'jwt'
+
+# User fields kept in the cache, enough for presence, bidding and broadcasts
+CLAIM_FIELDS = ('id', 'username', 'first_name', 'last_name', 'avatar', 'is_active', 'is_staff', 'is_verified')
+
+
+def _claims_key(user_id):
+    return f'ws_auth:user:{user_id}'
+
+
+def token_from_scope(scope):
+    """Return ``(raw token or None, subprotocols without the token)``."""
+    token = None
+    subprotocols = list(scope.get('subprotocols', []))
+    if SUBPROTOCOL in subprotocols:
+        # The token is the entry right after the fixed protocol name
+        position = subprotocols.index(SUBPROTOCOL) + 1
+        if position < len(subprotocols):
+            token = subprotocols.pop(position)
+    if token is None:
+        query = parse_qs(scope.get('query_string', b'').decode())
+        token = query.get('token', [None])[0]
+    return token, subprotocols
+
+
+@database_sync_to_async
+def _load_claims(user_id):
+    return User.objects.filter(pk=user_id, is_active=True).values(*CLAIM_FIELDS).first()
+
+
+def _user_from_claims(claims):
+    # Like a row loaded with only(): other fields load on access and save() leaves them alone
+    return User.from_db('default', list(claims), list(claims.values()))
+
+
+async def get_jwt_user(raw_token):
+    """The user of a valid access token, or ``AnonymousUser``."""
+    try:
+        token = AccessToken(raw_token)
+        user_id = token[api_settings.USER_ID_CLAIM]
+    except (TokenError, KeyError):
+        return AnonymousUser()
+    key = _claims_key(user_id)
+    claims = await cache.aget(key)
+    if claims is None:
+        # Unknown and inactive users are cached too, as an empty dict
+        claims = await _load_claims(user_id) or {}
+        await cache.aset(key, claims, getattr(settings, 'WS_AUTH_USER_CACHE_SECONDS', 60))
+    return _user_from_claims(claims) if claims else AnonymousUser()
+
+
+def forget_user(user_id):
+    """Drop cached claims, e.g. after the user changed or was deactivated."""
+    cache.delete(_claims_key(user_id))
+
+
+def _user_saved(sender, instance, **kwargs):
+    forget_user(instance.pk)
+
+
+def connect_signals():
+    post_save.connect(_user_saved, sender=User, dispatch_uid='websocket_auth_user_saved')
+    post_delete.connect(_user_saved, sender=User, dispatch_uid='websocket_auth_user_deleted')
+
+
+class JWTAuthMiddleware(BaseMiddleware):
+    """Sets ``scope['user']`` from a JWT access token, or hands over to ``fallback``."""
+
+    def __init__(self, inner, fallback=None):
+        super().__init__(inner)
+        self.fallback = fallback or inner
+
+    async def __call__(self, scope, receive, send):
+        token, subprotocols = token_from_scope(scope)
+        if token is None:
+            return await self.fallback(scope, receive, send)
+        scope = dict(scope, subprotocols=subprotocols, user=await get_jwt_user(token))
+        return await self.inner(scope, receive, send)
+
+
+def JWTAuthMiddlewareStack(inner):
+    """JWT auth for sockets presenting a token, session auth for the rest."""
+    return JWTAuthMiddleware(inner, fallback=AuthMiddlewareStack(inner))
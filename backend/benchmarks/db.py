@@ -0,0 +1,16 @@
+"""Database helpers shared by the benchmark commands."""
+from contextlib import contextmanager
+
+from django.db import transaction
+
+
+@contextmanager
+def rolled_back():
+    """Run the block in a transaction that is always rolled back.
+
+    Benchmarks seed their data inside it, so they leave no rows behind,
+    whether they finish or fail halfway.
+    """
+    with transaction.atomic():
+        yield
+        transaction.set_rollback(True)
@@ -0,0 +1,162 @@
+"""factory-boy factories producing realistic benchmark data."""
+import factory
+from django.utils import timezone
+from factory.django import DjangoModelFactory
+
+from apps.auctions.models import Auction, Category, Watchlist
+from apps.bidding.models import AutoBidRule, Bid
+from apps.media.models import AuctionImage
+from apps.notifications.models import Notification
+from apps.users.models import User
+from apps.vehicles.models import FuelType, Transmission, Vehicle, VehicleCondition, VehicleType
+
+
+class UserFactory(DjangoModelFactory):
+    class Meta:
+        model = User
+
+    username = factory.Sequence(lambda n: f'bench-user-{n}')
+    email = factory.LazyAttribute(lambda user: f'{user.username}@example.com')
+    first_name = factory.Faker('first_name')
+    last_name = factory.Faker('last_name')
+    bio = factory.Faker('paragraph', nb_sentences=4)
+    phone = factory.Faker('numerify', text='+371 2#######')
+    location = factory.Faker('city')
+    is_verified = True
+    last_activity = None
+
+
+class CategoryFactory(DjangoModelFactory):
+    class Meta:
+        model = Category
+
+    name = factory.Sequence(lambda n: f'Bench category {n}')
+    slug = factory.Sequence(lambda n: f'bench-category-{n}')
+    description = factory.Faker('sentence')
+    widget_settings = factory.LazyFunction(lambda: {
+        'card_size': 'large',
+        'timer_color': '#fbbf24',
+        'background_image': 'category_widgets/background.jpg',
+        'icon_image': 'category_widgets/icon.png',
+    })
+
+
+class AuctionFactory(DjangoModelFactory):
+    class Meta:
+        model = Auction
+
+    title = factory.Faker('sentence', nb_words=5)
+    description = factory.Faker('paragraph', nb_sentences=12)
+    category = factory.SubFactory(CategoryFactory)
+    seller = factory.SubFactory(UserFactory)
+    location = factory.Faker('city')
+    starting_price = factory.Faker('pydecimal', left_digits=4, right_digits=2, positive=True)
+    current_highest_bid = factory.LazyAttribute(lambda auction: auction.starting_price + 25)
+    bid_count = factory.Faker('pyint', max_value=40)
+    start_time = factory.LazyFunction(timezone.now)
+    end_time = factory.LazyFunction(lambda: timezone.now() + timezone.timedelta(days=3))
+    status = 'active'
+
+
+class AuctionImageFactory(DjangoModelFactory):
+    class Meta:
+        model = AuctionImage
+
+    auction = factory.SubFactory(AuctionFactory)
+    image = factory.Sequence(lambda n: f'auction_images/bench-{n}.jpg')
+    alt_text = factory.Faker('sentence', nb_words=3)
+
+
+class BidFactory(DjangoModelFactory):
+    class Meta:
+        model = Bid
+
+    auction = factory.SubFactory(AuctionFactory)
+    bidder = factory.SubFactory(UserFactory)
+    amount = factory.LazyAttribute(lambda bid: bid.auction.current_highest_bid)
+
+
+class AutoBidRuleFactory(DjangoModelFactory):
+    class Meta:
+        model = AutoBidRule
+
+    auction = factory.SubFactory(AuctionFactory)
+    bidder = factory.SubFactory(UserFactory)
+    max_bid = factory.Faker('pydecimal', left_digits=5, right_digits=2, positive=True)
+
+
+class WatchlistFactory(DjangoModelFactory):
+    class Meta:
+        model = Watchlist
+
+    user = factory.SubFactory(UserFactory)
+    auction = factory.SubFactory(AuctionFactory)
+
+
+class NotificationFactory(DjangoModelFactory):
+    class Meta:
+        model = Notification
+
+    user = factory.SubFactory(UserFactory)
+    notification_type = 'bid_outbid'
+    title = factory.Faker('sentence', nb_words=4)
+    message = factory.Faker('paragraph', nb_sentences=2)
+    related_object_type = 'auction'
+    related_object_id = factory.Sequence(int)
+    sent_at = factory.LazyFunction(timezone.now)
+
+
+class VehicleConditionFactory(DjangoModelFactory):
+    class Meta:
+        model = VehicleCondition
+        django_get_or_create = ('name',)
+
+    name = 'Good'
+
+
+class VehicleTypeFactory(DjangoModelFactory):
+    class Meta:
+        model = VehicleType
+        django_get_or_create = ('name',)
+
+    name = 'Sedan'
+
+
+class TransmissionFactory(DjangoModelFactory):
+    class Meta:
+        model = Transmission
+        django_get_or_create = ('name',)
+
+    name = 'Automatic'
+
+
+class FuelTypeFactory(DjangoModelFactory):
+    class Meta:
+        model = FuelType
+        django_get_or_create = ('name',)
+
+    name = 'Diesel'
+
+
+class VehicleFactory(DjangoModelFactory):
+    class Meta:
+        model = Vehicle
+
+    auction = factory.SubFactory(AuctionFactory)
+    owner = factory.SelfAttribute('auction.seller')
+    vin = factory.Sequence(lambda n: f'WBA{n:014d}')
+    registration_number = factory.Sequence(lambda n: f'BE-{n}')
+    make = factory.Iterator(['BMW', 'Audi', 'Volkswagen', 'Toyota', 'Volvo'])
+    model = factory.Iterator(['320d', 'A4', 'Passat', 'Corolla', 'V60'])
+    year = factory.Faker('pyint', min_value=2005, max_value=2024)
+    color = factory.Faker('safe_color_name')
+    vehicle_type = factory.SubFactory(VehicleTypeFactory)
+    transmission = factory.SubFactory(TransmissionFactory)
+    fuel_type = factory.SubFactory(FuelTypeFactory)
+    condition = factory.SubFactory(VehicleConditionFactory)
+    engine_displacement = 1998
+    horsepower = factory.Faker('pyint', min_value=90, max_value=300)
+    mileage = factory.Faker('pyint', min_value=5_000, max_value=300_000)
+    features = factory.LazyFunction(lambda: ['ABS', 'Airbags', 'Air Conditioning', 'Power Windows'])
+    description = factory.Faker('paragraph', nb_sentences=6)
+    location = factory.Faker('city')
@@ -0,0 +1,121 @@
+"""Serialization throughput and query counts of the main DRF serializers.
+
+Each case serialises the queryset its API view uses, so query counts include
+any per-row lookups the view would trigger. Results are compared with the
+baselines in ``baselines/serializers.json``: more queries than the baseline
+is always a regression, more time only beyond the threshold and only for
+runs long enough to time reliably. Timings depend on the machine, so
+baselines should be saved on the one that checks them.
+"""
+import json
+import time
+from pathlib import Path
+
+import factory.random
+from django.db import connection
+from django.db.models import Prefetch
+
+from apps.auctions.models import Auction, Watchlist
+from apps.auctions.serializers import AuctionSerializer, WatchlistSerializer
+from apps.bidding.models import Bid
+from apps.bidding.serializers import BidSerializer
+from apps.notifications.models import Notification
+from apps.notifications.serializers import NotificationSerializer
+from apps.vehicles.models import Vehicle
+from apps.vehicles.serializers import VehicleSerializer
+from .factories import (
+    AuctionFactory, AuctionImageFactory, BidFactory, CategoryFactory, NotificationFactory, UserFactory,
+    VehicleFactory, WatchlistFactory,
+)
+
+BASELINE_PATH = Path(__file__).resolve().parent / 'baselines' / 'serializers.json'
+
+# Shorter baselines are mostly noise and only have their queries checked
+MIN_TIMED_MS = 20
+
+# Serializer and the queryset of its view, for the user owning per-user rows
+CASES = {
+    'AuctionSerializer': (
+        AuctionSerializer, lambda user: Auction.objects.with_list_data().order_by('-created_at', '-id'),
+    ),
+    'BidSerializer': (
+        BidSerializer, lambda user: Bid.objects.filter(bidder=user).order_by('-id'),
+    ),
+    'WatchlistSerializer': (
+        WatchlistSerializer,
+        lambda user: Watchlist.objects.filter(user=user).prefetch_related(
+            Prefetch('auction', queryset=Auction.objects.with_list_data())
+        ).order_by('-id'),
+    ),
+    'VehicleSerializer': (
+        VehicleSerializer, lambda user: Vehicle.objects.order_by('-id'),
+    ),
+    'NotificationSerializer': (
+        NotificationSerializer, lambda user: Notification.objects.filter(user=user).order_by('-id'),
+    ),
+}
+
+
+def seed(rows):
+    """Create ``rows`` rows for every case; returns the user owning per-user rows."""
+    factory.random.reseed_random(42)
+    user = UserFactory()
+    sellers = UserFactory.create_batch(10)
+    categories = CategoryFactory.create_batch(5)
+    auctions = AuctionFactory.create_batch(
+        rows, seller=factory.Iterator(sellers), category=factory.Iterator(categories),
+    )
+    AuctionImageFactory.create_batch(rows, auction=factory.Iterator(auctions), is_primary=True)
+    AuctionImageFactory.create_batch(rows, auction=factory.Iterator(auctions))
+    BidFactory.create_batch(rows, auction=factory.Iterator(auctions), bidder=user)
+    WatchlistFactory.create_batch(rows, auction=factory.Iterator(auctions), user=user)
+    VehicleFactory.create_batch(rows, auction=factory.Iterator(auctions))
+    NotificationFactory.create_batch(rows, user=user)
+    return user
+
+
+def measure(name, user, rows, repeat=5):
+    """Serialise ``rows`` rows of case ``name``; returns queries and best time in ms."""
+    serializer_class, queryset = CASES[name]
+    best = None
+    for _ in range(repeat):
+        queries = []
+
+        def count(execute, sql, params, many, context):
+            queries.append(sql)
+            return execute(sql, params, many, context)
+
+        # Counted with a wrapper rather than the query log, which caps at 9000 entries
+        with connection.execute_wrapper(count):
+            started = time.perf_counter()
+            data = serializer_class(queryset(user)[:rows], many=True).data
+            elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    assert len(data) == rows, f'{name}: seeded {len(data)} rows, expected {rows}'
+    return {'queries': len(queries), 'ms': round(best * 1000, 2)}
+
+
+def load_baseline(path=BASELINE_PATH):
+    try:
+        return json.loads(Path(path).read_text())
+    except FileNotFoundError:
+        return {}
+
+
+def save_baseline(results, path=BASELINE_PATH):
+    Path(path).write_text(json.dumps(results, indent=2, sort_keys=True) + '\n')
+
+
+def regressions(results, baseline, threshold):
+    """Describe results with more queries than ``baseline``, or slower by more than ``threshold``."""
+    found = []
+    for name, sizes in results.items():
+        for rows, result in sizes.items():
+            expected = baseline.get(name, {}).get(rows)
+            if expected is None:
+                continue
+            if result['queries'] > expected['queries']:
+                found.append(f"{name} x{rows}: {result['queries']} queries, baseline {expected['queries']}")
+            if expected['ms'] >= MIN_TIMED_MS and result['ms'] > expected['ms'] * (1 + threshold):
+                found.append(f"{name} x{rows}: {result['ms']} ms, baseline {expected['ms']} ms")
+    return found
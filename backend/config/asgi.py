@@ -11,17 +11,21 @@ import os
 
 from django.core.asgi import get_asgi_application
 from channels.routing import ProtocolTypeRouter, URLRouter
-from channels.auth import AuthMiddlewareStack
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
 
 django_asgi_app = get_asgi_application()
 
 from apps.bidding.routing import websocket_urlpatterns
+from apps.users.activity import write_behind_flusher
+from apps.users.websocket_auth import JWTAuthMiddlewareStack
+
+# Write buffered activity and view counts even when no requests arrive
+write_behind_flusher.start()
 
 application = ProtocolTypeRouter({
     "http": django_asgi_app,
-    "websocket": AuthMiddlewareStack(
+    "websocket": JWTAuthMiddlewareStack(
         URLRouter(
             websocket_urlpatterns
         )
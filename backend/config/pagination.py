@@ -0,0 +1,67 @@
+"""
+Pagination for the REST API.
+"""
+
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+from rest_framework.response import Response
+
+
+class KeysetPagination(CursorPagination):
+    """Cursor pagination on ``(-created_at, -id)`` unless the view orders otherwise."""
+
+    ordering = ('-created_at', '-id')
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+    def get_ordering(self, request, queryset, view):
+        for backend in getattr(view, 'filter_backends', []):
+            if hasattr(backend, 'get_ordering'):
+                ordering = backend().get_ordering(request, queryset, view)
+                if ordering:
+                    return tuple(ordering)
+        return self.ordering
+
+
+class StandardPagination(PageNumberPagination):
+    """Page-number pagination that switches to keyset cursors on request.
+
+    Clients sending ``?cursor=`` (or ``?pagination=cursor`` for the first
+    page) get ``{next, previous, results}`` paged by the ordering key instead
+    of ``COUNT(*)`` plus ``OFFSET``, so deep pages cost the same as the first.
+    Page-number responses are unchanged.
+    """
+
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    cursor_paginator = None
+
+    def use_cursor(self, request):
+        return 'cursor' in request.query_params or request.query_params.get('pagination') == 'cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if self.use_cursor(request):
+            self.cursor_paginator = KeysetPagination()
+            return self.cursor_paginator.paginate_queryset(queryset, request, view)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.cursor_paginator is not None:
+            return self.cursor_paginator.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+    def get_schema_operation_parameters(self, view):
+        return super().get_schema_operation_parameters(view) + [
+            parameter
+            for parameter in KeysetPagination().get_schema_operation_parameters(view)
+            if parameter['name'] == 'cursor'
+        ]
+
+
+def paginated_response(view, queryset):
+    """Serialise ``queryset`` through the view's paginator, as ``ListModelMixin.list`` does."""
+    page = view.paginate_queryset(queryset)
+    if page is not None:
+        serializer = view.get_serializer(page, many=True)
+        return view.get_paginated_response(serializer.data)
+    serializer = view.get_serializer(queryset, many=True)
+    return Response(serializer.data)
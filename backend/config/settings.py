@@ -27,6 +27,7 @@ MIDDLEWARE = [
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     'allauth.account.middleware.AccountMiddleware',
+    'apps.auctions.clock.ServerTimeMiddleware',
 ]
 """
 Django settings for config project.
@@ -37,6 +38,7 @@ Built with environment variables for production safety.
 import os
 from pathlib import Path
 from datetime import timedelta
+from django.core.exceptions import ImproperlyConfigured
 
 # Build paths
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -67,6 +69,8 @@ CORS_ALLOW_HEADERS = [
     'x-csrftoken',
     'x-requested-with',
 ]
+# Readable by browser clients for clock sync and conditional requests
+CORS_EXPOSE_HEADERS = ['X-Server-Now', 'ETag', 'Last-Modified', 'X-Cache']
 # Allow all origins for development (remove for production)
 CORS_ALLOW_ALL_ORIGINS = True
 CORS_ALLOWED_ORIGINS = [
@@ -152,6 +156,8 @@ else:
             'NAME': BASE_DIR / 'db.sqlite3',
         }
     }
+    # Covering index columns only apply on PostgreSQL
+    SILENCED_SYSTEM_CHECKS = ['models.W040']
 
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
@@ -187,7 +193,7 @@ REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticatedOrReadOnly',
     ),
-    'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
+    'DEFAULT_PAGINATION_CLASS': 'config.pagination.StandardPagination',
     'PAGE_SIZE': 20,
     'DEFAULT_FILTER_BACKENDS': (
         'django_filters.rest_framework.DjangoFilterBackend',
@@ -207,6 +213,8 @@ SIMPLE_JWT = {
     'BLACKLIST_AFTER_ROTATION': True,
     'AUTH_HEADER_TYPES': ('Bearer',),
 }
+# WebSocket JWT auth caches the user fields of a token this long (apps/users/websocket_auth.py)
+WS_AUTH_USER_CACHE_SECONDS = int(os.getenv('WS_AUTH_USER_CACHE_SECONDS', 60))
 
 # Redis Configuration
 REDIS_HOST = os.getenv('REDIS_HOST', 'localhost')
@@ -214,12 +222,41 @@ REDIS_PORT = int(os.getenv('REDIS_PORT', 6379))
 REDIS_DB = int(os.getenv('REDIS_DB', 0))
 REDIS_URL = f'redis://{REDIS_HOST}:{REDIS_PORT}/{REDIS_DB}'
 
-# Channels Configuration - use in-memory layer for development
-CHANNEL_LAYERS = {
-    'default': {
-        'BACKEND': 'channels.layers.InMemoryChannelLayer'
-    },
-}
+# Channels Configuration - in-memory layer for development, or fakeredis to
+# run channels-redis in one process without a server. Set
+# CHANNEL_LAYER_BACKEND=redis when running more than one Daphne worker;
+# groups and channels are sharded across CHANNEL_REDIS_HOSTS by
+# consistent hashing, so every worker must list the same hosts in the
+# same order.
+CHANNEL_LAYER_BACKEND = os.getenv('CHANNEL_LAYER_BACKEND', 'memory')
+if CHANNEL_LAYER_BACKEND == 'redis':
+    CHANNEL_LAYERS = {
+        'default': {
+            'BACKEND': 'channels_redis.core.RedisChannelLayer',
+            'CONFIG': {
+                'hosts': [
+                    host.strip()
+                    for host in os.getenv('CHANNEL_REDIS_HOSTS', REDIS_URL).split(',')
+                    if host.strip()
+                ],
+                'prefix': os.getenv('CHANNEL_LAYER_PREFIX', 'asgi'),
+                'capacity': int(os.getenv('CHANNEL_LAYER_CAPACITY', 500)),
+                'expiry': int(os.getenv('CHANNEL_LAYER_EXPIRY', 10)),
+                'group_expiry': int(os.getenv('CHANNEL_LAYER_GROUP_EXPIRY', 86400)),
+            },
+        },
+    }
+elif CHANNEL_LAYER_BACKEND == 'fakeredis':
+    # channels-redis over in-process fake Redis: the Redis code path in a
+    # single worker without a server, e.g. for local load tests
+    from apps.bidding.testing import fake_redis_channel_layers
+    CHANNEL_LAYERS = fake_redis_channel_layers(shards=int(os.getenv('CHANNEL_LAYER_FAKE_SHARDS', 2)))
+else:
+    CHANNEL_LAYERS = {
+        'default': {
+            'BACKEND': 'channels.layers.InMemoryChannelLayer'
+        },
+    }
 
 # Celery Configuration - disabled for development
 CELERY_BROKER_URL = 'memory://'
@@ -229,14 +266,40 @@ CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
 CELERY_TIMEZONE = TIME_ZONE
 CELERY_TASK_TRACK_STARTED = True
+CELERY_BEAT_SCHEDULE = {
+    'close-due-auctions': {
+        'task': 'apps.auctions.tasks.close_due_auctions',
+        'schedule': 5.0,
+    },
+    'refresh-auction-facets': {
+        'task': 'apps.auctions.tasks.refresh_auction_facets',
+        'schedule': float(os.getenv('AUCTION_FACET_REFRESH_SECONDS', 60)),
+    },
+}
 
-# Cache Configuration - Use simple in-memory cache for development (no Redis required)
-CACHES = {
-    'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-        'LOCATION': 'unique-snowflake',
+# Cache Configuration - in-memory cache for development (no Redis required).
+# Event sequence numbers, presence, response cache versions and hot book
+# markers live in the default cache, so once there is more than one process
+# it has to be shared: CACHE_BACKEND=redis, required with the Redis channel
+# layer.
+CACHE_BACKEND = os.getenv('CACHE_BACKEND', 'locmem')
+if CHANNEL_LAYER_BACKEND == 'redis' and CACHE_BACKEND != 'redis':
+    raise ImproperlyConfigured('CHANNEL_LAYER_BACKEND=redis needs a shared cache, set CACHE_BACKEND=redis')
+if CACHE_BACKEND == 'redis':
+    CACHES = {
+        'default': {
+            'BACKEND': 'django_redis.cache.RedisCache',
+            'LOCATION': os.getenv('CACHE_REDIS_URL', REDIS_URL),
+            'KEY_PREFIX': os.getenv('CACHE_KEY_PREFIX', ''),
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'unique-snowflake',
+        }
     }
-}
 
 # Custom User Model
 AUTH_USER_MODEL = 'users.User'
@@ -294,6 +357,53 @@ LOGGING = {
 # Anti-Sniping Configuration
 AUCTION_ANTI_SNIPE_SECONDS = int(os.getenv('AUCTION_ANTI_SNIPE_SECONDS', 30))
 
+# Hot auction order book (single-process deployments only)
+BIDDING_HOT_BOOK_ENABLED = os.getenv('BIDDING_HOT_BOOK_ENABLED', 'False') == 'True'
+BIDDING_HOT_BOOK_WINDOW_SECONDS = int(os.getenv('BIDDING_HOT_BOOK_WINDOW_SECONDS', 300))
+BIDDING_HOT_BOOK_FLUSH_INTERVAL = float(os.getenv('BIDDING_HOT_BOOK_FLUSH_INTERVAL', 0.5))
+# Failed writes of an auction's bids before they are dead-lettered
+BIDDING_HOT_BOOK_MAX_FLUSH_ATTEMPTS = int(os.getenv('BIDDING_HOT_BOOK_MAX_FLUSH_ATTEMPTS', 5))
+# Bids on one auction within this window are broadcast as a single frame (0 disables)
+BIDDING_BROADCAST_WINDOW_MS = int(os.getenv('BIDDING_BROADCAST_WINDOW_MS', 50))
+# Recent auction events kept in the cache for WebSocket resume; processes must share the cache
+BIDDING_EVENT_BUFFER_SIZE = int(os.getenv('BIDDING_EVENT_BUFFER_SIZE', 100))
+BIDDING_EVENT_BUFFER_TTL_SECONDS = int(os.getenv('BIDDING_EVENT_BUFFER_TTL_SECONDS', 3600))
+# Auctions one multiplexed WebSocket (ws/auctions/) may subscribe to
+BIDDING_WS_MAX_SUBSCRIPTIONS = int(os.getenv('BIDDING_WS_MAX_SUBSCRIPTIONS', 50))
+# Frames queued per WebSocket before the client counts as slow; slow clients are closed after the grace period
+BIDDING_WS_QUEUE_HIGH_WATER = int(os.getenv('BIDDING_WS_QUEUE_HIGH_WATER', 64))
+BIDDING_WS_SLOW_CLIENT_SECONDS = float(os.getenv('BIDDING_WS_SLOW_CLIENT_SECONDS', 10))
+
+# Auction closing (see apps/auctions/closing.py)
+AUCTION_CLOSE_BATCH_SIZE = int(os.getenv('AUCTION_CLOSE_BATCH_SIZE', 500))
+AUCTION_CLOSE_HORIZON_SECONDS = int(os.getenv('AUCTION_CLOSE_HORIZON_SECONDS', 60))
+AUCTION_CLOSE_REFILL_SECONDS = int(os.getenv('AUCTION_CLOSE_REFILL_SECONDS', 5))
+# Fallback sweep for deployments that run celery beat instead of run_auction_closer
+AUCTION_CLOSE_SWEEP_LOOKBACK_SECONDS = int(os.getenv('AUCTION_CLOSE_SWEEP_LOOKBACK_SECONDS', 600))
+
+# Age after which browse facet counts are recounted, by celery beat or by the
+# first browse request to notice (see apps/auctions/facets.py)
+AUCTION_FACET_REFRESH_SECONDS = float(os.getenv('AUCTION_FACET_REFRESH_SECONDS', 60))
+
+# Clock frames sent to auction rooms with viewers (0 disables)
+AUCTION_CLOCK_TICK_SECONDS = float(os.getenv('AUCTION_CLOCK_TICK_SECONDS', 15))
+
+# Cached anonymous auction/category responses (0 disables)
+RESPONSE_CACHE_SECONDS = int(os.getenv('RESPONSE_CACHE_SECONDS', 60))
+
+# Buffered auction view counts (see apps.auctions.viewcounts)
+AUCTION_VIEW_FLUSH_SECONDS = float(os.getenv('AUCTION_VIEW_FLUSH_SECONDS', 10))
+AUCTION_VIEW_DEDUPE_SECONDS = int(os.getenv('AUCTION_VIEW_DEDUPE_SECONDS', 1800))
+AUCTION_TRENDING_HALF_LIFE_HOURS = float(os.getenv('AUCTION_TRENDING_HALF_LIFE_HOURS', 6))
+
+# Buffered User.last_activity writes: one bulk UPDATE per process per interval
+USER_ACTIVITY_FLUSH_SECONDS = float(os.getenv('USER_ACTIVITY_FLUSH_SECONDS', 30))
+
+# WebSocket presence: per-process summaries expire after the TTL, viewer counts
+# are broadcast to auction rooms at most once per interval
+PRESENCE_TTL_SECONDS = int(os.getenv('PRESENCE_TTL_SECONDS', 30))
+PRESENCE_BROADCAST_SECONDS = float(os.getenv('PRESENCE_BROADCAST_SECONDS', 2))
+
 # Stripe Configuration
 STRIPE_PUBLIC_KEY = os.getenv('STRIPE_PUBLIC_KEY', '')
 STRIPE_SECRET_KEY = os.getenv('STRIPE_SECRET_KEY', '')
@@ -14,3 +14,8 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
 
 application = get_wsgi_application()
+
+from apps.users.activity import write_behind_flusher
+
+# Write buffered activity and view counts even when no requests arrive
+write_behind_flusher.start()
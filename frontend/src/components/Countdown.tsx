@@ -1,4 +1,5 @@
 import React, { useEffect, useState } from "react";
+import { serverNow } from "@/utils/helpers";
 
 interface Props {
   endTime: string; // ISO string
@@ -22,7 +23,7 @@ const Countdown: React.FC<Props> = ({ endTime }) => {
   useEffect(() => {
     const end = new Date(endTime).getTime();
     const tick = () => {
-      const now = Date.now();
+      const now = serverNow();
       setRemaining(formatRemaining(end - now));
     };
     tick();
@@ -1,17 +1,23 @@
 import { useEffect, useRef, useCallback } from "react";
+import { syncServerClock } from "@/utils/helpers";
+import { getAccessToken } from "@/utils/authStorage";
 
 interface WebSocketMessage {
   type: string;
+  seq?: number;
   data: any;
 }
 
 export const useAuctionWebSocket = (
   auctionId: number | string,
-  onMessage?: (message: WebSocketMessage) => void,
+  // gap is true when sequenced events were skipped before this one
+  onMessage?: (message: WebSocketMessage, gap: boolean) => void,
 ) => {
   const ws = useRef<WebSocket | null>(null);
   const reconnectTimeoutRef = useRef<NodeJS.Timeout>();
   const reconnectAttempts = useRef(0);
+  // Last auction event seen, replayed from on reconnect
+  const lastSeq = useRef<number | null>(null);
   const maxReconnectAttempts = 5;
 
   const connect = useCallback(() => {
@@ -21,17 +27,39 @@ export const useAuctionWebSocket = (
       const port = 8001;
       const wsUrl = `${protocol}//127.0.0.1:${port}/ws/auction/${auctionId}/`;
 
-      ws.current = new WebSocket(wsUrl);
+      // Browsers cannot set headers on sockets, so the JWT goes in a subprotocol
+      const token = getAccessToken();
+      ws.current = token
+        ? new WebSocket(wsUrl, ["jwt", token])
+        : new WebSocket(wsUrl);
 
       ws.current.onopen = () => {
         console.log("WebSocket connected for auction:", auctionId);
         reconnectAttempts.current = 0;
+        if (lastSeq.current !== null) {
+          // Missed events are replayed, or a "resume" with snapshot: true
+          // tells onMessage to reload the auction
+          ws.current?.send(
+            JSON.stringify({ type: "resume", last_seq: lastSeq.current }),
+          );
+        }
       };
 
       ws.current.onmessage = (event) => {
         try {
           const message = JSON.parse(event.data);
-          onMessage?.(message);
+          let gap = false;
+          if (typeof message.seq === "number") {
+            gap =
+              lastSeq.current !== null && message.seq > lastSeq.current + 1;
+            lastSeq.current = message.seq;
+          } else if (message.type === "resume") {
+            lastSeq.current = message.data.seq;
+          }
+          if (message.data?.server_now) {
+            syncServerClock(message.data.server_now);
+          }
+          onMessage?.(message, gap);
         } catch (error) {
           console.error("Failed to parse WebSocket message:", error);
         }
@@ -83,6 +111,10 @@ export const useAuctionWebSocket = (
     }
   }, []);
 
+  useEffect(() => {
+    lastSeq.current = null;
+  }, [auctionId]);
+
   useEffect(() => {
     connect();
     return () => disconnect();
@@ -2,7 +2,13 @@
  * Auction detail page
  */
 
-import React, { useEffect, useState, useCallback, useMemo } from "react";
+import React, {
+  useEffect,
+  useState,
+  useCallback,
+  useMemo,
+  useRef,
+} from "react";
 import { useParams } from "react-router-dom";
 import {
   useAuth,
@@ -10,7 +16,12 @@ import {
   useAddToWatchlist,
   useRemoveFromWatchlist,
 } from "@/hooks/useApi";
-import { formatPrice, calculateTimeRemaining } from "@/utils/helpers";
+import { useAuctionWebSocket } from "@/hooks/useAuctionWebSocket";
+import {
+  formatPrice,
+  calculateTimeRemaining,
+  serverNow,
+} from "@/utils/helpers";
 import { apiClient, getMediaUrl } from "@/services/api";
 import { Gavel, Star, ChevronLeft, ChevronRight } from "lucide-react";
 import { toast } from "@/store/toastStore";
@@ -126,31 +137,91 @@ const AuctionDetailPage: React.FC = () => {
     return () => clearInterval(interval);
   }, [auction?.seller?.id]);
 
+  // Newest bid id loaded so far; later fetches only ask for the gap after it
+  const newestBidId = useRef<number | null>(null);
+
   // Fetch bids from API
-  useEffect(() => {
-    const fetchBids = async () => {
-      try {
-        const response = await apiClient.get(
-          `/bidding/bids/auction_bids/?auction_id=${auctionId}`,
-        );
-        const formattedBids = response.data.map((bid: any) => ({
-          bidder: bid.bidder?.username || t("unknown"),
-          bidderAvatar: getMediaUrl(bid.bidder?.avatar),
-          amount: bid.amount,
-          timestamp: new Date(bid.created_at || Date.now()).toLocaleString(
-            "lv-LV",
-          ),
-        }));
-        setBids(formattedBids);
-      } catch (err: any) {
-        console.error("Failed to fetch bids:", err);
+  const fetchBids = useCallback(async () => {
+    const since = newestBidId.current ?? undefined;
+    try {
+      const bidList = await apiClient.getBids(auctionId, since);
+      const formattedBids = bidList.map((bid: any) => ({
+        id: bid.id,
+        bidder: bid.bidder?.username || t("unknown"),
+        bidderAvatar: getMediaUrl(bid.bidder?.avatar),
+        amount: bid.amount,
+        timestamp: new Date(bid.created_at || Date.now()).toLocaleString(
+          "lv-LV",
+        ),
+      }));
+      if (bidList.length > 0) {
+        newestBidId.current = bidList[0].id;
       }
-    };
+      setBids((prev) =>
+        since === undefined
+          ? formattedBids
+          : // Optimistic entries have no id and are replaced by the fetched rows
+            [...formattedBids, ...prev.filter((bid) => bid.id !== undefined)],
+      );
+    } catch (err: any) {
+      console.error("Failed to fetch bids:", err);
+    }
+  }, [auctionId, t]);
 
+  useEffect(() => {
+    newestBidId.current = null;
     if (auctionId) {
       fetchBids();
     }
-  }, [auctionId]);
+  }, [auctionId, fetchBids]);
+
+  // bid_placed frames carry the new state but no bid id, so they are shown
+  // as id-less rows; the ladder is only asked for the bids after the newest
+  // known id when events may have been missed (reconnect or sequence gap)
+  const handleSocketMessage = useCallback(
+    (message: { type: string; data: any }, gap: boolean) => {
+      if (message.type === "resume" || gap) {
+        fetchBids();
+        return;
+      }
+      if (message.type !== "bid_placed") {
+        return;
+      }
+      const data = message.data;
+      setAuction((prev: any) =>
+        prev
+          ? {
+              ...prev,
+              current_highest_bid: data.amount,
+              current_bid: data.amount,
+              last_bidder: { username: data.bidder, avatar: data.bidderAvatar },
+              end_time: data.end_time || prev.end_time,
+            }
+          : prev,
+      );
+      setBids((prev) => {
+        // Our own bid was already added optimistically
+        if (
+          prev.length > 0 &&
+          Number(prev[0].amount) === Number(data.amount) &&
+          prev[0].bidder === data.bidder
+        ) {
+          return prev;
+        }
+        return [
+          {
+            bidder: data.bidder || t("unknown"),
+            bidderAvatar: getMediaUrl(data.bidderAvatar),
+            amount: data.amount,
+            timestamp: new Date().toLocaleString("lv-LV"),
+          },
+          ...prev,
+        ];
+      });
+    },
+    [fetchBids, t],
+  );
+  useAuctionWebSocket(auctionId, handleSocketMessage);
 
   // Mock auction data for fallback
 
@@ -195,7 +266,7 @@ const AuctionDetailPage: React.FC = () => {
   const baseRemainingMs = useMemo(() => {
     if (!auction?.end_time) return 0;
     const end = new Date(auction.end_time).getTime();
-    const now = Date.now();
+    const now = serverNow();
     return Math.max(end - now, 0);
   }, [auction?.end_time, timeRemaining]);
   const remainingMs = useMemo(() => {
@@ -4,7 +4,7 @@ import { Gavel, Star, Clock } from "lucide-react";
 
 import { useNavigate } from "react-router-dom";
 import { apiClient, getMediaUrl } from "@/services/api";
-import { formatPrice } from "@/utils/helpers";
+import { formatPrice, serverNow } from "@/utils/helpers";
 import { toast } from "@/store/toastStore";
 import { useAuthStore } from "@/store/authStore";
 import { useLanguageStore } from "@/store/languageStore";
@@ -24,7 +24,7 @@ const CountdownTimer: React.FC<{ endTime: string; color: string }> = ({
 
   useEffect(() => {
     const calculateTimeLeft = () => {
-      const now = new Date().getTime();
+      const now = serverNow();
       const end = new Date(endTime).getTime();
       const distance = end - now;
 
@@ -335,9 +335,17 @@ const HomePage: React.FC = () => {
       const response = await apiClient.get("/auctions/categories/");
       const categoryData = extractResponseList(response);
 
-      // Fetch auctions to count per category and find closest ending
-      const auctionsResponse = await apiClient.get("/auctions/auctions/");
-      const allAuctions = extractResponseList(auctionsResponse);
+      // One request: active auctions ending soonest plus per-category counts
+      const browseResponse = await apiClient.get("/auctions/auctions/browse/", {
+        params: { status: "active", ordering: "end_time" },
+      });
+      const allAuctions = extractResponseList(browseResponse);
+      const categoryCounts = new Map<number, number>(
+        (browseResponse.data?.facets?.category ?? []).map((facet: any) => [
+          facet.id,
+          facet.count,
+        ]),
+      );
 
       const now = Date.now();
       const isAuctionActive = (auction: any) => {
@@ -356,21 +364,12 @@ const HomePage: React.FC = () => {
             isAuctionActive(auction),
         );
 
-        // Find the auction ending soonest
-        let closestAuction = null;
-        if (categoryAuctions.length > 0) {
-          closestAuction = categoryAuctions.reduce(
-            (closest: any, current: any) => {
-              const closestTime = new Date(closest.end_time).getTime();
-              const currentTime = new Date(current.end_time).getTime();
-              return currentTime < closestTime ? current : closest;
-            },
-          );
-        }
+        // Results are ordered by end_time, so the first one ends soonest
+        const closestAuction = categoryAuctions[0] ?? null;
 
         return {
           ...cat,
-          auction_count: categoryAuctions.length,
+          auction_count: categoryCounts.get(cat.id) ?? 0,
           closest_auction: closestAuction,
         };
       });
@@ -972,7 +971,7 @@ const HomePage: React.FC = () => {
                         />
                       ) : (
                         <p className="mt-2 text-xl font-black text-primary-600">
-                          {auction.timeRemaining || "-"}
+                          -
                         </p>
                       )}
                     </div>
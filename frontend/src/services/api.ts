@@ -10,6 +10,7 @@ import {
   setTokens,
   clearTokens,
 } from "@/utils/authStorage";
+import { syncServerClock } from "@/utils/helpers";
 
 const API_URL =
   (import.meta as any).env.VITE_API_URL || "http://localhost:8002/api";
@@ -80,6 +81,7 @@ class APIClient {
     // Handle token refresh
     this.client.interceptors.response.use(
       (response) => {
+        syncServerClock(response.headers["x-server-now"]);
         if (shouldLogWatchlist(response.config.url)) {
           logWatchlistResponse(
             response.status,
@@ -188,11 +190,25 @@ class APIClient {
     return response.data;
   }
 
-  async getBids(auctionId: number): Promise<any[]> {
-    const response = await this.client.get("/bidding/bids/auction_bids/", {
-      params: { auction_id: auctionId },
+  async getBids(auctionId: number, since?: number): Promise<any[]> {
+    if (since === undefined) {
+      const response = await this.client.get("/bidding/bids/ladder/", {
+        params: { auction_id: auctionId },
+      });
+      return response.data.results ?? response.data;
+    }
+    // A gap can be longer than one page; keyset cursors neither skip nor
+    // repeat rows while new bids arrive, so follow them to the end
+    const bids: any[] = [];
+    let response = await this.client.get("/bidding/bids/ladder/", {
+      params: { auction_id: auctionId, since, pagination: "cursor" },
     });
-    return response.data;
+    bids.push(...response.data.results);
+    while (response.data.next) {
+      response = await this.client.get(response.data.next);
+      bids.push(...response.data.results);
+    }
+    return bids;
   }
 
   // Watchlist endpoints
@@ -76,7 +76,6 @@ export interface Auction {
   location?: string;
   verified?: boolean;
   currentBid?: number;
-  timeRemaining?: string;
   watchlist_count?: number;
 }
 
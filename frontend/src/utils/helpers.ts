@@ -42,10 +42,21 @@ export const formatDate = (date: string): string => {
   }).format(new Date(date));
 };
 
+// Server clock minus device clock, from the X-Server-Now response header
+let serverClockOffsetMs = 0;
+
+export const syncServerClock = (serverNow?: string | number | null) => {
+  const serverMs = Number(serverNow);
+  if (serverNow == null || !Number.isFinite(serverMs)) return;
+  serverClockOffsetMs = serverMs - Date.now();
+};
+
+/** Current time in epoch milliseconds, corrected to the server clock. */
+export const serverNow = (): number => Date.now() + serverClockOffsetMs;
+
 export const calculateTimeRemaining = (endTime: string): string => {
   const end = new Date(endTime);
-  const now = new Date();
-  const diff = end.getTime() - now.getTime();
+  const diff = end.getTime() - serverNow();
 
   if (diff <= 0) return "Ended";
 